@@ -1,15 +1,17 @@
 from __future__ import annotations
 
 import itertools
-from functools import reduce
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 from uuid import uuid4
 
+import numpy as np
+
+from synbio import utils
 from synbio.interfaces import ILocation, IPart, LocationType, SeqType
 from synbio.polymers import DNA
 
 __all__ = [
-    "Location", "Part"
+    "Location", "CompoundLocation", "Part"
 ]
 
 
@@ -170,6 +172,280 @@ class Location(ILocation):
         """
         return slice(self.start, self.end, 1)
 
+    def extract(
+            self,
+            seq: SeqType,
+            complement: Dict[str, str] = utils.dna_basepairing
+    ) -> str:
+        """
+        A method that returns the subsequence of seq covered by this
+        Location as a str, reverse complemented if on the REV strand
+
+        >>> Location(1, 5, "REV").extract("AATTCCGG")
+        'GAAT'
+        """
+        subseq = str(seq)[self.to_slice()]
+        if self.strand == "REV":
+            return utils.reverse_complement(subseq, complement)
+        return subseq
+
+    def split(self, seq: SeqType) -> List[Tuple[Location, SeqType]]:
+        """
+        A method that returns the (Location, subsequence) pairs needed to
+        write seq over this Location; a single pair for simple Locations
+        (see CompoundLocation.split)
+        """
+        return [(self, seq)]
+
+
+class CompoundLocation(ILocation):
+    """
+    A class used to specify a feature made up of several Locations, e.g.,
+    the exons of a spliced gene or a feature spanning the origin of a
+    circular sequence. Each segment keeps its own strand; segments are
+    joined in the order they are given.
+
+    Segment coordinates are stored as numpy arrays, so that shifting the
+    location after an edit is a handful of vectorized operations regardless
+    of the number of segments.
+
+    >>> loc = CompoundLocation([Location(15, 20), Location(0, 5)])
+    >>> len(loc)
+    10
+    >>> loc.extract("AAAAATTTTTCCCCCGGGGG")
+    'GGGGGAAAAA'
+    """
+
+    def __init__(self, locations: Sequence[Location]) -> None:
+        locations = list(locations)
+        if len(locations) == 0:
+            raise ValueError("CompoundLocation requires at least one Location")
+        if not all(isinstance(loc, Location) for loc in locations):
+            raise TypeError("locations must be of type Location")
+
+        self._starts = np.array([loc.start for loc in locations],
+                                dtype=np.int64)
+        self._ends = np.array([loc.end for loc in locations], dtype=np.int64)
+        self._strands = [loc.strand for loc in locations]
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.locations})"
+
+    def __len__(self) -> int:
+        return int((self._ends - self._starts).sum())
+
+    def __iter__(self):
+        yield from self.locations
+
+    def _comparables(self) -> List[str]:
+        return ['locations']
+
+    @property
+    def locations(self) -> List[Location]:
+        return [
+            Location(start, end, strand)
+            for start, end, strand
+            in zip(self._starts.tolist(), self._ends.tolist(), self._strands)
+        ]
+
+    @property
+    def start(self) -> int:
+        return int(self._starts.min())
+
+    @property
+    def end(self) -> int:
+        return int(self._ends.max())
+
+    @property
+    def strand(self) -> Optional[str]:
+        """
+        The strand shared by every segment, or None if the segments are on
+        mixed strands
+        """
+        strands = set(self._strands)
+        return strands.pop() if len(strands) == 1 else None
+
+    @staticmethod
+    def _segments(loc: ILocation) -> List[Location]:
+        if isinstance(loc, CompoundLocation):
+            return loc.locations
+        return [loc]
+
+    @staticmethod
+    def contains(outer_loc: ILocation, inner_loc: ILocation) -> bool:
+        """
+        A static method that returns True if every segment of inner_loc is
+        contained by some segment of outer_loc
+        """
+        outer_segments = CompoundLocation._segments(outer_loc)
+        return all(
+            any(Location.contains(outer, inner) for outer in outer_segments)
+            for inner in CompoundLocation._segments(inner_loc)
+        )
+
+    @staticmethod
+    def overlaps(loc1: ILocation, loc2: ILocation) -> bool:
+        """
+        A static method that returns True if any segment of loc1 overlaps
+        with any segment of loc2
+        """
+        return any(
+            Location.overlaps(seg1, seg2)
+            for seg1, seg2 in itertools.product(
+                CompoundLocation._segments(loc1),
+                CompoundLocation._segments(loc2)
+            )
+        )
+
+    @staticmethod
+    def find_overlaps(locations: Sequence[ILocation]) -> List[List[bool]]:
+        """
+        A static method that, given a list of Location or CompoundLocation
+        objects, constructs a graph representing all locations that overlap
+        with each other (see Location.find_overlaps)
+        """
+        n = len(locations)
+        return [
+            [
+                CompoundLocation.overlaps(locations[i], locations[j])
+                for j in range(n)
+            ]
+            for i in range(n)
+        ]
+
+    def offset(self, offset: int) -> CompoundLocation:
+        """
+        A method that returns a new CompoundLocation object whose segments
+        are all offset by an integer value
+        """
+        if not isinstance(offset, int):
+            raise TypeError("offset must be of type int")
+
+        new_loc = CompoundLocation(self.locations)
+        new_loc._starts += offset
+        new_loc._ends += offset
+        return new_loc
+
+    @classmethod
+    def from_slice(
+            cls, slice_: Union[slice, Sequence[slice]]) -> CompoundLocation:
+        """
+        A method that returns a new CompoundLocation object from a slice
+        object or a list of slice objects
+        """
+        if isinstance(slice_, slice):
+            slice_ = [slice_]
+        return cls([Location.from_slice(s) for s in slice_])
+
+    def to_slice(self) -> slice:
+        """
+        CompoundLocations cannot be represented by a single slice; use
+        extract() or iterate over segments instead
+        """
+        raise TypeError(
+            "CompoundLocation cannot be converted to a single slice")
+
+    def extract(
+            self,
+            seq: SeqType,
+            complement: Dict[str, str] = utils.dna_basepairing
+    ) -> str:
+        """
+        A method that returns the sequence covered by this CompoundLocation
+        as a str, joining all segments in a single pass. Segments on the REV
+        strand are reverse complemented.
+        """
+        seq = str(seq)
+        return ''.join(
+            utils.reverse_complement(seq[start:end], complement)
+            if strand == "REV" else seq[start:end]
+            for start, end, strand
+            in zip(self._starts.tolist(), self._ends.tolist(), self._strands)
+        )
+
+    def split(self, seq: SeqType) -> List[Tuple[Location, SeqType]]:
+        """
+        A method that splits seq, given in the same order as extract(), into
+        the (Location, subsequence) pairs needed to write it over each
+        segment. Pairs are ordered by descending segment start, so that
+        writing or deleting them in turn leaves the coordinates of the
+        remaining segments valid. Raises an error if seq is not as long as
+        the CompoundLocation or if segments overlap.
+
+        >>> loc = CompoundLocation([Location(15, 20), Location(0, 5)])
+        >>> loc.split("GGGGGAAAAA")
+        [(Location(15, 20, FWD), 'GGGGG'), (Location(0, 5, FWD), 'AAAAA')]
+        """
+        if len(seq) != len(self):
+            raise ValueError(
+                f"value of length {len(seq)} cannot be written over a "
+                f"CompoundLocation of length {len(self)}")
+
+        order = np.argsort(self._starts, kind="stable")
+        if (self._ends[order[:-1]] > self._starts[order[1:]]).any():
+            raise ValueError(
+                "cannot edit a CompoundLocation with overlapping segments")
+
+        offsets = np.concatenate(
+            ([0], np.cumsum(self._ends - self._starts))).tolist()
+        locations = self.locations
+        return [
+            (locations[i], seq[offsets[i]:offsets[i + 1]])
+            for i in order[::-1].tolist()
+        ]
+
+    @staticmethod
+    def shift(
+            starts: np.ndarray,
+            ends: np.ndarray,
+            update_loc: Location,
+            length_change: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        A static method that returns new (starts, ends) arrays for segments
+        affected by an edit at update_loc that changed the sequence length by
+        length_change.
+
+        Segments downstream of the edit are shifted, segments containing the
+        edit are resized, and segments partially overlapping a length
+        changing edit are truncated to the portion outside of the edit.
+        """
+        edit_start, edit_end = update_loc.start, update_loc.end
+
+        upstream = edit_end <= starts
+        contained = ~upstream & (starts <= edit_start) & (edit_end <= ends)
+        overlapping = (
+                ~upstream & ~contained & (length_change != 0)
+                & (starts < edit_end) & (edit_start < ends)
+        )
+        # edit covers the start of a segment
+        covers_start = overlapping & (edit_start <= starts)
+        # edit covers the end of a segment
+        covers_end = overlapping & (starts < edit_start)
+
+        new_starts = np.where(upstream, starts + length_change, starts)
+        new_ends = np.where(upstream | contained, ends + length_change, ends)
+
+        new_starts = np.where(
+            covers_start, edit_end + length_change, new_starts
+        )
+        new_ends = np.where(
+            covers_start, np.maximum(ends, edit_end) + length_change, new_ends
+        )
+        new_ends = np.where(covers_end, edit_start, new_ends)
+
+        return new_starts, new_ends
+
+    def update(self, update_loc: Location, length_change: int) -> None:
+        """
+        A method that shifts all segments in place to account for an edit
+        at update_loc that changed the sequence length by length_change
+        (see CompoundLocation.shift)
+        """
+        self._starts, self._ends = self.shift(
+            self._starts, self._ends, update_loc, length_change
+        )
+
 
 class Part(IPart):
     """
@@ -192,6 +468,8 @@ class Part(IPart):
 
         if location is None:
             location = Location(0, len(seq))
+        elif isinstance(location, list):
+            location = CompoundLocation(location)
 
         if name is None:
             name = str(uuid4())
@@ -249,27 +527,23 @@ class Part(IPart):
         try:
             return self._seq_reference[loc]
         except TypeError:
+            if isinstance(loc, CompoundLocation):
+                return loc.extract(self._seq_reference)
             return self._seq_reference[loc.to_slice()]
 
     @property
     def seq(self) -> SeqType:
-        if isinstance(self.location, list):
-            return reduce(
-                lambda x, y: x + y,
-                [self._seq_index(loc) for loc in self.location]
-            )
-        else:
-            return self._seq_index(self.location)
+        return self._seq_index(self.location)
 
     @seq.setter
     def seq(self, value: SeqType) -> None:
         try:
             # prefer slicing directly with location, if seq is strand savvy
             self._seq_reference.__setitem__(self.location, value)
-        except AttributeError:
-            # default to using .to_slice()
-            self._seq_reference.__setitem__(self.location.to_slice(),
-                                            value)
+        except (AttributeError, TypeError):
+            # default to using .to_slice(), segment by segment
+            for segment, subseq in self.location.split(value):
+                self._seq_reference.__setitem__(segment.to_slice(), subseq)
 
     def update_location(self, key: LocationType, length_change: int) -> None:
         # handle parsing of key into Location object
@@ -285,6 +559,10 @@ class Part(IPart):
         else:
             raise TypeError("could not convert key into Location")
 
+        if isinstance(self.location, CompoundLocation):
+            self.location.update(update_loc, length_change)
+            return
+
         # if update is fully upstream of Part, update both start and end
         if update_loc.end <= self.location.start:
             self.location.start += length_change
@@ -1,29 +1,101 @@
 # TODO: refactor code, now that utils has been split up
 from __future__ import annotations
 
-from typing import Dict, List, Optional, Set, TypeVar
+import hashlib
+import itertools
+from collections import abc
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import (
+    TYPE_CHECKING, Any, Callable, Dict, FrozenSet, Hashable, Iterable,
+    Iterator, List, Optional, Tuple, TypeVar, Union,
+)
+
+import numpy as np
 
 from synbio import utils
+from synbio.codes import metrics
 from synbio.codes import utils as codeutils
-from synbio.interfaces import SeqType
+from synbio.codes.codons import get_codon_index, index_for
+from synbio.codes.usage import CodonOptimizer, cai
+from synbio.interfaces import IPolymer, SeqType
+
+if TYPE_CHECKING:
+    from synbio.polymers import NucleicAcid
 
 __all__ = [
-    "Code", "CodeType"
+    "Code", "FrozenCode", "CodeType", "PresetRegistry", "get_code", "presets"
 ]
 
 
+class PresetRegistry(abc.Mapping):
+    """
+    A lazy mapping of preset names to genetic code tables. Each preset is
+    built by its factory the first time it is looked up and cached after
+    that; presets registered with cache=False (e.g., 'RANDOM') call their
+    factory on every lookup.
+    """
+
+    def __init__(self) -> None:
+        self._factories = {}
+        self._uncached = set()
+        self._tables = {}
+
+    def __getitem__(self, name: str) -> Dict[str, str]:
+        if name in self._uncached:
+            return self._factories[name]()
+        try:
+            return self._tables[name]
+        except KeyError:
+            table = self._tables[name] = self._factories[name]()
+            return table
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._factories)
+
+    def __len__(self) -> int:
+        return len(self._factories)
+
+    def register(
+            self,
+            name: str,
+            factory: Callable[[], Dict[str, str]],
+            cache: bool = True
+    ) -> None:
+        name = name.upper()
+        self._factories[name] = factory
+        self._tables.pop(name, None)
+        if cache:
+            self._uncached.discard(name)
+        else:
+            self._uncached.add(name)
+
+    def is_cached(self, name: str) -> bool:
+        return name.upper() not in self._uncached
+
+
+presets = PresetRegistry()
+presets.register('STANDARD', lambda: codeutils.standard_code)
+presets.register('COLORADO', lambda: codeutils.colorado_code)
+presets.register('RED20', lambda: codeutils.RED20)
+presets.register('RED15', lambda: codeutils.RED15)
+presets.register('FS20', lambda: codeutils.FS20)
+presets.register('FS16', lambda: codeutils.FS16)
+presets.register('RANDOM', codeutils.random_code, cache=False)
+
+
 class Code(dict):
-    """A class used to represent genetic codes."""
-    # TODO: refactor so Code obj includes codon frequency
-    code_options = {
-        'STANDARD': codeutils.standard_code,
-        'COLORADO': codeutils.colorado_code,
-        'RED20': codeutils.RED20,
-        'RED15': codeutils.RED15,
-        'RANDOM': codeutils.random_code()
-    }
-
-    def __init__(self, code: Optional[CodeType] = None) -> None:
+    """
+    A class used to represent genetic codes, optionally carrying a codon
+    usage table (codon -> frequency) used for codon optimization.
+    """
+    code_options = presets
+
+    def __init__(
+            self,
+            code: Optional[CodeType] = None,
+            usage: Optional[Dict[str, float]] = None
+    ) -> None:
         """Automatically loads object with a Code and a
         comparison function between amino acids "ordering". bool norm is used
         to tell dict_to_graph whether or not to set node values based on
@@ -35,9 +107,14 @@ class Code(dict):
             dict code=None: a python dict representing a
                 genetic code, optionally takes a string 'random'
                 to assign a random code
+            dict usage=None: codon usage table (codon -> frequency);
+                defaults to the usage of code if it is a Code
         Returns
         -------
             Code obj: returns a Code object """
+        if usage is None and isinstance(code, Code):
+            usage = code.usage
+
         # optionally generate a random code, or load a preset code
         if type(code) == str:
             try:
@@ -69,14 +146,167 @@ class Code(dict):
         super().__init__(code)
 
         # Assign additional attributes
-        self.ambiguous = codeutils.is_promiscuous(code)
-        self.one_to_one = codeutils.is_one_to_one(code)
-        self.codon_length = len(next(iter(self)))
+        self.usage = dict(usage) if usage is not None else None
+        self._cache = {}
+        self._update_attributes()
+
+    def _update_attributes(self) -> None:
+        self.codon_length = len(next(iter(self), ''))
+
+    @property
+    def ambiguous(self) -> bool:
+        # computed on first use rather than on every construction
+        return self._cached(
+            'ambiguous', lambda: codeutils.is_promiscuous(self)
+        )
+
+    @property
+    def one_to_one(self) -> bool:
+        return self._cached(
+            'one_to_one', lambda: codeutils.is_one_to_one(self)
+        )
+
+    def _invalidate(self) -> None:
+        """
+        A private method that drops all cached derived tables and
+        recomputes the code's attributes. Called whenever the underlying
+        dict is mutated.
+        """
+        self._cache.clear()
+        self._update_attributes()
+
+    def _cached(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        try:
+            return self._cache[key]
+        except KeyError:
+            value = self._cache[key] = func()
+            return value
+
+    # mutating dict methods invalidate derived tables
+    def __setitem__(self, key: str, value: str) -> None:
+        super().__setitem__(key, value)
+        self._invalidate()
+
+    def __delitem__(self, key: str) -> None:
+        super().__delitem__(key)
+        self._invalidate()
+
+    def update(self, *args, **kwargs) -> None:
+        super().update(*args, **kwargs)
+        self._invalidate()
+
+    def pop(self, *args) -> Any:
+        value = super().pop(*args)
+        self._invalidate()
+        return value
+
+    def popitem(self) -> Tuple[str, Any]:
+        item = super().popitem()
+        self._invalidate()
+        return item
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        value = super().setdefault(key, default)
+        self._invalidate()
+        return value
+
+    def clear(self) -> None:
+        super().clear()
+        self._invalidate()
+
+    def __reduce__(self):
+        # rebuild through __init__ so caches and attributes are restored
+        return self.__class__, (dict(self), self.usage)
+
+    def set_usage(self, usage: Optional[Dict[str, float]]) -> None:
+        """
+        A method that replaces the codon usage table (None to clear it)
+        """
+        self.usage = dict(usage) if usage is not None else None
+        self._invalidate()
+
+    def optimizer(self) -> CodonOptimizer:
+        """
+        A method that returns the (cached) CodonOptimizer for this code and
+        its codon usage table
+        """
+        return self._cached(
+            'optimizer', lambda: CodonOptimizer(self, self.usage)
+        )
+
+    def optimize(
+            self,
+            proteins: Union[str, Iterable[str]],
+            mode: str = 'cai',
+            forbidden: Iterable[str] = (),
+            rng: Optional[Union[int, np.random.Generator]] = None
+    ) -> Union[str, List[str]]:
+        """
+        A method used to reverse translate one or many protein sequences
+        using this code's codon usage, for any code (one-to-one or not).
+        See CodonOptimizer.optimize.
+
+        Parameters
+        ----------
+            proteins: a protein sequence or an iterable of them
+            str mode: 'cai' (most used codons) or 'sample' (usage-weighted)
+            list<str> forbidden: motifs that must not occur on either strand
+            rng: np.random.Generator or seed, for mode='sample'
+
+        Returns
+        -------
+            str gene or list<str> genes: RNA coding sequences
+        """
+        return self.optimizer().optimize(
+            proteins, mode=mode, forbidden=forbidden, rng=rng
+        )
+
+    def cai(
+            self,
+            genes: Union[str, Iterable[str], np.ndarray],
+            workers: int = 1) -> Union[float, np.ndarray]:
+        """
+        A method that computes the codon adaptation index of one gene or a
+        batch of genes against this code's codon usage. See usage.cai.
+        """
+        return cai(genes, self, self.usage, workers=workers)
+
+    def design(
+            self,
+            proteins: Union[str, Iterable[str]],
+            forbidden: Iterable[str] = (),
+            max_homopolymer: Optional[int] = None,
+            gc_window: Optional[int] = None,
+            gc_range: Tuple[float, float] = (0.0, 1.0)
+    ) -> Union[str, List[str]]:
+        """
+        A method used to reverse translate one or many protein sequences for
+        synthesis: the highest-CAI coding sequence (under this code's codon
+        usage) without forbidden motifs on either strand, long homopolymers
+        or windows of extreme GC content. See CodonOptimizer.design.
+
+        Parameters
+        ----------
+            proteins: a protein sequence or an iterable of them
+            list<str> forbidden: motifs that must not occur on either strand
+            int max_homopolymer: longest allowed run of one nucleotide
+            int gc_window: length of the sliding GC window
+            tuple<float> gc_range: (min, max) GC fraction of every window
+
+        Returns
+        -------
+            str gene or list<str> genes: RNA coding sequences
+        """
+        return self.optimizer().design(
+            proteins, forbidden=forbidden, max_homopolymer=max_homopolymer,
+            gc_window=gc_window, gc_range=gc_range
+        )
 
     def __repr__(self) -> str:
         code = self.table()
 
-        crossline = '.' + '-' * 23 + '.' + '\n'
+        width = sum(len(elem) + 1 for elem in code[0][0]) - 1
+        crossline = '.' + '-' * width + '.' + '\n'
 
         out = object.__repr__(self) + '\n'
         for col in code:
@@ -90,18 +320,28 @@ class Code(dict):
         return out
 
     def table(self) -> List[List[List[str]]]:
-        """a method used to represent a genetic code as a 4x4x4 array """
-        rNTPs = utils.rNTPs
-        out = [[[c1 + c2 + c3 + ':' + self[c1 + c2 + c3] for c2 in rNTPs]
-                for c3 in rNTPs]
-               for c1 in rNTPs]
+        """
+        a method used to represent a genetic code as a nested array indexed
+        by [first base][last base][middle bases]; 4x4x4 for triplet codes
+        and 4x4x16 for quadruplet codes
+        """
+        index = index_for(self)
+        NTPs = index.alphabet
+        middles = [
+            ''.join(tup)
+            for tup in itertools.product(NTPs, repeat=index.length - 2)
+        ]
+        out = [[[c1 + c2 + c3 + ':' + self[c1 + c2 + c3] for c2 in middles]
+                for c3 in NTPs]
+               for c1 in NTPs]
 
         return out
 
-    def rmap(self) -> Dict[str, Set[str]]:
+    def rmap(self) -> Dict[str, List[str]]:
         """
         A method used to generate the reverse map of a genetic code. Returns an
-        amino acid -> set(codon) dictionary.
+        amino acid -> list(codon) dictionary. The map is computed once and
+        cached until the Code is mutated; do not modify it in place.
 
         Parameters
         ----------
@@ -111,6 +351,9 @@ class Code(dict):
         -------
             dict rmap
         """
+        return self._cached('rmap', self._rmap)
+
+    def _rmap(self) -> Dict[str, List[str]]:
         rmap = {}
         for c, aa in self.items():
             codons = rmap.get(aa, [])
@@ -119,7 +362,39 @@ class Code(dict):
 
         return rmap
 
-    def translate(self, seq: SeqType) -> str:
+    def reverse_table(self, stop_codon: str = 'UGA') -> Dict[str, str]:
+        """
+        A method that returns the amino acid -> codon dictionary used by
+        reverse_translate, mapping '*' to stop_codon. Only meaningful for
+        one-to-one codes. Cached until the Code is mutated.
+        """
+        def build():
+            rev_dict = {aa: codon for codon, aa in self.items()}
+            rev_dict['*'] = stop_codon
+            return rev_dict
+
+        return self._cached(('reverse_table', stop_codon), build)
+
+    def stop_codons(self) -> FrozenSet[str]:
+        """
+        A method that returns the set of codons encoding a stop signal
+        """
+        return self._cached('stop_codons', lambda: frozenset(
+            codon for codon, aa in self.items() if aa == '*'
+        ))
+
+    def synonyms(self) -> Dict[str, FrozenSet[str]]:
+        """
+        A method that returns a codon -> set(codon) dictionary mapping each
+        codon to all codons (including itself) encoding the same signal
+        """
+        def build():
+            rmap = {aa: frozenset(codons) for aa, codons in self.rmap().items()}
+            return {codon: rmap[aa] for codon, aa in self.items()}
+
+        return self._cached('synonyms', build)
+
+    def translate(self, seq: SeqType) -> Union[str, metrics.ProteinSet]:
         """
         A method used to translate a RNA sequence into its corresponding
         Protein sequence. Raises an error if the input sequence length is not
@@ -132,7 +407,11 @@ class Code(dict):
         Returns
         -------
             str prot_seq: str representing translated input sequence
+            ProteinSet proteins: for ambiguous codes (codons mapped to
+                tuples of amino acids), every protein seq may encode
         """
+        if self.ambiguous:
+            return metrics.translate_ambiguous(str(seq), self)
         codons = utils.get_codons(seq, self.codon_length)
         return ''.join(
             self[c.upper()] for c in codons
@@ -159,9 +438,8 @@ class Code(dict):
             raise TypeError(
                 'cannot reverse translate sequence. '
                 'genetic code is not one-to-one')
-        # otherwise, create reverse translation dictionary
-        rev_dict = {aa: codon for codon, aa in self.items()}
-        rev_dict['*'] = stop_codon
+        # otherwise, get (cached) reverse translation dictionary
+        rev_dict = self.reverse_table(stop_codon)
         # translate gene and return
         return ''.join(
             rev_dict[aa] for aa in prot_seq
@@ -185,9 +463,235 @@ class Code(dict):
         -------
             str out: output gene sequence (RNA) in this genetic code
         """
-        in_code = Code(gene_encoding)
+        in_code = get_code(gene_encoding)
         protein = in_code.translate(gene)
         return self.reverse_translate(protein)
 
+    def recode_many(
+            self,
+            genes: Union[Iterable[SeqType], NucleicAcid],
+            gene_encoding: Optional[CodeType] = None,
+            stop_codon: str = 'UGA',
+            kind: str = 'CDS',
+            workers: int = 1
+    ) -> Union[List[str], NucleicAcid]:
+        """
+        A method used to recode many genes into this (one-to-one) genetic
+        code at once. Translation followed by reverse translation collapses
+        into a single codon -> codon table, built once per gene_encoding
+        and cached, so each gene is recoded with one vectorized gather.
+
+        Parameters
+        ----------
+            genes: an iterable of gene sequences (DNA or RNA), or an
+                annotated NucleicAcid whose parts of the given kind are
+                recoded
+            Code gene_encoding: genetic code used to encode input genes
+                (default: Standard Code)
+            str stop_codon: stop codon used by reverse_translate
+            str kind: annotation kind to recode in a NucleicAcid
+            int workers: number of processes to shard a gene batch across
+
+        Returns
+        -------
+            list<str> out: recoded genes (RNA), for an iterable input
+            NucleicAcid seq: the input NucleicAcid, with every matching part
+                rewritten in place in a single pass over the sequence. Part
+                locations are unchanged; strands and compound locations are
+                respected.
+        """
+        # same check as reverse_translate, before any table is built
+        if not self.one_to_one:
+            raise TypeError(
+                'cannot reverse translate sequence. '
+                'genetic code is not one-to-one')
+        in_code = get_code(gene_encoding)
+        mapping, valid = self._cached(
+            ('recode_table', in_code, stop_codon),
+            lambda: self._recode_table(in_code, stop_codon)
+        )
+        args = (mapping, valid, in_code.codon_length)
+
+        if not (isinstance(genes, IPolymer) and hasattr(genes, 'annotations')):
+            genes = [str(gene) for gene in genes]
+            if workers > 1 and len(genes) > 1:
+                size = -(-len(genes) // workers)
+                chunks = [
+                    genes[i:i + size] for i in range(0, len(genes), size)
+                ]
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = pool.map(
+                        _recode_genes, *zip(*((*args, c) for c in chunks))
+                    )
+                    return [gene for chunk in results for gene in chunk]
+            return _recode_genes(*args, genes)
+
+        # recode every selected part, then write all of them back at once
+        nucleic_acid = genes
+        if in_code.codon_length != self.codon_length:
+            raise ValueError(
+                'cannot recode parts in place between codes with different '
+                'codon lengths'
+            )
+        parts = [
+            part for part in nucleic_acid.annotations.values()
+            if str(part.kind).upper() == kind.upper()
+        ]
+        recoded = _recode_genes(
+            *args, [str(nucleic_acid[part.location]) for part in parts]
+        )
+        is_dna = 'T' in nucleic_acid.alphabet()
+        basepairing = nucleic_acid.basepairing()
+        seq = bytearray(nucleic_acid.seq.encode())
+        for part, new in zip(parts, recoded):
+            if is_dna:
+                new = new.replace('U', 'T')
+            for loc in getattr(part.location, 'locations', [part.location]):
+                size = loc.end - loc.start
+                segment, new = new[:size], new[size:]
+                if loc.strand == 'REV':
+                    segment = utils.reverse_complement(segment, basepairing)
+                seq[loc.start:loc.end] = segment.encode()
+        nucleic_acid.seq = seq.decode()
+        return nucleic_acid
+
+    def _recode_table(
+            self, in_code: FrozenCode, stop_codon: str
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # (C, L) bytes of the codon each input codon is recoded to, and
+        # whether each input codon can be recoded at all
+        index = index_for(in_code)
+        rev_dict = self.reverse_table(stop_codon)
+        mapping = np.zeros((len(index), self.codon_length), dtype=np.uint8)
+        valid = np.zeros(len(index), dtype=bool)
+        for i, codon in enumerate(index.codons):
+            target = rev_dict.get(in_code.get(codon))
+            if target is not None:
+                mapping[i] = np.frombuffer(target.encode(), dtype=np.uint8)
+                valid[i] = True
+        return mapping, valid
+
+
+def _recode_genes(
+        mapping: np.ndarray,
+        valid: np.ndarray,
+        codon_length: int,
+        genes: List[str]) -> List[str]:
+    """
+    A private function that recodes genes with a codon table from
+    Code._recode_table (module level so it can run in worker processes)
+    """
+    for gene in genes:
+        if len(gene) % codon_length != 0:
+            raise ValueError(f"seq is not divisible by n ({codon_length})")
+    # encode every gene in one call (DNA and RNA codons share indices)
+    index = get_codon_index('RNA', codon_length)
+    codon_ix = index.encode(''.join(genes).upper().replace('T', 'U'))
+    if not valid[codon_ix].all():
+        bad = index.codons[codon_ix[~valid[codon_ix]][0]]
+        raise KeyError(f"codon {bad} cannot be recoded into this code")
+    recoded = mapping[codon_ix].tobytes().decode()
+
+    out = []
+    width = mapping.shape[1]
+    start = 0
+    for gene in genes:
+        stop = start + len(gene) // codon_length * width
+        out.append(recoded[start:stop])
+        start = stop
+    return out
+
+
+class FrozenCode(Code):
+    """
+    An immutable Code. All derived tables (rmap, reverse table, stop codons,
+    synonyms) are computed once at construction, and the code is hashable
+    with a hash that is stable across interpreter sessions, so FrozenCodes
+    can be used as dict keys or cached across processes.
+    """
+
+    def __init__(
+            self,
+            code: Optional[CodeType] = None,
+            usage: Optional[Dict[str, float]] = None
+    ) -> None:
+        super().__init__(code, usage)
+
+        # precompute derived tables
+        self.rmap()
+        self.stop_codons()
+        self.synonyms()
+        if self.one_to_one:
+            self.reverse_table()
+        self._hash = int.from_bytes(
+            hashlib.blake2b(
+                repr(sorted(self.items())).encode(), digest_size=8
+            ).digest(),
+            byteorder='big', signed=True
+        )
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError(f"{self.__class__.__name__} is immutable")
+
+    __setitem__ = __delitem__ = _immutable
+    update = pop = popitem = setdefault = clear = set_usage = _immutable
+
 
 CodeType = TypeVar("CodeType", Dict[str, str], Code)
+
+
+def get_code(code: Optional[CodeType] = None) -> FrozenCode:
+    """
+    A function that returns a shared, prebuilt FrozenCode for the given
+    input, which may be anything accepted by Code(). Codes are interned by
+    preset name or by table contents, so repeated lookups of the same code
+    skip construction entirely and return the same object.
+
+    >>> get_code() is get_code('standard')
+    True
+    >>> get_code(codeutils.standard_code) is get_code()
+    True
+    """
+    if isinstance(code, FrozenCode):
+        return code
+    elif getattr(code, 'usage', None) is not None:
+        # codes with usage tables are not interned by contents alone
+        return FrozenCode(code)
+    elif code is None:
+        return _preset_code('STANDARD')
+    elif isinstance(code, str):
+        name = code.upper()
+        # presets like 'RANDOM' must produce a fresh code every time
+        if name in presets and not presets.is_cached(name):
+            return FrozenCode(name)
+        return _preset_code(name)
+
+    try:
+        key = frozenset(dict(code).items())
+    except TypeError:
+        raise ValueError(
+            'Code input parameter not recognized. '
+            'Pass in a dictionary, Code object, or a preset name'
+        )
+
+    try:
+        return _code_cache[key]
+    except KeyError:
+        # evict the oldest entry once the cache is full
+        if len(_code_cache) >= _CODE_CACHE_SIZE:
+            del _code_cache[next(iter(_code_cache))]
+        frozen = _code_cache[key] = FrozenCode(code)
+        return frozen
+
+
+_CODE_CACHE_SIZE = 1024
+_code_cache: Dict[FrozenSet[Tuple[str, Any]], FrozenCode] = {}
+
+
+@lru_cache(maxsize=None)
+def _preset_code(name: str) -> FrozenCode:
+    # presets resolve to the same object as their table contents
+    return get_code(Code(name))
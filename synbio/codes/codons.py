@@ -0,0 +1,213 @@
+import itertools
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from synbio.utils import dNTPs, dna_basepairing, rNTPs, rna_basepairing
+
+__all__ = [
+    # definitions
+    "dna_wobbling", "rna_wobbling",
+    # classes
+    "CodonIndex",
+    # functions
+    "get_codon_index", "index_for",
+]
+
+###############
+# definitions #
+###############
+# define Watson Crick Wobbling Rules
+dna_wobbling = {
+    'T': ['A', 'G'],
+    'C': ['G'],
+    'A': ['T', 'C'],
+    'G': ['T', 'C'],
+    'I': ['A', 'C', 'T']
+}
+rna_wobbling = {
+    'U': ['A', 'G'],
+    'C': ['G'],
+    'A': ['U', 'C'],
+    'G': ['U', 'C'],
+    'I': ['A', 'C', 'U']
+}
+
+_alphabets = {
+    'RNA': (tuple(rNTPs), rna_basepairing, rna_wobbling),
+    'DNA': (tuple(dNTPs), dna_basepairing, dna_wobbling),
+}
+
+
+class CodonIndex:
+    """
+    A class that maps every codon of a given nucleic acid and codon length
+    to an integer, and precomputes the tables that codon-level functions
+    need. A codon's index is its base-a number (a = alphabet size) with
+    nucleotides ordered as in the alphabet, so for RNA triplets index 0 is
+    UUU and index 63 is GGG, matching synbio.utils.triplet_rna_codons.
+
+    Instances are shared; use get_codon_index() rather than the constructor.
+
+    Attributes
+    ----------
+        tuple<str> alphabet: nucleotides in sort order (e.g., U-C-A-G)
+        int length: codon length
+        list<str> codons: every codon, in index order
+        dict position: codon -> index
+        np.ndarray neighbors: (C, L * (a - 1)) index of every codon one
+            point mutation away, ordered by position then alphabet
+        np.ndarray wobble: (C, C) bool; [i, j] is True if the tRNA reading
+            codon i also decodes codon j under the wobble hypothesis
+        np.ndarray decoders: (C, k) the codons whose tRNAs decode each
+            codon (the True rows of each wobble column), padded with -1
+    """
+
+    def __init__(self, nucleic_acid: str = 'RNA', length: int = 3) -> None:
+        try:
+            alphabet, basepairing, wobbling = _alphabets[nucleic_acid.upper()]
+        except KeyError:
+            raise ValueError(
+                'nucleic_acid flag set to invalid option (use DNA or RNA)'
+            )
+        self.nucleic_acid = nucleic_acid.upper()
+        self.alphabet = alphabet
+        self.length = length
+        self.rank = {nt: i for i, nt in enumerate(alphabet)}
+
+        a = len(alphabet)
+        self.weights = a ** np.arange(length - 1, -1, -1)
+        self.codons = [
+            ''.join(tup) for tup in itertools.product(alphabet, repeat=length)
+        ]
+        self.position = {codon: i for i, codon in enumerate(self.codons)}
+
+        # digits[i, p] is the rank of nucleotide p of codon i
+        index = np.arange(len(self.codons))
+        digits = index[:, None] // self.weights % a
+        self.neighbors = index[:, None, None] + (
+            np.arange(a)[None, None, :] - digits[:, :, None]
+        ) * self.weights[None, :, None]
+        # drop the 'mutation' to the codon itself at every position
+        self.neighbors = self.neighbors[
+            self.neighbors != index[:, None, None]
+        ].reshape(len(self.codons), length * (a - 1))
+
+        self.wobble = np.zeros((len(self.codons), len(self.codons)), bool)
+        for i, codon in enumerate(self.codons):
+            anticodon = basepairing[codon[-1]]
+            for nt in wobbling[anticodon]:
+                self.wobble[i, self.position[codon[:-1] + nt]] = True
+
+        columns = [np.flatnonzero(col) for col in self.wobble.T]
+        self.decoders = np.full(
+            (len(self.codons), max(map(len, columns))), -1, dtype=np.intp
+        )
+        for j, rows in enumerate(columns):
+            self.decoders[j, :len(rows)] = rows
+
+        # byte -> nucleotide rank lookup for encoding whole sequences
+        self._lookup = np.full(256, -1, dtype=np.int64)
+        for nt, rank in self.rank.items():
+            self._lookup[ord(nt)] = rank
+            self._lookup[ord(nt.lower())] = rank
+
+        for arr in (self.weights, self.neighbors, self.wobble, self.decoders,
+                    self._lookup):
+            arr.setflags(write=False)
+
+    def __len__(self) -> int:
+        return len(self.codons)
+
+    def __repr__(self) -> str:
+        return f"CodonIndex('{self.nucleic_acid}', {self.length})"
+
+    def __reduce__(self):
+        return get_codon_index, (self.nucleic_acid, self.length)
+
+    def encode(self, seq: Union[str, Iterable[str]]) -> np.ndarray:
+        """
+        A method that converts a sequence (or an iterable of codons) into an
+        int array of codon indices, reading the sequence in frame from its
+        first base. Trailing bases that do not fill a codon are ignored.
+
+        Parameters
+        ----------
+            str seq: nucleotide sequence, or iterable of codons
+
+        Returns
+        -------
+            np.ndarray ix: (len(seq) // length,) int array
+        """
+        if not isinstance(seq, str):
+            seq = ''.join(seq)
+        n = len(seq) // self.length * self.length
+        ranks = self._lookup[np.frombuffer(seq[:n].encode(), dtype=np.uint8)]
+        if (ranks < 0).any():
+            bad = seq[int(np.argmax(ranks < 0))]
+            raise ValueError(
+                f"'{bad}' is not a valid {self.nucleic_acid} nucleotide"
+            )
+        return ranks.reshape(-1, self.length) @ self.weights
+
+    def decode(self, ix: Iterable[int]) -> List[str]:
+        """
+        A method that converts codon indices back into codon strings
+        """
+        return [self.codons[i] for i in np.asarray(ix).ravel().tolist()]
+
+    def sort_key(self, word: str) -> Tuple[int, ...]:
+        """
+        A method that returns the sort key of a nucleotide word (of any
+        length); raises KeyError for characters outside the alphabet
+        """
+        return tuple(map(self.rank.__getitem__, word))
+
+    def labels(
+            self,
+            tables: Union[Dict[str, object], Sequence[Dict[str, object]]],
+            missing: Optional[object] = None
+    ) -> Tuple[np.ndarray, List[object]]:
+        """
+        A method that encodes one or many codon -> signal tables as an
+        (N, C) int array of labels, along with the signal each label stands
+        for. Equal labels mean equal signals, so integer comparisons stand
+        in for comparing the tables' values. Codons missing from a table
+        raise KeyError, unless a missing signal to fill them with is given.
+        """
+        if isinstance(tables, dict):
+            tables = [tables]
+        values = {}
+        labels = np.array([
+            [values.setdefault(
+                table[codon] if missing is None else table.get(codon, missing),
+                len(values)
+            ) for codon in self.codons]
+            for table in tables
+        ], dtype=np.int64).reshape(-1, len(self.codons))
+        return labels, list(values)
+
+
+def get_codon_index(nucleic_acid: str = 'RNA', length: int = 3) -> CodonIndex:
+    """
+    A function that returns the (cached) CodonIndex for a nucleic acid
+    ('RNA' or 'DNA') and codon length
+    """
+    return _get_codon_index(nucleic_acid.upper(), int(length))
+
+
+@lru_cache(maxsize=None)
+def _get_codon_index(nucleic_acid: str, length: int) -> CodonIndex:
+    return CodonIndex(nucleic_acid, length)
+
+
+def index_for(codons: Iterable[str]) -> CodonIndex:
+    """
+    A function that returns the CodonIndex matching a collection of codons
+    (e.g., the keys of a codon table). Codons containing T are read as DNA,
+    all others as RNA.
+    """
+    codons = list(codons) or ['UUU']
+    nucleic_acid = 'DNA' if any('T' in c.upper() for c in codons) else 'RNA'
+    return get_codon_index(nucleic_acid, len(codons[0]))
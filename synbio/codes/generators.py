@@ -1,24 +1,190 @@
-from random import choice
-from typing import Iterable
+from typing import Dict, Iterable, Iterator, Mapping, Optional, Union
 
+import numpy as np
+
+from synbio.codes import metrics
 from synbio.codes import utils as codeutils
 from .code import Code
 
+__all__ = [
+    "Red20Space", "red20",
+]
+
+# number of packed integers red20 draws from its rng at a time
+_DRAW_BATCH = 2 ** 10
 
-def red20() -> Iterable[Code]:
+
+class Red20Space:
+    """
+    The space of RED20 codes derived from a parent code: each amino acid
+    (and stop) keeps exactly one of its codons and every other codon is
+    null ('0'). A RED20 code is the tuple of chosen synonym positions,
+    packed into a single integer as a mixed-radix number whose digits are
+    the choices for each amino acid (in the order of the parent's rmap)
+    and whose radices are the synonym counts. Packing is exact, so codes
+    can be indexed, enumerated and deduplicated as plain integers:
+
+    >>> space = Red20Space()
+    >>> len(space)              # product of synonym counts
+    1019215872
+    >>> space.encode(space[12345])
+    12345
+    """
+
+    def __init__(self, code: Union[str, Mapping[str, str]] = 'STANDARD'):
+        rmap = {
+            aa: codons for aa, codons in Code(code).rmap().items()
+            if aa != '0'
+        }
+        self.aminoacids = list(rmap)
+        self.synonyms = [list(codons) for codons in rmap.values()]
+        self.radices = [len(codons) for codons in self.synonyms]
+        # place value of each digit; the first amino acid is most significant
+        self._place = [1] * len(self.radices)
+        for i in range(len(self.radices) - 2, -1, -1):
+            self._place[i] = self._place[i + 1] * self.radices[i + 1]
+        self.size = self._place[0] * self.radices[0]
+
+        self._position = {
+            codon: i for i, codon in enumerate(codeutils.triplet_rna_codons)
+        }
+        self._choice_ix = [
+            np.array([self._position[c] for c in codons], dtype=np.intp)
+            for codons in self.synonyms
+        ]
+        self._aa_ix = [metrics.signal_index[aa] for aa in self.aminoacids]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, n: int) -> Dict[str, str]:
+        if n < 0:
+            n += self.size
+        if not 0 <= n < self.size:
+            raise IndexError('RED20 code index out of range')
+        code = dict.fromkeys(codeutils.triplet_rna_codons, '0')
+        for aa, codons, place, radix in zip(
+                self.aminoacids, self.synonyms, self._place, self.radices):
+            code[codons[n // place % radix]] = aa
+        return code
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return (self[n] for n in range(self.size))
+
+    def encode(self, code: Mapping[str, str]) -> int:
+        """
+        A method that packs a RED20 code from this space into its integer
+        """
+        n = 0
+        for aa, codons, place in zip(
+                self.aminoacids, self.synonyms, self._place):
+            chosen = [i for i, c in enumerate(codons) if code[c] == aa]
+            if len(chosen) != 1:
+                raise ValueError(
+                    f"code is not a RED20 code of this space ({aa} is "
+                    f"encoded by {len(chosen)} of its codons)"
+                )
+            n += chosen[0] * place
+        return n
+
+    def decode_array(self, indices: Iterable[int]) -> np.ndarray:
+        """
+        A method that decodes many packed integers at once into an (N, 64)
+        int8 array (see metrics.encode_codes)
+        """
+        indices = np.asarray(indices, dtype=np.int64).ravel()
+        codes = np.full(
+            (len(indices), len(self._position)), metrics.signal_index['0'],
+            dtype=np.int8
+        )
+        rows = np.arange(len(indices))
+        for aa, choices, place, radix in zip(
+                self._aa_ix, self._choice_ix, self._place, self.radices):
+            codes[rows, choices[indices // place % radix]] = aa
+        return codes
+
+    def sample(
+            self,
+            n: int,
+            rng: Optional[Union[int, np.random.Generator,
+                                np.random.SeedSequence]] = None
+    ) -> np.ndarray:
+        """
+        A method that draws n distinct packed integers uniformly at random
+        (without replacement); decode them with decode_array or []
+        """
+        rng = np.random.default_rng(rng)
+        return rng.choice(self.size, size=n, replace=False, shuffle=True)
+
+
+class _SeenSet:
+    """
+    A private, compact set of integers in [0, size): a bitset when that
+    fits in a few MB, otherwise a sorted int64 array that recent additions
+    are merged into in batches. Batches grow with the array, so merging
+    costs O(log n) amortized per addition rather than O(n).
+    """
+    BITSET_LIMIT = 2 ** 25
+    BUFFER_SIZE = 2 ** 12
+
+    def __init__(self, size: int) -> None:
+        if size <= self.BITSET_LIMIT:
+            self._bits = np.zeros(-(-size // 8), dtype=np.uint8)
+        else:
+            self._bits = None
+            self._sorted = np.empty(0, dtype=np.int64)
+            self._buffer = set()
+
+    def add(self, n: int) -> bool:
+        """adds n; returns False if n was already present"""
+        if self._bits is not None:
+            byte, mask = n >> 3, 1 << (n & 7)
+            if self._bits[byte] & mask:
+                return False
+            self._bits[byte] |= mask
+            return True
+
+        if n in self._buffer:
+            return False
+        i = np.searchsorted(self._sorted, n)
+        if i < len(self._sorted) and self._sorted[i] == n:
+            return False
+        self._buffer.add(n)
+        if len(self._buffer) >= max(self.BUFFER_SIZE, len(self._sorted) // 8):
+            self._merge()
+        return True
+
+    def _merge(self) -> None:
+        # buffered values are never in the array, so a sorted insert of the
+        # (small) buffer replaces a full union
+        batch = np.sort(np.fromiter(self._buffer, dtype=np.int64))
+        self._sorted = np.insert(
+            self._sorted, np.searchsorted(self._sorted, batch), batch
+        )
+        self._buffer.clear()
+
+
+def red20(
+        code: Union[str, Mapping[str, str]] = 'STANDARD',
+        rng: Optional[Union[int, np.random.Generator,
+                            np.random.SeedSequence]] = None
+) -> Iterable[Dict]:
     """
     A generator that randomly generates a stream of RED20 codes as python
-    dictionaries without yielding repeated codes
+    dictionaries without yielding repeated codes. Codes are drawn with rng
+    (a seed or np.random.Generator, as in Red20Space.sample) and
+    deduplicated by their packed integer (see Red20Space); the stream ends
+    once every code has been yielded.
     """
-    rmap = Code().rmap()
-    cache = set()
-
-    while True:
-        code = {codon: "0" for codon in codeutils.triplet_rna_codons}
-        choices = [(choice(c_set), aa) for aa, c_set in rmap.items()]
-        code.update(choices)
-        hashed = hash(str(code))
-
-        if hashed not in cache:
-            cache.add(hashed)
-            yield code
+    space = Red20Space(code)
+    seen = _SeenSet(len(space))
+    remaining = len(space)
+    rng = np.random.default_rng(rng)
+
+    while remaining:
+        for n in rng.integers(len(space), size=_DRAW_BATCH).tolist():
+            if seen.add(n):
+                remaining -= 1
+                yield space[n]
+                if not remaining:
+                    return
@@ -0,0 +1,862 @@
+import itertools
+from dataclasses import dataclass
+from typing import (
+    Callable, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional,
+    Tuple, Union,
+)
+
+import numpy as np
+
+from synbio.codes import utils as codeutils
+from synbio.codes.codons import CodonIndex, get_codon_index, index_for
+from synbio.utils import aminoacids, kdHydrophobicity, rNTPs, triplet_rna_codons
+
+__all__ = [
+    # definitions
+    "signals", "signal_index",
+    # encoding
+    "encode_codes", "decode_code", "neighbor_index", "property_vector",
+    # batch metrics
+    "silencicity", "mutability", "pairwise_metric",
+    # promiscuity
+    "decoded_signals", "is_ambiguous", "promiscuity",
+    # translation
+    "TranslationSummary", "encode_sequence", "translate_codes",
+    "decode_proteins", "translation_summary",
+    # ambiguous translation
+    "ProteinSet", "encode_signal_sets", "translate_ambiguous",
+    # mutation effects
+    "SYNONYMOUS", "NONSYNONYMOUS", "NONSENSE", "MutationEffects",
+    "mutation_effects",
+    # incremental metrics
+    "CodeState",
+]
+
+###############
+# definitions #
+###############
+# every signal a codon can encode: amino acids, stop ('*') and null ('0')
+signals = aminoacids + ['0']
+signal_index = {signal: i for i, signal in enumerate(signals)}
+
+# number of codes scored at once; bounds the (batch, 64, 9) intermediates
+BATCH_SIZE = 2 ** 10
+
+
+############
+# encoding #
+############
+def encode_codes(
+        codes: Union[Mapping[str, str], Iterable[Mapping[str, str]]],
+        codons: List[str] = triplet_rna_codons) -> np.ndarray:
+    """
+    A function that encodes one or many genetic codes as an (N, 64) int8
+    array, where entry [n, i] is the index (into signals) of the amino acid
+    that code n assigns to codons[i].
+
+    Parameters
+    ----------
+        dict or iterable<dict> codes: code(s) to encode
+        list<str> codons: codon order of the array columns
+
+    Returns
+    -------
+        np.ndarray arr: (N, len(codons)) int8 array of signal indices
+    """
+    if isinstance(codes, Mapping):
+        codes = [codes]
+    try:
+        rows = [
+            [signal_index[code[codon]] for codon in codons]
+            for code in codes
+        ]
+    except KeyError as err:
+        raise ValueError(
+            f"cannot encode code: {err} is not a codon or a valid signal "
+            f"(promiscuous codes cannot be encoded)"
+        )
+    return np.array(rows, dtype=np.int8).reshape(-1, len(codons))
+
+
+def decode_code(
+        row: np.ndarray,
+        codons: List[str] = triplet_rna_codons) -> Dict[str, str]:
+    """
+    A function that converts a single row of an encoded code array back
+    into a codon -> amino acid dict
+    """
+    return {codon: signals[ix] for codon, ix in zip(codons, row.tolist())}
+
+
+def neighbor_index(
+        codons: List[str] = triplet_rna_codons,
+        NTPs: List[str] = rNTPs) -> np.ndarray:
+    """
+    A function that returns a (len(codons), L * (len(NTPs) - 1)) int array
+    whose row i holds the column indices of all codons one point mutation
+    away from codons[i]. For triplet codons this is (64, 9).
+    """
+    index = index_for(codons)
+    if tuple(NTPs) == index.alphabet and list(codons) == index.codons:
+        return index.neighbors
+    position = {codon: i for i, codon in enumerate(codons)}
+    return np.array([
+        [
+            position[codon[:i] + nt + codon[i + 1:]]
+            for i, base in enumerate(codon)
+            for nt in NTPs if nt != base
+        ]
+        for codon in codons
+    ], dtype=np.intp)
+
+
+_triplet_neighbors = get_codon_index('RNA', 3).neighbors
+
+
+def _default_index(n_codons: int, nucleic_acid: str = 'RNA') -> CodonIndex:
+    # codon index whose size matches the number of columns (64, 256, ...)
+    length = int(round(np.log(n_codons) / np.log(4)))
+    if 4 ** length != n_codons:
+        raise ValueError(
+            f"cannot infer codon length for {n_codons} columns"
+        )
+    return get_codon_index(nucleic_acid, length)
+
+
+def property_vector(metric: Mapping[str, float]) -> np.ndarray:
+    """
+    A function that converts an amino acid -> float mapping (e.g.,
+    kdHydrophobicity or PRS) into a lookup vector aligned with signals.
+    Signals missing from the mapping are set to NaN.
+    """
+    return np.array(
+        [metric.get(signal, np.nan) for signal in signals], dtype=float
+    )
+
+
+#################
+# batch metrics #
+#################
+def _as_batch(codes: np.ndarray) -> np.ndarray:
+    codes = np.asarray(codes)
+    if codes.ndim == 1:
+        codes = codes[None, :]
+    return codes
+
+
+def _neighbor_pairs(codes: np.ndarray, neighbors: Optional[np.ndarray]):
+    # yields (aa1, aa2) arrays of shape (batch, n_codons, n_neighbors)
+    if neighbors is None:
+        neighbors = _default_index(codes.shape[1]).neighbors
+    for i in range(0, len(codes), BATCH_SIZE):
+        batch = codes[i:i + BATCH_SIZE]
+        yield batch[:, :, None], batch[:, neighbors]
+
+
+def silencicity(
+        codes: np.ndarray,
+        neighbors: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    A function that computes the silencicity (fraction of all point
+    mutations that are synonymous) of every code in an encoded array. See
+    synbio.codes.utils.silencicity.
+
+    Parameters
+    ----------
+        np.ndarray codes: (N, 64) array from encode_codes
+        np.ndarray neighbors: optional neighbor array from neighbor_index
+            (default: RNA codons of the length implied by the columns)
+
+    Returns
+    -------
+        np.ndarray silencicity: (N,) float array
+    """
+    codes = _as_batch(codes)
+    return np.concatenate([
+        np.count_nonzero(aa1 == aa2, axis=(1, 2)) / aa2[0].size
+        for aa1, aa2 in _neighbor_pairs(codes, neighbors)
+    ] or [np.empty(0)])
+
+
+def pairwise_metric(
+        codes: np.ndarray,
+        matrix: Union[np.ndarray, Callable[..., np.ndarray]],
+        neighbors: Optional[np.ndarray] = None,
+        include_synonymous: bool = False) -> np.ndarray:
+    """
+    A function that computes the mean of a pairwise amino acid metric over
+    all (by default nonsynonymous) point mutations of every code in an
+    encoded array.
+
+    Parameters
+    ----------
+        np.ndarray codes: (N, 64) array from encode_codes
+        matrix: either a (len(signals), len(signals)) array of pairwise
+            values, or a vectorized callable f(aa1, aa2) of signal indices
+        np.ndarray neighbors: optional neighbor array from neighbor_index
+            (default: RNA codons of the length implied by the columns)
+        bool include_synonymous: whether synonymous mutations are counted
+
+    Returns
+    -------
+        np.ndarray metric: (N,) float array; 0 for codes without any
+            counted mutations. Pairs with a NaN value are ignored.
+    """
+    codes = _as_batch(codes)
+    if not callable(matrix):
+        flat_matrix = np.asarray(matrix, dtype=float).ravel()
+    out = []
+    for aa1, aa2 in _neighbor_pairs(codes, neighbors):
+        aa1 = np.broadcast_to(aa1, aa2.shape)
+        if callable(matrix):
+            values = np.asarray(matrix(aa1, aa2), dtype=float)
+        else:
+            # gather through a flat index; cheaper than 2D fancy indexing
+            flat_ix = aa1.astype(np.intp) * len(signals) + aa2
+            values = flat_matrix[flat_ix]
+
+        counted = ~np.isnan(values)
+        if not include_synonymous:
+            counted &= aa1 != aa2
+        totals = np.where(counted, values, 0).sum(axis=(1, 2))
+        counts = counted.sum(axis=(1, 2))
+        out.append(
+            np.divide(totals, counts, out=np.zeros_like(totals),
+                      where=counts > 0)
+        )
+    return np.concatenate(out or [np.empty(0)])
+
+
+def mutability(
+        codes: np.ndarray,
+        metric: Mapping[str, float] = kdHydrophobicity,
+        neighbors: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    A function that computes the mutability (mean absolute change in an
+    amino acid property over nonsynonymous point mutations) of every code
+    in an encoded array. See synbio.codes.utils.mutability.
+
+    Parameters
+    ----------
+        np.ndarray codes: (N, 64) array from encode_codes
+        dict metric: amino acid property (default: kdHydrophobicity; PRS
+            is also supported)
+        np.ndarray neighbors: optional neighbor array from neighbor_index
+            (default: RNA codons of the length implied by the columns)
+
+    Returns
+    -------
+        np.ndarray mutability: (N,) float array
+    """
+    values = property_vector(metric)
+    matrix = np.abs(values[:, None] - values[None, :])
+    return pairwise_metric(codes, matrix, neighbors=neighbors)
+
+
+###############
+# promiscuity #
+###############
+def decoded_signals(
+        codes: np.ndarray,
+        nucleic_acid: str = 'RNA') -> np.ndarray:
+    """
+    A function that finds, for every codon of every code in an encoded
+    array, the signals whose tRNAs decode it when tRNA promiscuity (Crick
+    wobble) is considered. Uses the wobble decoding matrix of the codon
+    index (see synbio.codes.codons.CodonIndex).
+
+    Parameters
+    ----------
+        np.ndarray codes: (N, C) array from encode_codes
+        str nucleic_acid: 'RNA' or 'DNA' codons
+
+    Returns
+    -------
+        np.ndarray decoded: (N, C) int32 bitmask; bit s is set if a tRNA
+            charged with signals[s] decodes the codon. Null ('0') codons
+            have no tRNA and set no bits.
+    """
+    codes = _as_batch(codes).astype(np.int32)
+    index = _default_index(codes.shape[1], nucleic_acid)
+    bits = np.where(codes == signal_index['0'], 0, 1 << codes)
+    # an extra zero column absorbs the -1 padding of the decoders table
+    bits = np.concatenate(
+        [bits, np.zeros((len(bits), 1), dtype=bits.dtype)], axis=1
+    )
+    return np.bitwise_or.reduce(bits[:, index.decoders], axis=2)
+
+
+def is_ambiguous(codes: np.ndarray, nucleic_acid: str = 'RNA') -> np.ndarray:
+    """
+    A function that checks every code in an encoded array for ambiguity
+    upon promiscuity (some codon decoded by tRNAs of two different
+    signals). See synbio.codes.utils.is_ambiguous.
+
+    Returns
+    -------
+        np.ndarray ambiguous: (N,) bool array
+    """
+    codes = _as_batch(codes)
+    return np.concatenate([
+        _multiple_bits(decoded_signals(batch, nucleic_acid)).any(axis=1)
+        for batch in (
+            codes[i:i + BATCH_SIZE] for i in range(0, len(codes), BATCH_SIZE)
+        )
+    ] or [np.empty(0, dtype=bool)])
+
+
+def promiscuity(
+        codes: np.ndarray,
+        allow_ambiguous: bool = False,
+        nucleic_acid: str = 'RNA') -> np.ndarray:
+    """
+    A function that expands every code in an encoded array into the code
+    that results from tRNA promiscuity. See
+    synbio.codes.utils.promiscuity.
+
+    Parameters
+    ----------
+        np.ndarray codes: (N, C) array from encode_codes
+        bool allow_ambiguous: if False, raise ValueError for ambiguous codes
+        str nucleic_acid: 'RNA' or 'DNA' codons
+
+    Returns
+    -------
+        np.ndarray promiscuous: (N, C) int8 array of signal indices, with
+            -1 for ambiguous codons (only when allow_ambiguous is True)
+    """
+    decoded = decoded_signals(codes, nucleic_acid)
+    ambiguous = _multiple_bits(decoded)
+    if ambiguous.any() and not allow_ambiguous:
+        raise ValueError(
+            'input code generates ambiguous code upon promiscuization'
+        )
+    # the exponent of a single set bit is its signal index
+    signal = np.frexp(decoded)[1] - 1
+    signal[decoded == 0] = signal_index['0']
+    signal[ambiguous] = -1
+    return signal.astype(np.int8)
+
+
+def _multiple_bits(mask: np.ndarray) -> np.ndarray:
+    return (mask & (mask - 1)) != 0
+
+
+###############
+# translation #
+###############
+CodesType = Union[np.ndarray, Mapping[str, str], Iterable[Mapping[str, str]]]
+
+
+def _as_code_array(codes: CodesType) -> np.ndarray:
+    if isinstance(codes, np.ndarray):
+        return _as_batch(codes)
+    if isinstance(codes, Mapping):
+        codes = [codes]
+    codes = list(codes)
+    return encode_codes(codes, index_for(codes[0]).codons)
+
+
+def encode_sequence(seq: str, codon_length: int = 3) -> np.ndarray:
+    """
+    A function that splits an RNA or DNA open reading frame into codons
+    once, as an int array of codon indices usable as column indices of
+    encoded code arrays (RNA and DNA codons share indices, e.g., UUU and
+    TTT are both 0). Raises ValueError if the length is not divisible by
+    codon_length.
+    """
+    seq = str(seq)
+    if len(seq) % codon_length != 0:
+        raise ValueError(f"seq is not divisible by n ({codon_length})")
+    nucleic_acid = 'DNA' if 'T' in seq.upper() else 'RNA'
+    return get_codon_index(nucleic_acid, codon_length).encode(seq)
+
+
+def translate_codes(
+        seq: Union[str, np.ndarray],
+        codes: CodesType) -> np.ndarray:
+    """
+    A function that translates one sequence under many genetic codes at
+    once. The sequence is split into codons a single time and translated
+    by gathering from the (N, C) code array.
+
+    Parameters
+    ----------
+        seq: RNA/DNA sequence, or codon indices from encode_sequence
+        codes: (N, C) array from encode_codes, or code dict(s)
+
+    Returns
+    -------
+        np.ndarray proteins: (N, L) int8 array of signal indices; use
+            decode_proteins to get strings
+    """
+    codes = _as_code_array(codes)
+    if isinstance(seq, np.ndarray):
+        codon_ix = seq
+    else:
+        codon_ix = encode_sequence(seq, _default_index(codes.shape[1]).length)
+    return codes[:, codon_ix]
+
+
+def decode_proteins(proteins: np.ndarray) -> List[str]:
+    """
+    A function that converts an (N, L) array from translate_codes into
+    protein strings
+    """
+    lookup = np.array(signals)
+    return [''.join(row) for row in lookup[_as_batch(proteins)].tolist()]
+
+
+@dataclass
+class TranslationSummary:
+    """
+    Per-code summaries of translating one sequence under N codes (see
+    translation_summary). Positions are codon indices; -1 means none.
+    """
+    first_stop: np.ndarray
+    n_stops: np.ndarray
+    n_null: np.ndarray
+    identity: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.identity)
+
+
+def translation_summary(
+        seq: Union[str, np.ndarray],
+        codes: CodesType,
+        reference: Optional[Mapping[str, str]] = None) -> TranslationSummary:
+    """
+    A function that translates one sequence under many codes and
+    summarizes each translation in a single vectorized pass
+
+    Parameters
+    ----------
+        seq: RNA/DNA sequence, or codon indices from encode_sequence
+        codes: (N, C) array from encode_codes, or code dict(s)
+        dict reference: code whose translation identity is measured
+            against (default: the standard code)
+
+    Returns
+    -------
+        TranslationSummary summary: first stop position, number of stops,
+            number of null ('0') codons, and fraction of positions
+            identical to the reference translation, each an (N,) array
+    """
+    if reference is None:
+        reference = codeutils.standard_code
+    codes = _as_code_array(codes)
+    if not isinstance(seq, np.ndarray):
+        # split the sequence once for both the codes and the reference
+        seq = encode_sequence(seq, _default_index(codes.shape[1]).length)
+    proteins = translate_codes(seq, codes)
+    expected = translate_codes(seq, reference)
+
+    stops = proteins == signal_index['*']
+    has_stop = stops.any(axis=1)
+    length = proteins.shape[1]
+    return TranslationSummary(
+        first_stop=np.where(has_stop, stops.argmax(axis=1), -1),
+        n_stops=stops.sum(axis=1),
+        n_null=(proteins == signal_index['0']).sum(axis=1),
+        identity=(
+            (proteins == expected).sum(axis=1) / length if length
+            else np.ones(len(proteins))
+        ),
+    )
+
+
+#########################
+# ambiguous translation #
+#########################
+def encode_signal_sets(
+        code: Mapping[str, Union[str, Iterable[str]]]) -> np.ndarray:
+    """
+    A function that encodes a possibly ambiguous code (codons may map to a
+    tuple of signals, see synbio.codes.utils.promiscuity) as a bitmask per
+    codon, in codon index order: bit s is set if the codon may be read as
+    signals[s]. Null codons set the bit of '0'.
+
+    Returns
+    -------
+        np.ndarray masks: (C,) int32 array
+    """
+    index = index_for(code)
+    masks = np.zeros(len(index), dtype=np.int32)
+    for codon, value in code.items():
+        for signal in ((value,) if isinstance(value, str) else value):
+            if signal not in signal_index:
+                raise ValueError(f"cannot encode code: {signal} is not a "
+                                 f"valid signal")
+            masks[index.position[codon]] |= 1 << signal_index[signal]
+    return masks
+
+
+class ProteinSet:
+    """
+    A compact representation of every protein a sequence may translate to
+    under an ambiguous code: one bitmask of possible signals per position
+    (see encode_signal_sets). Proteins are never materialized up front;
+    the set is counted in closed form (size, an exact int that len()
+    returns when it fits in an index), and proteins are decoded on demand
+    by their mixed-radix index (digits are the choices at each ambiguous
+    position, the first position being most significant), enumerated
+    lazily, or sampled uniformly.
+
+    >>> code = {'AUG': 'M', 'AUA': ('I', 'M')}
+    >>> proteins = translate_ambiguous('AUGAUA', code)
+    >>> str(proteins), len(proteins)
+    ('M[IM]', 2)
+    >>> list(proteins)
+    ['MI', 'MM']
+    """
+
+    def __init__(self, masks: np.ndarray) -> None:
+        self.masks = np.asarray(masks, dtype=np.int32)
+        self.masks.setflags(write=False)
+        # possible signal indices at each position, ascending
+        self.options = [
+            [s for s in range(len(signals)) if mask >> s & 1]
+            for mask in self.masks.tolist()
+        ]
+        self.ambiguous_positions = np.flatnonzero(
+            _multiple_bits(self.masks)
+        )
+        self.size = 1
+        for p in self.ambiguous_positions.tolist():
+            self.size *= len(self.options[p])
+
+    @property
+    def length(self) -> int:
+        """number of positions (codons) of every protein in the set"""
+        return len(self.masks)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __str__(self) -> str:
+        return ''.join(
+            signals[opts[0]] if len(opts) == 1 else
+            '[' + ''.join(signals[s] for s in opts) + ']'
+            for opts in self.options
+        )
+
+    def __repr__(self) -> str:
+        return f"ProteinSet('{self}')"
+
+    def __contains__(self, protein: str) -> bool:
+        if not isinstance(protein, str) or len(protein) != self.length:
+            return False
+        try:
+            bits = np.array(
+                [1 << signal_index[aa] for aa in protein], dtype=np.int32
+            )
+        except KeyError:
+            return False
+        return bool((bits & self.masks).all())
+
+    def __getitem__(self, n: int) -> str:
+        if n < 0:
+            n += self.size
+        if not 0 <= n < self.size:
+            raise IndexError('ProteinSet index out of range')
+        choice = [opts[0] for opts in self.options]
+        for p in self.ambiguous_positions[::-1].tolist():
+            n, digit = divmod(n, len(self.options[p]))
+            choice[p] = self.options[p][digit]
+        return ''.join(signals[s] for s in choice)
+
+    def __iter__(self) -> Iterator[str]:
+        return (
+            ''.join(signals[s] for s in choice)
+            for choice in itertools.product(*self.options)
+        )
+
+    def sample(
+            self,
+            n: int,
+            rng: Optional[Union[int, np.random.Generator]] = None
+    ) -> List[str]:
+        """
+        A method that draws n proteins uniformly at random (with
+        replacement), choosing independently at every ambiguous position
+        """
+        rng = np.random.default_rng(rng)
+        width = max(map(len, self.options), default=1)
+        table = np.zeros((self.length, width), dtype=np.int8)
+        counts = np.zeros(self.length, dtype=np.int64)
+        for p, opts in enumerate(self.options):
+            table[p, :len(opts)] = opts
+            counts[p] = len(opts)
+        choice = (rng.random((n, self.length)) * counts).astype(np.intp)
+        return decode_proteins(table[np.arange(self.length), choice])
+
+
+def translate_ambiguous(
+        seq: Union[str, np.ndarray],
+        code: Mapping[str, Union[str, Iterable[str]]]) -> ProteinSet:
+    """
+    A function that translates a sequence under a possibly ambiguous code
+    (codons mapped to tuples of signals) into the set of all proteins it
+    may encode, as a ProteinSet
+
+    Parameters
+    ----------
+        seq: RNA/DNA sequence, or codon indices from encode_sequence
+        dict code: codon -> signal or tuple of signals
+
+    Returns
+    -------
+        ProteinSet proteins: per-position signal bitmasks
+    """
+    masks = encode_signal_sets(code)
+    if isinstance(seq, np.ndarray):
+        codon_ix = seq
+    else:
+        codon_ix = encode_sequence(seq, index_for(code).length)
+    masks = masks[codon_ix]
+    if not masks.all():
+        bad = get_codon_index('RNA', index_for(code).length).codons[
+            codon_ix[np.argmin(masks != 0)]
+        ]
+        raise KeyError(f"codon {bad} is not in the code")
+    return ProteinSet(masks)
+
+
+####################
+# mutation effects #
+####################
+# categories of point mutations in MutationEffects.category
+SYNONYMOUS, NONSYNONYMOUS, NONSENSE = 0, 1, 2
+
+
+@dataclass
+class MutationEffects:
+    """
+    The effects of every point mutation of a coding sequence (see
+    mutation_effects). Row i is nucleotide i of the sequence; the columns
+    are its alternative bases, in alphabet order.
+    """
+    bases: np.ndarray
+    category: np.ndarray
+    delta: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.category)
+
+
+def mutation_effects(
+        seq: str,
+        code: Optional[Mapping[str, str]] = None,
+        metric: Mapping[str, float] = kdHydrophobicity) -> MutationEffects:
+    """
+    A function that classifies every single-nucleotide substitution of a
+    coding sequence under a genetic code, in one pass: each codon is
+    looked up in the precomputed point-mutant table of the codon index
+    (CodonIndex.neighbors), whose (3 positions x 3 alternatives) layout is
+    exactly three rows of the output.
+
+    A substitution is SYNONYMOUS if the signal is unchanged, NONSENSE if
+    it creates a stop ('*') and NONSYNONYMOUS otherwise (including the
+    loss of a stop, or a change to or from a null codon).
+
+    Parameters
+    ----------
+        str seq: RNA/DNA open reading frame
+        dict code: genetic code (default: the standard code)
+        dict metric: amino acid property (default: kdHydrophobicity)
+
+    Returns
+    -------
+        MutationEffects effects: (L, a - 1) arrays of the alternative
+            bases (str), categories (int8) and property changes (float;
+            NaN when either signal is missing from metric)
+    """
+    if code is None:
+        code = codeutils.standard_code
+    seq = str(seq)
+    codon_ix = encode_sequence(seq, index_for(code).length)
+    index = get_codon_index(
+        'DNA' if 'T' in seq.upper() else 'RNA', index_for(code).length
+    )
+    # DNA and RNA codons share indices, so the code may be either
+    encoded = encode_codes(code, index_for(code).codons)[0]
+    alternatives = index.neighbors.shape[1] // index.length
+
+    # (K, length * alternatives) mutant codons -> (L, alternatives)
+    mutants = index.neighbors[codon_ix].reshape(-1, alternatives)
+    wild = np.repeat(encoded[codon_ix], index.length)[:, None]
+    mutant = encoded[mutants]
+
+    category = np.full(mutant.shape, NONSYNONYMOUS, dtype=np.int8)
+    category[mutant == wild] = SYNONYMOUS
+    category[(mutant == signal_index['*']) & (wild != signal_index['*'])] = \
+        NONSENSE
+    values = property_vector(metric)
+
+    # the alternatives to each base are the alphabet without it
+    a = len(index.alphabet)
+    ranks = (codon_ix[:, None] // index.weights % a).ravel()
+    others = np.array([
+        [nt for nt in index.alphabet if nt != base] for base in index.alphabet
+    ])
+    bases = others[ranks]
+    return MutationEffects(
+        bases=bases,
+        category=category,
+        delta=values[mutant] - values[wild],
+    )
+
+
+#######################
+# incremental metrics #
+#######################
+class CodeState:
+    """
+    A class that tracks the silencicity and mutability of a single code
+    under a fixed block structure, and updates them incrementally when one
+    block is reassigned to a different amino acid. Only the mutation pairs
+    touching the reassigned block are rescored, so a step costs
+    O(block size * neighbors) instead of a full pass over all 576 pairs.
+
+    Reassignments made with apply() can be undone with revert(), which
+    makes the class suitable for local search (e.g., simulated annealing):
+
+    >>> state = CodeState(codeutils.standard_code, 'standard')
+    >>> before = state.silencicity
+    >>> state.apply(0, 'W')         # block 0 (UUU, UUC): F -> W
+    >>> state.silencicity < before
+    True
+    >>> state.revert()
+    >>> state.silencicity == before
+    True
+    """
+
+    def __init__(
+            self,
+            code: Union[Mapping[str, str], np.ndarray],
+            block_structure: Union[str, Dict] = 'standard',
+            metric: Mapping[str, float] = kdHydrophobicity
+    ) -> None:
+        if isinstance(code, Mapping):
+            code = encode_codes(code)[0]
+        # steps touch a few dozen pairs, where plain python lists beat
+        # numpy's per-call overhead
+        self._aa = np.asarray(code, dtype=np.int8).reshape(-1).tolist()
+
+        blocks = codeutils.get_block_structure(block_structure)
+        codon_index = {c: i for i, c in enumerate(triplet_rna_codons)}
+        self.blocks = {
+            block: [codon_index[c] for c in codons]
+            for block, codons in blocks.items()
+        }
+        for block, ix in self.blocks.items():
+            if len(set(self._aa[i] for i in ix)) > 1:
+                raise ValueError(
+                    f"code does not conform to block structure (block "
+                    f"{block} encodes more than one amino acid)"
+                )
+
+        values = property_vector(metric)
+        self._matrix = np.abs(values[:, None] - values[None, :]).tolist()
+
+        neighbors = _triplet_neighbors.tolist()
+        self._all_pairs = [
+            (i, j) for i, row in enumerate(neighbors) for j in row
+        ]
+        # every ordered mutation pair touching each block, without repeats
+        self._block_pairs = {}
+        for block, ix in self.blocks.items():
+            inside = set(ix)
+            self._block_pairs[block] = [
+                pair
+                for i in ix
+                for j in neighbors[i]
+                for pair in ([(i, j), (j, i)] if j not in inside else [(i, j)])
+            ]
+
+        self.n_pairs = len(self._all_pairs)
+        self._syn, self._nonsyn, self._total = self._score(self._all_pairs)
+        self._history = []
+
+    def _score(self, pairs: List[Tuple[int, int]]) -> Tuple[int, int, float]:
+        # (synonymous count, counted nonsynonymous count, metric total)
+        aa, matrix = self._aa, self._matrix
+        syn = nonsyn = 0
+        total = 0.0
+        for i, j in pairs:
+            aa1, aa2 = aa[i], aa[j]
+            if aa1 == aa2:
+                syn += 1
+            else:
+                value = matrix[aa1][aa2]
+                if value == value:  # skip NaN (undefined property)
+                    nonsyn += 1
+                    total += value
+        return syn, nonsyn, total
+
+    @property
+    def codes(self) -> np.ndarray:
+        return np.array(self._aa, dtype=np.int8)
+
+    @property
+    def silencicity(self) -> float:
+        return self._syn / self.n_pairs
+
+    @property
+    def mutability(self) -> float:
+        return self._total / self._nonsyn if self._nonsyn else 0.0
+
+    def __getitem__(self, block: Hashable) -> str:
+        return signals[self._aa[self.blocks[block][0]]]
+
+    def apply(self, block: Hashable, aa: str) -> None:
+        """
+        A method that reassigns a block to amino acid aa and updates the
+        metrics. The change can be undone with revert().
+        """
+        ix = self.blocks[block]
+        pairs = self._block_pairs[block]
+        old_aa = self._aa[ix[0]]
+
+        old = self._score(pairs)
+        new_aa = signal_index[aa]
+        for i in ix:
+            self._aa[i] = new_aa
+        new = self._score(pairs)
+
+        self._syn += new[0] - old[0]
+        self._nonsyn += new[1] - old[1]
+        self._total += new[2] - old[2]
+        self._history.append((block, old_aa, old, new))
+
+    def revert(self) -> None:
+        """
+        A method that undoes the most recent apply()
+        """
+        block, old_aa, old, new = self._history.pop()
+        for i in self.blocks[block]:
+            self._aa[i] = old_aa
+        self._syn += old[0] - new[0]
+        self._nonsyn += old[1] - new[1]
+        self._total += old[2] - new[2]
+
+    def commit(self) -> None:
+        """
+        A method that accepts all applied changes, clearing the undo history
+        """
+        self._history.clear()
+
+    def delta(self, block: Hashable, aa: str) -> Tuple[float, float]:
+        """
+        A method that returns the (silencicity, mutability) the code would
+        have after reassigning block to aa, without changing the state
+        """
+        self.apply(block, aa)
+        try:
+            return self.silencicity, self.mutability
+        finally:
+            self.revert()
+
+    def to_code(self) -> Dict[str, str]:
+        return decode_code(self.codes)
@@ -0,0 +1,583 @@
+import math
+import pickle
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+from synbio.codes import metrics
+from synbio.codes import utils as codeutils
+from synbio.codes.codons import get_codon_index
+from synbio.utils import aminoacids
+
+__all__ = [
+    # dataclasses
+    "OptimizeResult",
+    # constraints
+    "all_aminoacids", "one_to_one", "unambiguous",
+    # optimizers
+    "anneal", "evolve", "restarts",
+]
+
+ObjectiveType = Union[
+    str,
+    Callable[[metrics.CodeState], float],
+    Callable[[np.ndarray], np.ndarray]
+]
+ConstraintType = Union[str, Callable[[np.ndarray], np.ndarray]]
+PathType = Union[str, Path]
+
+
+@dataclass
+class OptimizeResult:
+    """
+    The best code found by an optimizer, along with its score and the
+    monitoring history (one dict per logged iteration or generation)
+    """
+    code: Dict[str, str]
+    score: float
+    iterations: int
+    seed: Optional[int] = None
+    history: List[Dict[str, float]] = field(default_factory=list)
+
+    @property
+    def silencicity(self) -> float:
+        return codeutils.silencicity(self.code)
+
+    @property
+    def mutability(self) -> float:
+        return codeutils.mutability(self.code)
+
+
+###############
+# constraints #
+###############
+# constraints act on (N, 64) encoded code arrays and return (N,) bool arrays
+def _signal_counts(codes: np.ndarray) -> np.ndarray:
+    codes = np.atleast_2d(codes)
+    counts = np.zeros((len(codes), len(metrics.signals)), dtype=np.int64)
+    rows = np.repeat(np.arange(len(codes)), codes.shape[1])
+    np.add.at(counts, (rows, codes.ravel()), 1)
+    return counts
+
+
+def all_aminoacids(codes: np.ndarray) -> np.ndarray:
+    """
+    A constraint that every amino acid and stop is encoded at least once
+    """
+    return (_signal_counts(codes)[:, :len(aminoacids)] > 0).all(axis=1)
+
+
+def one_to_one(codes: np.ndarray) -> np.ndarray:
+    """
+    A constraint that every amino acid is encoded by at most one codon (see
+    codeutils.is_one_to_one)
+    """
+    counts = _signal_counts(codes)
+    amino = [metrics.signal_index[aa] for aa in aminoacids if aa != '*']
+    return (counts[:, amino] <= 1).all(axis=1)
+
+
+def unambiguous(codes: np.ndarray) -> np.ndarray:
+    """
+    A constraint that a code stays unambiguous when tRNA promiscuity is
+    considered (see codeutils.is_ambiguous)
+    """
+    return ~metrics.is_ambiguous(codes)
+
+
+_named_constraints = {
+    'all_aminoacids': all_aminoacids,
+    'one_to_one': one_to_one,
+    'unambiguous': unambiguous,
+}
+
+
+def _get_constraints(
+        constraints: Sequence[ConstraintType]) -> List[Callable]:
+    try:
+        return [
+            c if callable(c) else _named_constraints[c]
+            for c in constraints
+        ]
+    except KeyError as err:
+        raise ValueError(
+            f'constraint {err} not recognized. Use a callable or one of the '
+            f'following options: {set(_named_constraints.keys())}'
+        )
+
+
+def _feasible(codes: np.ndarray, constraints: List[Callable]) -> np.ndarray:
+    feasible = np.ones(len(np.atleast_2d(codes)), dtype=bool)
+    for constraint in constraints:
+        # only check rows that passed every previous constraint
+        if feasible.any():
+            feasible[feasible] = constraint(np.atleast_2d(codes)[feasible])
+    return feasible
+
+
+class _MoveConstraints:
+    """
+    Rechecks constraints after anneal() reassigns one block, looking only at
+    what the move changed: the signal counts of the old and new signals for
+    all_aminoacids and one_to_one, and the codons whose decoding tRNAs
+    include the block for unambiguous. Callable constraints are still
+    evaluated on the whole code.
+    """
+
+    def __init__(
+            self,
+            state: metrics.CodeState,
+            constraints: List[Callable]
+    ) -> None:
+        self._counts = np.bincount(
+            state.codes, minlength=len(metrics.signals)
+        ).tolist()
+        self._sizes = {block: len(ix) for block, ix in state.blocks.items()}
+        self._checks = []
+        self._callables = []
+        for constraint in constraints:
+            if constraint is all_aminoacids:
+                self._checks.append(self._all_aminoacids)
+            elif constraint is one_to_one:
+                self._checks.append(self._one_to_one)
+            elif constraint is unambiguous:
+                self._init_unambiguous(state)
+                self._checks.append(self._unambiguous)
+            else:
+                self._callables.append(constraint)
+
+    def _init_unambiguous(self, state: metrics.CodeState) -> None:
+        index = get_codon_index()
+        self._codon_block = [None] * len(index)
+        for block, ix in state.blocks.items():
+            for i in ix:
+                self._codon_block[i] = block
+        decoders = index.decoders.tolist()
+        self._decoders = [[d for d in row if d >= 0] for row in decoders]
+        # codons whose decoding changes when each block is reassigned
+        self._decoded_by = {}
+        for block, ix in state.blocks.items():
+            inside = set(ix)
+            self._decoded_by[block] = [
+                codon for codon, row in enumerate(self._decoders)
+                if inside.intersection(row)
+            ]
+
+    def _all_aminoacids(self, state, block, old, new) -> bool:
+        # only the old signal can have lost its last codon
+        return old == '0' or self._counts[metrics.signal_index[old]] > 0
+
+    def _one_to_one(self, state, block, old, new) -> bool:
+        # only the new signal can have gained a second codon
+        return new in ('*', '0') \
+            or self._counts[metrics.signal_index[new]] <= 1
+
+    def _unambiguous(self, state, block, old, new) -> bool:
+        codon_block = self._codon_block
+        for codon in self._decoded_by[block]:
+            decoded = {state[codon_block[d]] for d in self._decoders[codon]}
+            decoded.discard('0')
+            if len(decoded) > 1:
+                return False
+        return True
+
+    def feasible(
+            self,
+            state: metrics.CodeState,
+            block: Any,
+            old: str,
+            new: str
+    ) -> bool:
+        """
+        A method that checks the constraints for state, which already holds
+        the reassignment of block from signal old to signal new. The move
+        is recorded if it is feasible, and discarded otherwise.
+        """
+        size, counts = self._sizes[block], self._counts
+        counts[metrics.signal_index[old]] -= size
+        counts[metrics.signal_index[new]] += size
+        if all(check(state, block, old, new) for check in self._checks) \
+                and (not self._callables
+                     or _feasible(state.codes, self._callables)[0]):
+            return True
+        counts[metrics.signal_index[old]] += size
+        counts[metrics.signal_index[new]] -= size
+        return False
+
+
+##############
+# objectives #
+##############
+def _get_objective(objective: ObjectiveType) -> Callable:
+    if callable(objective):
+        return objective
+    elif objective in ('silencicity', 'mutability'):
+        return lambda state: getattr(state, objective)
+    raise ValueError(
+        "objective must be 'silencicity', 'mutability', or a callable"
+    )
+
+
+def _batch_objective(objective: ObjectiveType) -> Callable:
+    # the GA scores whole populations at once with the batch metrics, and
+    # callables are given the whole (N, 64) population array
+    if callable(objective):
+        return objective
+    return {
+        'silencicity': metrics.silencicity,
+        'mutability': metrics.mutability,
+    }[objective]
+
+
+def _load_checkpoint(path: Optional[PathType]) -> Optional[Dict[str, Any]]:
+    if path is None or not Path(path).exists():
+        return None
+    with open(path, 'rb') as handle:
+        return pickle.load(handle)
+
+
+def _save_checkpoint(path: PathType, checkpoint: Dict[str, Any]) -> None:
+    # write then rename so an interrupted save never corrupts a checkpoint
+    tmp_path = Path(f"{path}.tmp")
+    with open(tmp_path, 'wb') as handle:
+        pickle.dump(checkpoint, handle)
+    tmp_path.replace(path)
+
+
+#######################
+# simulated annealing #
+#######################
+def anneal(
+        code: Optional[Mapping[str, str]] = None,
+        block_structure: Union[str, Dict] = 'standard',
+        objective: ObjectiveType = 'silencicity',
+        maximize: bool = True,
+        constraints: Sequence[ConstraintType] = ('all_aminoacids',),
+        alphabet: Optional[Sequence[str]] = None,
+        n_iter: int = 10000,
+        t_start: float = 1e-2,
+        t_end: float = 1e-5,
+        seed: Optional[int] = None,
+        checkpoint_path: Optional[PathType] = None,
+        checkpoint_every: int = 10000,
+        log_every: int = 1000,
+        callback: Optional[Callable[[Dict[str, float]], None]] = None
+) -> OptimizeResult:
+    """
+    A function that optimizes a genetic code by simulated annealing over
+    block assignments. Each step reassigns one random block to a random
+    signal, rejects moves that violate a constraint, and accepts the rest
+    with the Metropolis criterion under a geometric cooling schedule.
+    Metrics and named constraints are updated incrementally (see
+    metrics.CodeState).
+
+    Parameters
+    ----------
+        dict code: feasible starting code (default: a random code)
+        block_structure: name or dict (see codeutils.get_block_structure)
+        objective: 'silencicity', 'mutability', or callable(CodeState)
+        bool maximize: whether to maximize (True) or minimize the objective
+        constraints: names ('all_aminoacids', 'one_to_one', 'unambiguous')
+            or callables mapping (N, 64) encoded codes to (N,) bools
+        alphabet: signals blocks may be assigned (default: amino acids and
+            stop, plus null '0' if one_to_one is required)
+        int n_iter: number of steps
+        float t_start, t_end: initial and final temperature
+        int seed: seed for reproducible runs
+        Path checkpoint_path: if given, state is saved here every
+            checkpoint_every steps, and an existing checkpoint is resumed
+        int log_every: how often to record monitoring statistics
+        callback: called with each statistics dict as it is recorded
+
+    Returns
+    -------
+        OptimizeResult result: best code found and run history
+    """
+    constraint_funcs = _get_constraints(constraints)
+    score = _get_objective(objective)
+    sign = 1 if maximize else -1
+    if alphabet is None:
+        alphabet = list(aminoacids)
+        if 'one_to_one' in constraints:
+            alphabet.append('0')
+
+    rng = random.Random(seed)
+    checkpoint = _load_checkpoint(checkpoint_path)
+    if checkpoint is not None:
+        code = checkpoint['code']
+    elif code is None:
+        # random_code draws from the global random module; seed it from rng
+        global_state = random.getstate()
+        try:
+            random.seed(rng.getrandbits(32))
+            code = codeutils.random_code(block_structure)
+        finally:
+            random.setstate(global_state)
+
+    state = metrics.CodeState(code, block_structure)
+    if not _feasible(state.codes, constraint_funcs)[0]:
+        raise ValueError("starting code violates the given constraints")
+    blocks = list(state.blocks)
+    moves = _MoveConstraints(state, constraint_funcs)
+
+    if checkpoint is not None:
+        rng.setstate(checkpoint['rng_state'])
+        start = checkpoint['iteration']
+        best_code, best = checkpoint['best_code'], checkpoint['best']
+        history = checkpoint['history']
+    else:
+        start = 0
+        best_code, best = state.to_code(), score(state)
+        history = []
+
+    current = score(state)
+    cooling = (t_end / t_start) ** (1 / max(n_iter - 1, 1))
+    accepted = 0
+    last_log, last_time = start, time.perf_counter()
+
+    for iteration in range(start, n_iter):
+        temperature = t_start * cooling ** iteration
+        block = rng.choice(blocks)
+        new_aa = rng.choice(alphabet)
+        old_aa = state[block]
+        if new_aa != old_aa:
+            state.apply(block, new_aa)
+            proposed = score(state)
+            gain = sign * (proposed - current)
+            if (gain >= 0 or rng.random() < math.exp(gain / temperature)) \
+                    and moves.feasible(state, block, old_aa, new_aa):
+                state.commit()
+                current = proposed
+                accepted += 1
+                if sign * (current - best) > 0:
+                    best, best_code = current, state.to_code()
+            else:
+                state.revert()
+
+        if (iteration + 1) % log_every == 0:
+            now = time.perf_counter()
+            stats = {
+                'iteration': iteration + 1,
+                'temperature': temperature,
+                'score': current,
+                'best': best,
+                'acceptance': accepted / (iteration + 1 - last_log),
+                'iterations_per_sec':
+                    (iteration + 1 - last_log) / (now - last_time),
+            }
+            history.append(stats)
+            if callback is not None:
+                callback(stats)
+            accepted, last_log, last_time = 0, iteration + 1, now
+
+        if checkpoint_path is not None \
+                and (iteration + 1) % checkpoint_every == 0:
+            _save_checkpoint(checkpoint_path, {
+                'code': state.to_code(),
+                'rng_state': rng.getstate(),
+                'iteration': iteration + 1,
+                'best_code': best_code,
+                'best': best,
+                'history': history,
+            })
+
+    return OptimizeResult(
+        code=best_code, score=best, iterations=n_iter, seed=seed,
+        history=history
+    )
+
+
+#####################
+# genetic algorithm #
+#####################
+def evolve(
+        block_structure: Union[str, Dict] = 'standard',
+        objective: ObjectiveType = 'silencicity',
+        maximize: bool = True,
+        constraints: Sequence[ConstraintType] = ('all_aminoacids',),
+        alphabet: Optional[Sequence[str]] = None,
+        population: int = 200,
+        generations: int = 100,
+        mutation_rate: float = 0.02,
+        elite: int = 2,
+        tournament: int = 3,
+        seed: Optional[int] = None,
+        checkpoint_path: Optional[PathType] = None,
+        checkpoint_every: int = 10,
+        callback: Optional[Callable[[Dict[str, float]], None]] = None
+) -> OptimizeResult:
+    """
+    A function that optimizes a genetic code with a genetic algorithm over
+    block assignments. Individuals are (n_blocks,) arrays of signal indices;
+    each generation is expanded to (population, 64) codes and scored in one
+    vectorized call. Infeasible individuals get the worst possible fitness.
+    Selection is by tournament, crossover is uniform per block, and the
+    best `elite` individuals are carried over unchanged.
+
+    Parameters
+    ----------
+        block_structure: name or dict (see codeutils.get_block_structure)
+        objective: 'silencicity', 'mutability', or callable mapping (N, 64)
+            encoded codes to (N,) scores
+        bool maximize: whether to maximize (True) or minimize the objective
+        constraints: see anneal()
+        alphabet: see anneal()
+        int population: number of individuals per generation
+        int generations: number of generations
+        float mutation_rate: per-block probability of random reassignment
+        int elite: number of best individuals copied to the next generation
+        int tournament: tournament size for parent selection
+        int seed: seed for reproducible runs
+        Path checkpoint_path: if given, the population is saved here every
+            checkpoint_every generations, and an existing checkpoint is
+            resumed
+        callback: called with each generation's statistics dict
+
+    Returns
+    -------
+        OptimizeResult result: best code found and run history
+    """
+    constraint_funcs = _get_constraints(constraints)
+    score = _batch_objective(objective)
+    sign = 1 if maximize else -1
+    if alphabet is None:
+        alphabet = list(aminoacids)
+        if 'one_to_one' in constraints:
+            alphabet.append('0')
+    alphabet = np.array([metrics.signal_index[aa] for aa in alphabet],
+                        dtype=np.int8)
+
+    # codon_block[i] is the block (column of an individual) of codon i
+    codon_block = codeutils.codon_blocks(block_structure)
+    n_blocks = codon_block.max() + 1
+
+    def fitness(individuals):
+        codes = individuals[:, codon_block]
+        values = sign * np.asarray(score(codes), dtype=float)
+        return np.where(_feasible(codes, constraint_funcs), values, -np.inf)
+
+    checkpoint = _load_checkpoint(checkpoint_path)
+    if checkpoint is not None:
+        rng = np.random.default_rng()
+        rng.bit_generator.state = checkpoint['rng_state']
+        pop = checkpoint['population']
+        start = checkpoint['generation']
+        history = checkpoint['history']
+    else:
+        rng = np.random.default_rng(seed)
+        pop = rng.choice(alphabet, size=(population, n_blocks))
+        # seed each individual with every signal in a random block
+        for individual in pop:
+            placed = rng.permutation(n_blocks)[:len(aminoacids)]
+            individual[placed] = [
+                metrics.signal_index[aa] for aa in aminoacids
+            ]
+        start = 0
+        history = []
+
+    fit = fitness(pop)
+    for generation in range(start, generations):
+        tic = time.perf_counter()
+        order = np.argsort(-fit, kind='stable')
+
+        # tournament selection of two parents per child
+        n_children = population - elite
+        entrants = rng.integers(population, size=(2, n_children, tournament))
+        winners = np.take_along_axis(
+            entrants, fit[entrants].argmax(axis=2)[..., None], axis=2
+        )[..., 0]
+        mask = rng.random((n_children, n_blocks)) < 0.5
+        children = np.where(mask, pop[winners[0]], pop[winners[1]])
+
+        mutate = rng.random(children.shape) < mutation_rate
+        children[mutate] = rng.choice(alphabet, size=mutate.sum())
+
+        pop = np.concatenate([pop[order[:elite]], children])
+        fit = fitness(pop)
+
+        best = int(np.argmax(fit))
+        feasible = np.isfinite(fit)
+        stats = {
+            'generation': generation + 1,
+            'best': sign * fit[best],
+            'mean': sign * fit[feasible].mean() if feasible.any() else np.nan,
+            'feasible': feasible.mean(),
+            'codes_per_sec': population / (time.perf_counter() - tic),
+        }
+        history.append(stats)
+        if callback is not None:
+            callback(stats)
+
+        if checkpoint_path is not None \
+                and (generation + 1) % checkpoint_every == 0:
+            _save_checkpoint(checkpoint_path, {
+                'population': pop,
+                'rng_state': rng.bit_generator.state,
+                'generation': generation + 1,
+                'history': history,
+            })
+
+    best = int(np.argmax(fit))
+    if not np.isfinite(fit[best]):
+        raise ValueError("no individual satisfied the given constraints")
+    return OptimizeResult(
+        code=metrics.decode_code(pop[best][codon_block]),
+        score=sign * fit[best],
+        iterations=generations,
+        seed=seed,
+        history=history
+    )
+
+
+############
+# restarts #
+############
+def _run(method: str, kwargs: Dict[str, Any]) -> OptimizeResult:
+    return {'anneal': anneal, 'evolve': evolve}[method](**kwargs)
+
+
+def restarts(
+        n: int,
+        method: str = 'anneal',
+        workers: int = 1,
+        seed: Optional[int] = None,
+        maximize: bool = True,
+        **kwargs
+) -> List[OptimizeResult]:
+    """
+    A function that runs n independent optimizer runs ('anneal' or
+    'evolve'), in parallel when workers > 1, and returns their results
+    sorted from best to worst. Each run gets its own seed derived from
+    np.random.SeedSequence(seed). Keyword arguments are passed on to the
+    optimizer; callables among them must be picklable when workers > 1.
+    If checkpoint_path is given, run i checkpoints to '<path>.<i>'.
+    """
+    if method not in ('anneal', 'evolve'):
+        raise ValueError("method must be 'anneal' or 'evolve'")
+
+    seeds = [
+        int(s.generate_state(1)[0])
+        for s in np.random.SeedSequence(seed).spawn(n)
+    ]
+    checkpoint_path = kwargs.pop('checkpoint_path', None)
+    tasks = [
+        (method, dict(
+            kwargs, seed=run_seed, maximize=maximize,
+            checkpoint_path=None if checkpoint_path is None
+            else f"{checkpoint_path}.{i}"
+        ))
+        for i, run_seed in enumerate(seeds)
+    ]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run, *zip(*tasks)))
+    else:
+        results = [_run(*task) for task in tasks]
+
+    return sorted(results, key=lambda r: r.score, reverse=maximize)
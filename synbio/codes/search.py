@@ -0,0 +1,208 @@
+import csv
+import heapq
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from synbio.codes import metrics
+from synbio.codes import utils as codeutils
+from synbio.codes.generators import Red20Space
+
+__all__ = [
+    # dataclasses
+    "SampleResult",
+    # functions
+    "sample",
+]
+
+MetricType = Union[str, Callable[[np.ndarray], np.ndarray]]
+
+# metrics that can be requested by name
+_named_metrics = {
+    'silencicity': metrics.silencicity,
+    'mutability': metrics.mutability,
+}
+
+# number of codes generated and scored per task
+SHARD_SIZE = 2 ** 14
+
+
+@dataclass
+class SampleResult:
+    """
+    The best codes found by sample(), sorted from best to worst. codes is a
+    (k, 64) array encoded as in synbio.codes.metrics.
+    """
+    scores: np.ndarray
+    codes: np.ndarray
+    seed: int
+    n_sampled: int = 0
+    metadata: Dict = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def to_codes(self) -> List[Dict[str, str]]:
+        """
+        A method that converts the encoded codes to codon -> amino acid dicts
+        """
+        return [metrics.decode_code(row) for row in self.codes]
+
+
+def _get_metric(metric: MetricType) -> Callable[[np.ndarray], np.ndarray]:
+    if callable(metric):
+        return metric
+    try:
+        return _named_metrics[metric.lower()]
+    except KeyError:
+        raise ValueError(
+            'metric string not recognized. Use a callable or one of the '
+            'following options: {0}'.format(set(_named_metrics.keys()))
+        )
+
+
+def _generate(
+        block_structure: str,
+        n: int,
+        seed: np.random.SeedSequence) -> np.ndarray:
+    if block_structure == 'red20':
+        # distinct RED20 codes, drawn as packed integers
+        space = Red20Space()
+        return space.decode_array(space.sample(n, rng=seed))
+    return codeutils.random_codes(n, block_structure, rng=seed)
+
+
+def _sample_shard(
+        shard: int,
+        n: int,
+        block_structure: str,
+        metric: MetricType,
+        k: int,
+        seed: np.random.SeedSequence,
+        maximize: bool
+) -> Tuple[int, np.ndarray, np.ndarray]:
+    """
+    A private function run by each worker: generate n codes from a seeded
+    RNG, score them in one vectorized call, and return the shard's top k
+    """
+    codes = _generate(block_structure, n, seed)
+    scores = np.asarray(_get_metric(metric)(codes), dtype=float)
+    order = np.argsort(-scores if maximize else scores, kind='stable')[:k]
+    return shard, scores[order], codes[order]
+
+
+def sample(
+        n: int,
+        block_structure: str = 'standard',
+        metric: MetricType = 'silencicity',
+        k: int = 100,
+        workers: int = 1,
+        seed: Optional[int] = None,
+        maximize: bool = True,
+        out_path: Optional[Union[str, Path]] = None,
+        shard_size: int = SHARD_SIZE
+) -> SampleResult:
+    """
+    A function that samples n random genetic codes, scores them with a
+    vectorized metric, and keeps the k best.
+
+    Sampling is split into shards of shard_size codes, each seeded from
+    its own child of np.random.SeedSequence(seed), so results depend only
+    on (n, block_structure, seed, shard_size) and not on the number of
+    workers. Shards run on a process pool when workers > 1 and are merged
+    into a bounded top-k heap as they complete.
+
+    Parameters
+    ----------
+        int n: number of codes to sample
+        str block_structure: 'standard', 'preserve_block', 'unrestricted'
+            (see codeutils.random_code) or 'red20'
+        metric: 'silencicity', 'mutability', or a callable mapping an
+            (N, 64) encoded array to (N,) scores. Must be picklable (e.g.,
+            a module level function) when workers > 1
+        int k: number of codes to keep
+        int workers: number of worker processes
+        int seed: seed for reproducible sampling (random if None)
+        bool maximize: keep the highest (True) or lowest (False) scores
+        Path out_path: optional CSV file; the top k of every shard is
+            appended as soon as the shard completes, so partial results
+            survive an interrupted run
+        int shard_size: number of codes generated and scored per task
+
+    Returns
+    -------
+        SampleResult result: the k best scores and encoded codes
+    """
+    if k < 1:
+        raise ValueError('k must be at least 1')
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % 2 ** 32)
+    _get_metric(metric)  # fail early on unknown metric names
+
+    n_shards = -(-n // shard_size)
+    shard_seeds = np.random.SeedSequence(seed).spawn(n_shards)
+    tasks = [
+        (
+            shard, min(shard_size, n - shard * shard_size),
+            block_structure, metric, k, shard_seeds[shard], maximize
+        )
+        for shard in range(n_shards)
+    ]
+
+    # min-heap of (signed score, shard, row, code) keeps the current top k
+    heap = []
+    sign = 1 if maximize else -1
+
+    def merge(shard, scores, codes):
+        for row, (score, code) in enumerate(zip(scores.tolist(), codes)):
+            item = (sign * score, -shard, -row, code)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item[:3] > heap[0][:3]:
+                heapq.heapreplace(heap, item)
+
+    handle = writer = None
+    if out_path is not None:
+        handle = open(out_path, 'w', newline='')
+        writer = csv.writer(handle)
+        writer.writerow(['shard', 'score', 'code'])
+
+    try:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_sample_shard, *task) for task in tasks]
+                results = (future.result() for future in as_completed(futures))
+                for result in results:
+                    merge(*result)
+                    if writer is not None:
+                        _write_shard(writer, handle, *result)
+        else:
+            for task in tasks:
+                result = _sample_shard(*task)
+                merge(*result)
+                if writer is not None:
+                    _write_shard(writer, handle, *result)
+    finally:
+        if handle is not None:
+            handle.close()
+
+    best = sorted(heap, reverse=True)
+    return SampleResult(
+        scores=np.array([sign * item[0] for item in best], dtype=float),
+        codes=np.array([item[3] for item in best], dtype=np.int8).reshape(
+            -1, len(codeutils.triplet_rna_codons)),
+        seed=seed,
+        n_sampled=n,
+        metadata={'block_structure': block_structure, 'k': k}
+    )
+
+
+def _write_shard(writer, handle, shard, scores, codes) -> None:
+    writer.writerows(
+        (shard, score, ''.join(metrics.signals[ix] for ix in code.tolist()))
+        for score, code in zip(scores.tolist(), codes)
+    )
+    handle.flush()
@@ -1,4 +1,10 @@
-from synbio.codes import Code
+import pickle
+
+from synbio.annotations import Location, Part
+from synbio.codes import Code, FrozenCode, get_code
+from synbio.codes import utils as codeutils
+from synbio.polymers import DNA
+from synbio.tests import utils as testutils
 
 
 class TestCode:
@@ -8,3 +14,98 @@ class TestCode:
         # TODO: this test is kinda wimpy; beef it up
         standard_code = Code()
         print(standard_code)
+
+    def test_cache_invalidation(self):
+        code = Code()
+        rmap = code.rmap()
+        assert code.rmap() is rmap
+        assert code.stop_codons() == {'UAA', 'UAG', 'UGA'}
+        assert code.synonyms()['UGG'] == {'UGG'}
+
+        code['UGA'] = 'W'
+        assert code.rmap() is not rmap
+        assert set(code.rmap()['W']) == {'UGA', 'UGG'}
+        assert code.stop_codons() == {'UAA', 'UAG'}
+        assert code.synonyms()['UGG'] == {'UGA', 'UGG'}
+
+    def test_reverse_translate(self):
+        red20 = Code('RED20')
+        assert red20.one_to_one
+        prot = "MKV*"
+        assert red20.translate(red20.reverse_translate(prot)) == prot
+
+    def test_pickle(self):
+        code = Code('COLORADO')
+        assert pickle.loads(pickle.dumps(code)) == code
+
+    def test_recode_many(self):
+        red20 = Code('RED20')
+        genes = ['AUGUUUCUGUAA', 'AUGAAAUGA', 'ATGGGCTAG']
+        recoded = red20.recode_many(genes)
+        assert recoded == [red20.recode(gene.replace('T', 'U'))
+                           for gene in genes]
+        assert red20.recode_many(genes, workers=2) == recoded
+        assert isinstance(
+            testutils.raises(red20.recode_many, [['AUGU']], {}), ValueError
+        )
+        # like recode, only one-to-one codes can recode
+        assert isinstance(
+            testutils.raises(Code().recode_many, [['AUGUUUUAA']], {}),
+            TypeError
+        )
+
+    def test_recode_many_parts(self):
+        dna = DNA('AA' + 'ATGTTTTAG' + 'CC' + 'CTAAAACAT' + 'GG')
+        Part(seq=dna, location=Location(2, 11), name='fwd', kind='CDS')
+        Part(seq=dna, location=Location(13, 22, 'REV'), name='rev', kind='CDS')
+        Part(seq=dna, location=Location(0, 4), name='other', kind='misc')
+
+        red20 = Code('RED20')
+        assert red20.recode_many(dna) is dna
+        expected = red20.recode('AUGUUUUAG').replace('U', 'T')
+        assert dna['fwd'] == expected
+        assert dna['rev'] == expected
+        assert str(dna)[:2] == 'AA' and str(dna)[11:13] == 'CC'
+
+
+class TestFrozenCode:
+    def test_immutable(self):
+        code = FrozenCode()
+        assert code == Code()
+        assert isinstance(
+            testutils.raises(code.__setitem__, ['UGA', 'W'], {}), TypeError
+        )
+        assert isinstance(
+            testutils.raises(code.update, [{'UGA': 'W'}], {}), TypeError
+        )
+
+    def test_hash(self):
+        assert hash(FrozenCode()) == hash(FrozenCode(Code()))
+        assert hash(FrozenCode()) != hash(FrozenCode('COLORADO'))
+        assert {FrozenCode(): 1}[FrozenCode()] == 1
+
+        code = pickle.loads(pickle.dumps(FrozenCode()))
+        assert isinstance(code, FrozenCode)
+        assert hash(code) == hash(FrozenCode())
+
+
+def test_get_code():
+    standard = get_code()
+    assert isinstance(standard, FrozenCode)
+    assert get_code('standard') is standard
+    assert get_code(codeutils.standard_code) is standard
+    assert get_code(Code()) is standard
+    assert get_code(standard) is standard
+    assert get_code('COLORADO') is get_code(codeutils.colorado_code)
+    assert get_code('RED20') is not standard
+
+
+def test_presets():
+    from synbio.codes import presets
+
+    assert set(presets) >= {'STANDARD', 'RED20', 'FS20', 'RANDOM'}
+    assert presets['RED20'] is presets['RED20']
+    # random codes are generated fresh on every request
+    assert not presets.is_cached('random')
+    assert Code('RANDOM') != Code('RANDOM')
+    assert get_code('RANDOM') is not get_code('RANDOM')
@@ -0,0 +1,96 @@
+import numpy as np
+
+from synbio.codes import metrics
+from synbio.codes import utils as codeutils
+from synbio.tests import utils as testutils
+from synbio.utils import (
+    aminoacids, quadruplet_rna_codons, triplet_rna_codons,
+)
+
+
+class TestConnectivity:
+    def test_codon_connectivity(self):
+        dist_dict = codeutils.get_codon_connectivity(codeutils.standard_code)
+        connected = dict(dist_dict['UUU'])
+
+        # UUC (F) is synonymous and only passed through
+        assert 'UUC' not in connected and 'UUU' not in connected
+        assert connected['UUA'] == 1  # L
+        assert connected['UUG'] == 1  # L, also reachable via UUC
+        assert connected['CUC'] == 2  # UUU -> UUC -> CUC
+        levels = [level for _, level in dist_dict['UUU']]
+        assert levels == sorted(levels)
+
+        resi = codeutils.get_resi_connectivity(codeutils.standard_code)
+        assert ('L', 1) in resi['F']
+
+    def test_connectivity_matrix(self):
+        codes = [codeutils.standard_code, codeutils.colorado_code]
+        batch = codeutils.connectivity_matrix(metrics.encode_codes(codes))
+        assert batch.shape == (2, 64, 64)
+        for dist, code in zip(batch, codes):
+            assert (dist == codeutils.connectivity_matrix(code)).all()
+            # synonymous codons are never connected
+            aa = np.array([code[c] for c in triplet_rna_codons])
+            assert not dist[aa[:, None] == aa[None, :]].any()
+
+    def test_quadruplet(self):
+        code = {codon: '0' for codon in quadruplet_rna_codons}
+        code['UUUU'] = 'F'
+        dist = codeutils.connectivity_matrix(code, quadruplet_rna_codons)
+        uuuu = quadruplet_rna_codons.index('UUUU')
+        assert dist.shape == (256, 256)
+        assert np.count_nonzero(dist[uuuu]) == 12
+        # every null codon reaches UUUU in as many mutations as it differs
+        ggg = quadruplet_rna_codons.index('GGGU')
+        assert dist[ggg, uuuu] == 3
+
+
+class TestPartialTables:
+    def test_partial_tables(self):
+        # codons missing from a table count as unassigned ('0')
+        table = {'UUU': 'F', 'UUC': 'F', 'UUA': 'L'}
+        full = dict.fromkeys(triplet_rna_codons, '0')
+        full.update(table)
+
+        # 27 mutations start at the table's codons; UUU <-> UUC are silent
+        assert codeutils.silencicity(table) == 2 / 27
+        assert np.isclose(
+            codeutils.mutability(table),
+            np.mean([
+                abs(codeutils.kdHydrophobicity[table[c1]]
+                    - codeutils.kdHydrophobicity[full[c2]])
+                for c1, c2 in codeutils.get_mut_pairs(table)
+                if table[c1] != full[c2]
+            ])
+        )
+        assert len(codeutils.get_mut_pairs(table)) == 27
+        assert not codeutils.is_ambiguous(table)
+        assert codeutils.promiscuity(table) == codeutils.promiscuity(full)
+        assert codeutils.is_ambiguous({'AUA': 'I', 'AUG': 'M'})
+
+
+class TestRandomCodes:
+    def test_random_codes(self):
+        for structure in ('standard', 'preserve_block', 'unrestricted'):
+            codes = codeutils.random_codes(200, structure, rng=0)
+            assert codes.shape == (200, 64) and codes.dtype == np.int8
+            for row in codes[:20]:
+                code = metrics.decode_code(row)
+                assert set(code.values()) == set(aminoacids)
+                assert codeutils.check_block(
+                    code, codeutils.get_block_structure(structure)
+                )
+
+        assert np.array_equal(codeutils.random_codes(5, rng=1),
+                              codeutils.random_codes(5, rng=1))
+
+    def test_too_few_blocks(self):
+        blocks = {i: triplet_rna_codons[3 * i:3 * i + 3] for i in range(20)}
+        blocks[20] = triplet_rna_codons[60:]
+        assert codeutils.random_codes(1, blocks, rng=0).shape == (1, 64)
+        del blocks[20]
+        assert isinstance(
+            testutils.raises(codeutils.random_codes, [1, blocks], {}),
+            ValueError
+        )
@@ -0,0 +1,71 @@
+import numpy as np
+
+from synbio.codes import Code
+from synbio.codes import metrics
+from synbio.codes import utils as codeutils
+from synbio.codes.codons import *
+from synbio.utils import (
+    quadruplet_rna_codons, triplet_dna_codons, triplet_rna_codons,
+)
+
+
+class TestCodonIndex:
+    def test_codons(self):
+        assert get_codon_index().codons == triplet_rna_codons
+        assert get_codon_index('DNA').codons == triplet_dna_codons
+        assert get_codon_index('RNA', 4).codons == quadruplet_rna_codons
+        assert get_codon_index('rna', 3) is get_codon_index()
+        assert index_for(triplet_dna_codons) is get_codon_index('DNA')
+
+    def test_encode(self):
+        index = get_codon_index()
+        ix = index.encode('AUGuuuGGAU')
+        assert ix.tolist() == [
+            triplet_rna_codons.index(c) for c in ('AUG', 'UUU', 'GGA')
+        ]
+        assert index.decode(ix) == ['AUG', 'UUU', 'GGA']
+        assert get_codon_index('RNA', 4).encode('GGGG').tolist() == [255]
+
+    def test_neighbors(self):
+        index = get_codon_index('RNA', 4)
+        assert index.neighbors.shape == (256, 12)
+        assert index.decode(index.neighbors[0]) == \
+            codeutils.get_codon_neighbors('UUUU')
+
+    def test_wobble(self):
+        index = get_codon_index()
+        decoded = np.flatnonzero(index.wobble[index.position['UUU']])
+        assert index.decode(decoded) == ['UUU', 'UUC']
+        assert index.wobble.sum() == 16 * 7
+
+
+class TestQuadruplet:
+    code = {
+        codon: triplet_aa
+        for codon, triplet_aa in zip(
+            quadruplet_rna_codons,
+            (codeutils.standard_code[c[:3]] for c in quadruplet_rna_codons)
+        )
+    }
+
+    def test_metrics(self):
+        # with a fourth base that never matters, each codon keeps its 9
+        # triplet mutations and gains 3 synonymous ones
+        expected = (
+            9 * codeutils.silencicity(codeutils.standard_code) + 3
+        ) / 12
+        assert np.isclose(codeutils.silencicity(self.code), expected)
+
+        encoded = metrics.encode_codes(self.code, quadruplet_rna_codons)
+        assert np.isclose(metrics.silencicity(encoded)[0], expected)
+        assert np.isclose(
+            metrics.mutability(encoded)[0], codeutils.mutability(self.code)
+        )
+        assert len(codeutils.promiscuity(
+            {c: '0' for c in quadruplet_rna_codons}
+        )) == 256
+
+    def test_table(self):
+        table = Code(self.code).table()
+        assert (len(table), len(table[0]), len(table[0][0])) == (4, 4, 16)
+        assert table[0][0][0] == 'UUUU:F'
@@ -0,0 +1,66 @@
+from itertools import islice
+
+import numpy as np
+
+from synbio.codes import metrics
+from synbio.codes import utils as codeutils
+from synbio.codes.generators import *
+from synbio.tests import utils as testutils
+
+
+class TestRed20Space:
+    def test_indexing(self):
+        space = Red20Space()
+        assert len(space) == int(np.prod(space.radices))
+        for n in (0, 1, 98765, len(space) - 1):
+            code = space[n]
+            assert codeutils.is_one_to_one(code)
+            assert space.encode(code) == n
+        assert space[-1] == space[len(space) - 1]
+        assert isinstance(
+            testutils.raises(space.__getitem__, [len(space)], {}), IndexError
+        )
+        assert isinstance(
+            testutils.raises(space.encode, [codeutils.standard_code], {}),
+            ValueError
+        )
+
+    def test_enumerate(self):
+        # a parent code with few synonyms has a small, exhaustible space
+        parent = Red20Space()[0]  # F -> UUU, L -> UUA, ...
+        parent.update(UUC='F', CUU='L', CUC='L')
+        space = Red20Space(parent)
+        assert len(space) == 2 * 3
+        codes = list(space)
+        assert len({space.encode(code) for code in codes}) == 6
+
+        streamed = list(red20(parent, rng=0))
+        assert sorted(map(space.encode, streamed)) == list(range(6))
+
+    def test_sample(self):
+        space = Red20Space()
+        indices = space.sample(500, rng=0)
+        assert len(np.unique(indices)) == 500
+        assert np.array_equal(
+            space.decode_array(indices),
+            metrics.encode_codes([space[n] for n in indices.tolist()])
+        )
+
+
+def test_red20():
+    codes = list(islice(red20(rng=1), 100))
+    # streams are reproducible
+    assert codes == list(islice(red20(rng=1), 100))
+    space = Red20Space()
+    assert len({space.encode(code) for code in codes}) == 100
+    assert all(codeutils.is_one_to_one(code) for code in codes)
+
+
+def test_seen_set():
+    from synbio.codes.generators import _SeenSet
+    # spaces too large for a bitset merge additions into a sorted array
+    seen, expected = _SeenSet(2 ** 40), set()
+    for n in np.random.default_rng(0).integers(30000, size=50000).tolist():
+        assert seen.add(n) == (n not in expected)
+        expected.add(n)
+    assert len(seen._sorted) + len(seen._buffer) == len(expected)
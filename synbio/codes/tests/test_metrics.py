@@ -0,0 +1,239 @@
+import random
+
+import numpy as np
+
+from synbio.codes import Code, metrics
+from synbio.codes import utils as codeutils
+from synbio.tests import utils as testutils
+from synbio.utils import PRS, aminoacids
+
+
+class TestMetrics:
+    codes = [
+        codeutils.standard_code,
+        codeutils.colorado_code,
+        codeutils.RED20,
+        codeutils.FS20,
+    ] + [codeutils.random_code() for _ in range(10)]
+
+    def test_encoding(self):
+        arr = metrics.encode_codes(self.codes)
+        assert arr.shape == (len(self.codes), 64)
+        assert arr.dtype == np.int8
+        assert metrics.decode_code(arr[0]) == codeutils.standard_code
+
+    def test_neighbor_index(self):
+        neighbors = metrics.neighbor_index()
+        assert neighbors.shape == (64, 9)
+        # neighbor relation is symmetric
+        for i, row in enumerate(neighbors):
+            assert all(i in neighbors[j] for j in row)
+
+    def test_silencicity(self):
+        arr = metrics.encode_codes(self.codes)
+        assert np.allclose(
+            metrics.silencicity(arr),
+            [codeutils.silencicity(code) for code in self.codes]
+        )
+
+    def test_mutability(self):
+        arr = metrics.encode_codes(self.codes)
+        assert np.allclose(
+            metrics.mutability(arr),
+            [codeutils.mutability(code) for code in self.codes]
+        )
+        # PRS has no value for stop; those pairs are skipped
+        assert np.isfinite(metrics.mutability(arr, PRS)).all()
+
+    def test_pairwise_metric(self):
+        arr = metrics.encode_codes(self.codes)
+        ones = np.ones((len(metrics.signals), len(metrics.signals)))
+        assert np.allclose(
+            metrics.pairwise_metric(arr, ones, include_synonymous=True), 1
+        )
+        # callables receive signal index arrays
+        changed = metrics.pairwise_metric(
+            arr, lambda aa1, aa2: aa1 != aa2, include_synonymous=True
+        )
+        assert np.allclose(changed, 1 - metrics.silencicity(arr))
+
+
+class TestCodeState:
+    def test_matches_full_evaluation(self):
+        rng = random.Random(0)
+        for block_structure in ['standard', 'preserve_block', 'unrestricted']:
+            state = metrics.CodeState(
+                codeutils.random_code(block_structure), block_structure
+            )
+            for _ in range(100):
+                block = rng.choice(list(state.blocks))
+                state.apply(block, rng.choice(aminoacids))
+                if rng.random() < 0.3:
+                    state.revert()
+
+            code = state.to_code()
+            assert np.isclose(state.silencicity, codeutils.silencicity(code))
+            assert np.isclose(state.mutability, codeutils.mutability(code))
+
+    def test_apply_revert(self):
+        state = metrics.CodeState(codeutils.standard_code, 'preserve_block')
+        before = (state.silencicity, state.mutability)
+
+        assert state[4] == 'M'
+        preview = state.delta(4, 'W')
+        assert (state.silencicity, state.mutability) == before
+
+        state.apply(4, 'W')
+        assert state[4] == 'W'
+        assert np.isclose(state.silencicity, preview[0])
+        assert np.isclose(state.mutability, preview[1])
+
+        state.revert()
+        assert state.to_code() == codeutils.standard_code
+        assert np.isclose(state.silencicity, before[0])
+        assert np.isclose(state.mutability, before[1])
+
+    def test_block_check(self):
+        assert isinstance(
+            testutils.raises(
+                metrics.CodeState, [codeutils.colorado_code, 'standard'], {}
+            ), ValueError
+        )
+
+
+class TestPromiscuity:
+    def test_is_ambiguous(self):
+        sparse = dict.fromkeys(codeutils.triplet_rna_codons, '0')
+        sparse.update(UUU='F', UUA='L')
+        clash = dict(sparse, UUC='S')  # UUU and UUC tRNAs both read UUC
+        codes = [codeutils.standard_code, sparse, clash]
+        expected = [codeutils.is_ambiguous(code) for code in codes]
+
+        assert expected == [True, False, True]
+        assert metrics.is_ambiguous(
+            metrics.encode_codes(codes)).tolist() == expected
+
+    def test_promiscuity(self):
+        sparse = dict.fromkeys(codeutils.triplet_rna_codons, '0')
+        sparse.update(UUU='F', UUA='L', AUG='M')
+        expanded = metrics.promiscuity(metrics.encode_codes(sparse))
+        assert metrics.decode_code(expanded[0]) == \
+            codeutils.promiscuity(sparse)
+
+        ambiguous = metrics.encode_codes(codeutils.standard_code)
+        assert isinstance(
+            testutils.raises(metrics.promiscuity, [ambiguous], {}), ValueError
+        )
+        expanded = metrics.promiscuity(ambiguous, allow_ambiguous=True)[0]
+        aug = codeutils.triplet_rna_codons.index('AUG')
+        assert expanded[aug] == -1  # read by both the AUA (I) and M tRNAs
+
+
+class TestTranslation:
+    seq = 'AUGUUUCGAUAAGGGUGA'
+    codes = [codeutils.standard_code, codeutils.colorado_code, codeutils.FS20]
+
+    def test_translate_codes(self):
+        proteins = metrics.translate_codes(self.seq, self.codes)
+        assert proteins.shape == (3, 6)
+        assert metrics.decode_proteins(proteins) == [
+            Code(code).translate(self.seq) for code in self.codes
+        ]
+        # DNA, pre-encoded sequences and encoded codes give the same result
+        dna = self.seq.replace('U', 'T')
+        assert np.array_equal(
+            metrics.translate_codes(dna, metrics.encode_codes(self.codes)),
+            proteins
+        )
+        assert np.array_equal(
+            metrics.translate_codes(metrics.encode_sequence(dna), self.codes),
+            proteins
+        )
+        assert isinstance(
+            testutils.raises(metrics.encode_sequence, ['AUGU'], {}),
+            ValueError
+        )
+
+    def test_translation_summary(self):
+        summary = metrics.translation_summary(self.seq, self.codes)
+        proteins = [Code(code).translate(self.seq) for code in self.codes]
+
+        assert len(summary) == 3
+        assert summary.first_stop.tolist() == [p.find('*') for p in proteins]
+        assert summary.n_stops.tolist() == [p.count('*') for p in proteins]
+        assert summary.n_null.tolist() == [p.count('0') for p in proteins]
+        assert summary.identity[0] == 1
+        assert np.isclose(summary.identity[1], sum(
+            a == b for a, b in zip(proteins[0], proteins[1])) / 6)
+
+
+class TestAmbiguousTranslation:
+    # wobble makes AUG read as I or M, and UGG as * or W
+    code = codeutils.promiscuity(codeutils.standard_code, allow_ambiguous=True)
+
+    def test_translate_ambiguous(self):
+        proteins = metrics.translate_ambiguous('AUGUUUAUGUGG', self.code)
+        assert str(proteins) == '[IM]F[IM][W*]'
+        assert proteins.length == 4 and len(proteins) == 8
+        assert list(proteins) == [proteins[n] for n in range(len(proteins))]
+        assert len(set(proteins)) == 8
+        assert 'IFMW' in proteins and 'IFM*' in proteins
+        assert 'LFMW' not in proteins and 'IFM' not in proteins
+        assert proteins[-1] == proteins[7]
+        assert isinstance(testutils.raises(proteins.__getitem__, [8], {}),
+                          IndexError)
+
+        # codes without tuples give a single protein
+        single = metrics.translate_ambiguous(
+            'AUGUUU', codeutils.standard_code
+        )
+        assert len(single) == 1 and list(single) == ['MF']
+
+    def test_large(self):
+        # counted and sampled without enumerating the proteins
+        seq = 'AUGUGG' * 200
+        proteins = Code(self.code).translate(seq)
+        assert isinstance(proteins, metrics.ProteinSet)
+        assert proteins.size == 2 ** 400
+        samples = proteins.sample(50, rng=0)
+        assert all(protein in proteins for protein in samples)
+        assert len(set(samples)) == 50
+        assert proteins[2 ** 399] == 'M' + proteins[0][1:]
+
+
+class TestMutationEffects:
+    def test_mutation_effects(self):
+        effects = metrics.mutation_effects('AUGUGGUAA')
+        assert len(effects) == 9 and effects.category.shape == (9, 3)
+        assert effects.bases[0].tolist() == ['U', 'C', 'G']
+        # UGG (W) -> UGA/UAG (stop); UAA -> UAG/UGA stay stops
+        assert effects.category[5].tolist() == [
+            metrics.NONSYNONYMOUS, metrics.NONSYNONYMOUS, metrics.NONSENSE
+        ]
+        assert effects.category[4].tolist() == [
+            metrics.NONSYNONYMOUS, metrics.NONSYNONYMOUS, metrics.NONSENSE
+        ]
+        assert effects.category[8].tolist() == [
+            metrics.NONSYNONYMOUS, metrics.NONSYNONYMOUS, metrics.SYNONYMOUS
+        ]
+        # AUG (M, 1.9) -> GUG (V, 4.2)
+        assert np.isclose(effects.delta[0, 2], 2.3)
+        # kdHydrophobicity gives stops a neutral value of 0
+        assert np.isclose(effects.delta[5, 2], 0.9)
+        assert np.isnan(
+            metrics.mutation_effects('UGG', metric={'W': 1}).delta[2, 2]
+        )
+
+    def test_matches_codons(self):
+        random.seed(0)
+        seq = ''.join(random.choice('ACGT') for _ in range(300))
+        effects = metrics.mutation_effects(seq, codeutils.colorado_code)
+        for i, alternatives in enumerate(effects.bases.tolist()):
+            start = i // 3 * 3
+            wild = seq[start:start + 3].replace('T', 'U')
+            for j, base in enumerate(alternatives):
+                mutant = list(wild)
+                mutant[i - start] = base.replace('T', 'U')
+                same = codeutils.colorado_code[''.join(mutant)] == \
+                    codeutils.colorado_code[wild]
+                assert same == (effects.category[i, j] == metrics.SYNONYMOUS)
@@ -0,0 +1,160 @@
+import numpy as np
+
+from synbio.codes import metrics
+from synbio.codes import utils as codeutils
+from synbio.codes.optimize import *
+from synbio.tests import utils as testutils
+
+
+class TestConstraints:
+    def test_constraints(self):
+        codes = metrics.encode_codes([
+            codeutils.standard_code, codeutils.colorado_code
+        ])
+        assert all_aminoacids(codes).tolist() == [True, True]
+        assert one_to_one(codes).tolist() == [False, False]
+        # wobble pairing makes the standard code ambiguous (e.g., AUA/AUG)
+        assert unambiguous(codes).tolist() == [False, False]
+        sparse = dict.fromkeys(codeutils.standard_code, '0')
+        sparse['UUU'] = 'F'
+        assert unambiguous(metrics.encode_codes(sparse))[0]
+
+        missing = dict(codeutils.standard_code, UGG='F')
+        assert not all_aminoacids(metrics.encode_codes(missing))[0]
+
+
+class TestAnneal:
+    def test_anneal(self):
+        history = []
+        result = anneal(
+            codeutils.standard_code, n_iter=2000, seed=0, log_every=500,
+            callback=history.append
+        )
+        assert result.score >= codeutils.silencicity(codeutils.standard_code)
+        assert np.isclose(result.score, result.silencicity)
+        assert codeutils.check_block(result.code, codeutils.standard_block)
+        assert all_aminoacids(metrics.encode_codes(result.code))[0]
+        assert len(history) == 4 and history == result.history
+        assert all(stats['iterations_per_sec'] > 0 for stats in history)
+
+        # runs are reproducible
+        again = anneal(codeutils.standard_code, n_iter=2000, seed=0)
+        assert again.code == result.code
+
+    def test_minimize(self):
+        result = anneal(
+            objective='mutability', maximize=False, n_iter=2000, seed=1
+        )
+        assert result.score <= codeutils.mutability(codeutils.standard_code)
+
+    def test_checkpoint(self, tmp_path):
+        path = tmp_path / 'anneal.pkl'
+        full = anneal(codeutils.standard_code, n_iter=1000, seed=2)
+
+        def interrupt(stats):
+            if stats['iteration'] == 700:
+                raise KeyboardInterrupt
+
+        # a run interrupted after its checkpoint resumes where it left off
+        try:
+            anneal(codeutils.standard_code, n_iter=1000, seed=2,
+                   checkpoint_path=path, checkpoint_every=500, log_every=100,
+                   callback=interrupt)
+        except KeyboardInterrupt:
+            pass
+        resumed = anneal(codeutils.standard_code, n_iter=1000, seed=2,
+                         checkpoint_path=path, checkpoint_every=500)
+        assert resumed.code == full.code
+        assert resumed.score == full.score
+
+    def test_move_constraints(self):
+        # incremental checks of moves from feasible codes agree with
+        # checking the whole code
+        from synbio.codes.optimize import _MoveConstraints, _feasible
+        sparse = dict.fromkeys(codeutils.standard_code, '0')
+        sparse['UUU'] = 'F'
+        rng = np.random.default_rng(0)
+        for code, constraint in ((codeutils.standard_code, all_aminoacids),
+                                 (sparse, one_to_one), (sparse, unambiguous)):
+            state = metrics.CodeState(code, 'unrestricted')
+            moves = _MoveConstraints(state, [constraint])
+            blocks = list(state.blocks)
+            for _ in range(300):
+                block = blocks[rng.integers(len(blocks))]
+                old, new = state[block], str(rng.choice(metrics.signals))
+                if old == new:
+                    continue
+                state.apply(block, new)
+                expected = _feasible(state.codes, [constraint])[0]
+                assert moves.feasible(state, block, old, new) == expected
+                if expected:
+                    state.commit()
+                else:
+                    state.revert()
+
+    def test_errors(self):
+        # the standard code is not one-to-one
+        assert isinstance(
+            testutils.raises(
+                anneal, [], {'constraints': ['one_to_one'], 'n_iter': 1}
+            ), ValueError
+        )
+        assert isinstance(
+            testutils.raises(
+                anneal, [], {'constraints': ['nonsense'], 'n_iter': 1}
+            ), ValueError
+        )
+
+
+class TestEvolve:
+    def test_evolve(self):
+        result = evolve(population=50, generations=10, seed=0)
+        assert all_aminoacids(metrics.encode_codes(result.code))[0]
+        assert codeutils.check_block(result.code, codeutils.standard_block)
+        assert np.isclose(result.score, result.silencicity)
+        assert len(result.history) == 10
+        # elitism: the best score never decreases
+        best = [stats['best'] for stats in result.history]
+        assert best == sorted(best)
+
+        # callable objectives score the whole population at once
+        calls = []
+
+        def silencicity(codes):
+            calls.append(len(codes))
+            return metrics.silencicity(codes)
+
+        custom = evolve(population=50, generations=10, seed=0,
+                        objective=silencicity)
+        assert custom.code == result.code
+        assert calls == [50] * 11
+
+    def test_checkpoint(self, tmp_path):
+        path = tmp_path / 'evolve.pkl'
+        full = evolve(population=30, generations=6, seed=3)
+
+        def interrupt(stats):
+            if stats['generation'] == 4:
+                raise KeyboardInterrupt
+
+        try:
+            evolve(population=30, generations=6, seed=3,
+                   checkpoint_path=path, checkpoint_every=3,
+                   callback=interrupt)
+        except KeyboardInterrupt:
+            pass
+        resumed = evolve(population=30, generations=6, seed=3,
+                         checkpoint_path=path, checkpoint_every=3)
+        assert resumed.code == full.code
+
+
+class TestRestarts:
+    def test_restarts(self):
+        results = restarts(3, n_iter=500, seed=0)
+        assert len(results) == 3
+        scores = [result.score for result in results]
+        assert scores == sorted(scores, reverse=True)
+        assert len(set(result.seed for result in results)) == 3
+
+        parallel = restarts(3, n_iter=500, seed=0, workers=2)
+        assert [r.code for r in parallel] == [r.code for r in results]
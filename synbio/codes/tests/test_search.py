@@ -0,0 +1,38 @@
+import numpy as np
+
+from synbio.codes import metrics, search
+from synbio.tests import utils as testutils
+
+
+class TestSample:
+    def test_top_k(self):
+        result = search.sample(200, k=10, seed=0, shard_size=64)
+        everything = search.sample(200, k=200, seed=0, shard_size=64)
+
+        assert len(result) == 10
+        assert np.all(np.diff(result.scores) <= 0)
+        assert np.allclose(result.scores, everything.scores[:10])
+        assert np.allclose(metrics.silencicity(result.codes), result.scores)
+
+    def test_reproducible(self, tmp_path):
+        out_path = tmp_path / "sample.csv"
+        serial = search.sample(300, k=5, seed=42, shard_size=100)
+        parallel = search.sample(300, k=5, seed=42, shard_size=100,
+                                 workers=2, out_path=out_path)
+
+        assert np.array_equal(serial.codes, parallel.codes)
+        # header + top 5 of each of the three shards
+        assert len(out_path.read_text().splitlines()) == 1 + 3 * 5
+
+    def test_minimize(self):
+        result = search.sample(100, block_structure='red20',
+                               metric='mutability', k=3, seed=1,
+                               maximize=False)
+        assert np.all(np.diff(result.scores) >= 0)
+        assert all(len(code) == 64 for code in result.to_codes())
+
+    def test_errors(self):
+        for k in (0, -1):
+            assert isinstance(
+                testutils.raises(search.sample, [10], {'k': k}), ValueError
+            )
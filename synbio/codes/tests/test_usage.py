@@ -0,0 +1,199 @@
+import pickle
+
+import numpy as np
+
+from synbio.codes import Code, FrozenCode, get_code
+from synbio.codes import utils as codeutils
+from synbio.codes.usage import *
+from synbio.tests import utils as testutils
+
+PROTEIN = 'MKTAYIAKQRQISFVKSHFSRQLEERLGLIEVQAPILSRVGDGTQDNLSGAEKAVQVKVKALPD*'
+
+
+def _usage(seed=0):
+    rng = np.random.default_rng(seed)
+    return {codon: float(rng.random()) for codon in codeutils.standard_code}
+
+
+class TestRelativeAdaptiveness:
+    def test_relative_adaptiveness(self):
+        weights = relative_adaptiveness(
+            codeutils.standard_code, {'AAA': 3, 'AAG': 1}
+        )
+        assert weights['AAA'] == 1 and weights['AAG'] == 1 / 3
+        # amino acids without usage get uniform weights
+        assert weights['UGG'] == 1 and weights['GCU'] == 1
+        assert len(weights) == 64
+
+
+class TestCodonOptimizer:
+    def test_cai(self):
+        usage = _usage()
+        optimizer = CodonOptimizer(codeutils.standard_code, usage)
+        gene = optimizer.optimize(PROTEIN)
+        assert Code().translate(gene) == PROTEIN
+        weights = relative_adaptiveness(codeutils.standard_code, usage)
+        assert all(
+            weights[gene[i:i + 3]] == 1 for i in range(0, len(gene), 3)
+        )
+
+    def test_sample(self):
+        optimizer = CodonOptimizer(codeutils.standard_code, _usage())
+        genes = optimizer.optimize([PROTEIN] * 5, mode='sample', rng=0)
+        assert all(Code().translate(gene) == PROTEIN for gene in genes)
+        assert len(set(genes)) > 1
+        assert genes == optimizer.optimize(
+            [PROTEIN] * 5, mode='sample', rng=0
+        )
+        assert isinstance(
+            testutils.raises(optimizer.optimize, [PROTEIN], {'mode': 'x'}),
+            ValueError
+        )
+
+    def test_forbidden(self):
+        optimizer = CodonOptimizer(
+            codeutils.standard_code, {'AAA': 3, 'AAG': 1}
+        )
+        assert optimizer.optimize('KK', forbidden=['AAAAAA']) == 'AAAAAG'
+        # reverse complements are forbidden too, unless both_strands=False
+        assert optimizer.optimize('KK', forbidden=['UUUUUU']) == 'AAAAAG'
+        assert optimizer.optimize(
+            'KK', forbidden=['UUUUUU'], both_strands=False
+        ) == 'AAAAAA'
+
+        motifs = ['GAATTC', 'GGTCTC', 'GCGC']
+        optimizer = CodonOptimizer(codeutils.standard_code, _usage())
+        gene = optimizer.optimize(PROTEIN * 10, forbidden=motifs)
+        assert Code().translate(gene) == PROTEIN * 10
+        assert not any(m in gene for m in ('GAAUUC', 'GGUCUC', 'GCGC',
+                                           'GAGACC'))
+
+        # methionine has a single codon
+        assert isinstance(
+            testutils.raises(
+                optimizer.optimize, ['MM'], {'forbidden': ['ATGATG']}
+            ), ValueError
+        )
+
+    def test_harmonize(self):
+        usage = _usage()
+        optimizer = CodonOptimizer(codeutils.standard_code, usage)
+        gene = optimizer.optimize(PROTEIN, mode='sample', rng=1)
+        # harmonizing against the same usage table is the identity
+        assert optimizer.harmonize(gene, usage) == gene
+        assert optimizer.harmonize(gene.replace('U', 'T'), usage) == gene
+
+        source = {codon: 1 for codon in codeutils.standard_code}
+        harmonized = optimizer.harmonize([gene, gene], source)
+        assert harmonized == [optimizer.optimize(PROTEIN)] * 2
+
+
+class TestCodeUsage:
+    def test_code_usage(self):
+        usage = _usage()
+        code = Code(usage=usage)
+        assert code.usage == usage
+        assert code.optimize(PROTEIN) == \
+            CodonOptimizer(code, usage).optimize(PROTEIN)
+        assert Code(code).usage == usage
+        assert pickle.loads(pickle.dumps(code)).usage == usage
+
+        code.set_usage({'AAA': 1})
+        assert code.optimize('K') == 'AAA'
+        code.set_usage({'AAG': 1})
+        assert code.optimize('K') == 'AAG'
+
+        frozen = get_code(code)
+        assert isinstance(frozen, FrozenCode) and frozen.usage == {'AAG': 1}
+        assert get_code('STANDARD').usage is None
+        assert isinstance(
+            testutils.raises(frozen.set_usage, [usage], {}), TypeError
+        )
+
+
+class TestDesign:
+    def test_design(self):
+        usage = _usage()
+        optimizer = CodonOptimizer(codeutils.standard_code, usage)
+        # without constraints, design is the same as CAI optimization
+        assert optimizer.design(PROTEIN) == optimizer.optimize(PROTEIN)
+
+        gene = optimizer.design(
+            PROTEIN * 5, forbidden=['GAATTC', 'GCGC'], max_homopolymer=3,
+            gc_window=20, gc_range=(0.35, 0.65)
+        )
+        assert Code().translate(gene) == PROTEIN * 5
+        assert not any(m in gene for m in ('GAAUUC', 'GCGC'))
+        assert not any(nt * 4 in gene for nt in 'ACGU')
+        gc = [
+            sum(nt in 'GC' for nt in gene[i:i + 20])
+            for i in range(len(gene) - 19)
+        ]
+        assert 7 <= min(gc) and max(gc) <= 13
+
+    def test_optimal(self):
+        # the DP finds the best sequence that a greedy choice misses:
+        # choosing AAA (w=1) first would force the unused UUC (w=0)
+        optimizer = CodonOptimizer(
+            codeutils.standard_code, {'AAA': 10, 'AAG': 1, 'UUU': 10}
+        )
+        assert optimizer.design('KF', forbidden=['AAUUU']) == 'AAGUUU'
+        assert optimizer.design(['KF', 'FK'], forbidden=['AAUUU']) == \
+            ['AAGUUU', 'UUUAAA']
+
+    def test_errors(self):
+        code = Code(usage=_usage())
+        assert code.design('MM', max_homopolymer=2) == 'AUGAUG'
+        assert isinstance(
+            testutils.raises(code.design, ['MM'], {'forbidden': ['GAU']}),
+            ValueError
+        )
+        assert isinstance(
+            testutils.raises(
+                code.design, ['GGG'], {'gc_window': 9, 'gc_range': (0, 0.5)}
+            ), ValueError
+        )
+
+
+class TestStatistics:
+    def test_codon_counts(self):
+        counts = codon_counts('AUGAAAaaaUUUT')
+        assert counts.shape == (64,) and counts.sum() == 4
+        assert counts[codeutils.triplet_rna_codons.index('AAA')] == 2
+
+        batch = codon_counts(['ATGAAA', '', 'UUUUU'])
+        assert batch.shape == (3, 64)
+        assert batch.sum(axis=1).tolist() == [2, 0, 1]
+        assert (codon_counts(['ATGAAA', '', 'UUUUU'] * 3, workers=2)
+                == np.tile(batch, (3, 1))).all()
+
+    def test_rscu(self):
+        counts = codon_counts('AAAAAAAAGUUU')
+        values = dict(zip(
+            codeutils.triplet_rna_codons, rscu(counts, codeutils.standard_code)
+        ))
+        assert np.isclose(values['AAA'], 4 / 3)
+        assert np.isclose(values['AAG'], 2 / 3)
+        assert np.isclose(values['UUU'], 2) and values['UUC'] == 0
+        # amino acids that do not occur show no bias
+        assert values['GCU'] == 1
+        assert rscu(np.tile(counts, (2, 1)), codeutils.standard_code).shape \
+            == (2, 64)
+
+    def test_cai(self):
+        usage = {'AAA': 4, 'AAG': 1, 'UUU': 1, 'UUC': 1}
+        value = cai('AUGAAAAAGUUU', codeutils.standard_code, usage)
+        # AUG (Met) has a single codon and is left out
+        assert np.isclose(value, (1 * 0.25 * 1) ** (1 / 3))
+        # stop codons are left out too
+        assert cai('AUGAAAAAGUUUUAA', codeutils.standard_code, usage) == value
+        assert np.isnan(cai('UAAUGA', codeutils.standard_code, usage))
+
+        code = Code(usage=_usage())
+        genes = code.optimize([PROTEIN] * 3 + [PROTEIN[:10]], mode='sample',
+                              rng=0)
+        values = code.cai(genes)
+        assert values.shape == (4,) and (values <= 1).all()
+        assert np.allclose(values, code.cai(codon_counts(genes)))
+        assert np.allclose(values, code.cai(genes, workers=2))
+        assert code.cai(code.optimize(PROTEIN)) == 1
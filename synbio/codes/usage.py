@@ -0,0 +1,629 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union,
+)
+
+import numpy as np
+
+from synbio.codes.codons import get_codon_index, index_for
+from synbio.utils import reverse_complement, rna_basepairing
+
+__all__ = [
+    # functions
+    "relative_adaptiveness", "codon_counts", "rscu", "cai",
+    # classes
+    "CodonOptimizer",
+]
+
+UsageType = Mapping[str, float]
+RNGType = Optional[Union[int, np.random.Generator]]
+GenesType = Union[str, Iterable[str], np.ndarray]
+
+
+def relative_adaptiveness(
+        code: Mapping[str, str],
+        usage: Optional[UsageType] = None) -> Dict[str, float]:
+    """
+    A function that computes the relative adaptiveness w of every codon: its
+    usage divided by the usage of the most used synonymous codon. These are
+    the weights of the codon adaptation index (CAI). Codons missing from
+    usage count as unused; amino acids whose codons are all unused (or all
+    codons, if usage is None) get uniform weights of 1. Null ('0') codons
+    are skipped.
+
+    Parameters
+    ----------
+        dict code: codon -> amino acid table
+        dict usage: codon -> frequency (counts, per-thousand, etc.)
+
+    Returns
+    -------
+        dict weights: codon -> w in [0, 1]
+    """
+    usage = usage or {}
+    rmap = {}
+    for codon, aa in code.items():
+        if aa != '0':
+            rmap.setdefault(aa, []).append(codon)
+    weights = {}
+    for codons in rmap.values():
+        top = max(usage.get(c, 0) for c in codons)
+        for c in codons:
+            weights[c] = usage.get(c, 0) / top if top > 0 else 1.0
+    return weights
+
+
+def codon_counts(
+        genes: Union[str, Iterable[str]],
+        codon_length: int = 3,
+        workers: int = 1) -> np.ndarray:
+    """
+    A function that counts the codons of one gene or of a batch of genes
+    (DNA or RNA), in codon index order (see CodonIndex). A batch is encoded
+    in one call and counted with a single bincount; bases after the last
+    full codon of a gene are ignored. Sum the rows of a batch to pool
+    genes, e.g., into per-genome counts.
+
+    Parameters
+    ----------
+        genes: a gene sequence or an iterable of them
+        int codon_length: codon length
+        int workers: number of processes to shard a gene batch across
+
+    Returns
+    -------
+        np.ndarray counts: (C,) for one gene, (N, C) for a batch
+    """
+    if isinstance(genes, str):
+        return _count_codons(codon_length, [genes])[0]
+    genes = [str(gene) for gene in genes]
+    if workers > 1 and len(genes) > 1:
+        size = -(-len(genes) // workers)
+        chunks = [genes[i:i + size] for i in range(0, len(genes), size)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return np.concatenate(list(pool.map(
+                _count_codons, [codon_length] * len(chunks), chunks
+            )))
+    return _count_codons(codon_length, genes)
+
+
+def _count_codons(codon_length: int, genes: List[str]) -> np.ndarray:
+    """
+    A private function that counts the codons of a batch of genes (module
+    level so it can run in worker processes)
+    """
+    # DNA and RNA codons share indices
+    index = get_codon_index('RNA', codon_length)
+    genes = [gene[:len(gene) // codon_length * codon_length] for gene in genes]
+    codon_ix = index.encode(''.join(genes).upper().replace('T', 'U'))
+    gene_ix = np.repeat(
+        np.arange(len(genes)), [len(gene) // codon_length for gene in genes]
+    )
+    return np.bincount(
+        gene_ix * len(index) + codon_ix, minlength=len(genes) * len(index)
+    ).reshape(len(genes), len(index))
+
+
+def _synonym_groups(code: Mapping[str, str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    A private function that returns, for every codon in index order, a
+    (C, A) one-hot matrix of its amino acid and the number of codons
+    encoding that amino acid (0 for null and unassigned codons)
+    """
+    index = index_for(code)
+    aminoacids = sorted({aa for aa in code.values() if aa != '0'})
+    onehot = np.zeros((len(index), len(aminoacids)))
+    for codon, aa in code.items():
+        if aa != '0':
+            onehot[index.position[codon], aminoacids.index(aa)] = 1
+    return onehot, onehot @ onehot.sum(axis=0)
+
+
+def rscu(counts: np.ndarray, code: Mapping[str, str]) -> np.ndarray:
+    """
+    A function that computes the relative synonymous codon usage (RSCU) of
+    codon counts: each codon's count divided by the mean count of the
+    codons of its amino acid. Amino acids that do not occur get an RSCU of
+    1 (no bias), and null codons an RSCU of 0.
+
+    Parameters
+    ----------
+        np.ndarray counts: (C,) or (N, C) codon counts (see codon_counts)
+        dict code: codon -> amino acid table
+
+    Returns
+    -------
+        np.ndarray rscu: float array of the same shape as counts
+    """
+    counts = np.asarray(counts, dtype=float)
+    onehot, n_synonyms = _synonym_groups(code)
+    totals = counts @ onehot @ onehot.T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.where(totals > 0, counts * n_synonyms / totals, 1.0)
+    return np.where(n_synonyms > 0, out, 0.0)
+
+
+def cai(
+        genes: GenesType,
+        code: Mapping[str, str],
+        usage: Optional[UsageType] = None,
+        workers: int = 1) -> Union[float, np.ndarray]:
+    """
+    A function that computes the codon adaptation index (CAI) of one gene or
+    of a batch of genes: the geometric mean of the relative adaptiveness w
+    of their codons (see relative_adaptiveness). Stop codons, codons of
+    amino acids with a single codon (e.g., Met, Trp), and null codons are
+    left out. A codon with w = 0
+    gives a CAI of 0. Batches reduce to one (N, C) @ (C,) product over
+    codon counts, so precomputed counts can be passed instead of genes.
+
+    Parameters
+    ----------
+        genes: a gene, an iterable of genes, or a (C,) or (N, C) array of
+            codon counts
+        dict code: codon -> amino acid table
+        dict usage: codon -> frequency of the reference gene set
+        int workers: number of processes to count a gene batch with
+
+    Returns
+    -------
+        float cai for one gene (or a (C,) count array), np.ndarray (N,)
+        otherwise; NaN for genes without informative codons
+    """
+    index = index_for(code)
+    if isinstance(genes, np.ndarray):
+        counts = genes.astype(float)
+    else:
+        counts = codon_counts(genes, index.length, workers).astype(float)
+
+    weights = np.zeros(len(index))
+    for codon, w in relative_adaptiveness(code, usage).items():
+        weights[index.position[codon]] = w
+    _, n_synonyms = _synonym_groups(code)
+    informative = n_synonyms > 1
+    for codon, aa in code.items():
+        if aa == '*':
+            informative[index.position[codon]] = False
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_w = np.where(informative, np.log(weights), 0.0)
+        used = counts[..., informative]
+        # unused codons contribute nothing (rather than 0 * log 0)
+        log_sum = np.where(counts > 0, counts * log_w, 0.0).sum(axis=-1)
+        out = np.exp(log_sum / used.sum(axis=-1))
+    return float(out) if out.ndim == 0 else out
+
+
+class CodonOptimizer:
+    """
+    A class that turns protein sequences into coding sequences for a genetic
+    code and a codon usage table. All per-amino-acid tables (synonymous
+    codons, sampling probabilities, CAI weights) are built once, so each
+    call reduces to array lookups over the whole protein, or over a whole
+    batch of proteins at once. Three modes are supported:
+
+        'cai': always the most used synonymous codon (maximizes CAI)
+        'sample': codons drawn in proportion to their usage
+        harmonize(): codons matched to a source gene's relative usage
+
+    Forbidden motifs (e.g., restriction sites) are avoided by a left to
+    right pass that, after each codon choice, only checks the window of
+    sequence the new codon could complete a motif in, backtracking when no
+    synonym fits. The pass starts at the first codon involved in a motif
+    and never rescans the whole sequence. If the motifs cannot be avoided,
+    ValueError is raised. design() instead finds the best sequence under
+    motif, homopolymer and windowed GC constraints by dynamic programming.
+
+    >>> from synbio.codes import get_code
+    >>> optimizer = CodonOptimizer(get_code('STANDARD'), {'AAA': 3, 'AAG': 1})
+    >>> optimizer.optimize('KK', forbidden=['AAAAAA'])
+    'AAAAAG'
+    """
+
+    def __init__(
+            self,
+            code: Mapping[str, str],
+            usage: Optional[UsageType] = None) -> None:
+        self.code = code
+        self.index = index = index_for(code)
+        self.usage = dict(usage) if usage else None
+        weights = relative_adaptiveness(code, usage)
+
+        # per-codon tables, in codon index order
+        self.weights = np.zeros(len(index))
+        for codon, w in weights.items():
+            self.weights[index.position[codon]] = w
+        self._codon_bytes = np.frombuffer(
+            ''.join(index.codons).encode(), dtype=np.uint8
+        ).reshape(len(index), index.length)
+
+        # per-amino-acid tables; synonyms sorted from most to least used
+        self.aminoacids = []
+        synonyms = []
+        for codon, aa in code.items():
+            if aa == '0':
+                continue
+            if aa not in self.aminoacids:
+                self.aminoacids.append(aa)
+                synonyms.append([])
+            synonyms[self.aminoacids.index(aa)].append(index.position[codon])
+        synonyms = [
+            sorted(ix, key=lambda i: -self.weights[i]) for ix in synonyms
+        ]
+        width = max(map(len, synonyms))
+        self._synonyms = np.full((len(synonyms), width), -1, dtype=np.intp)
+        prob = np.zeros((len(synonyms), width))
+        for a, ix in enumerate(synonyms):
+            self._synonyms[a, :len(ix)] = ix
+            counts = np.array([
+                (usage or {}).get(index.codons[i], 0) for i in ix
+            ], dtype=float)
+            prob[a, :len(ix)] = (counts / counts.sum() if counts.sum() > 0
+                                 else 1 / len(ix))
+        self._cumulative = np.cumsum(prob, axis=1)
+        self._cumulative[:, -1] = 1  # guard against rounding
+
+        # byte -> amino acid index
+        self._aa_lookup = np.full(256, -1, dtype=np.intp)
+        for a, aa in enumerate(self.aminoacids):
+            if len(aa) == 1:
+                self._aa_lookup[ord(aa)] = a
+
+    def _encode_protein(self, protein: str) -> np.ndarray:
+        aa_ix = self._aa_lookup[
+            np.frombuffer(str(protein).encode(), dtype=np.uint8)
+        ]
+        if (aa_ix < 0).any():
+            bad = str(protein)[int(np.argmax(aa_ix < 0))]
+            raise KeyError(f"amino acid {bad} is not encoded by this code")
+        return aa_ix
+
+    def _choose(
+            self, aa_ix: np.ndarray, mode: str, rng: RNGType) -> np.ndarray:
+        if mode == 'cai':
+            return self._synonyms[aa_ix, 0]
+        elif mode == 'sample':
+            u = np.random.default_rng(rng).random(len(aa_ix))
+            choice = (u[:, None] > self._cumulative[aa_ix]).sum(axis=1)
+            return self._synonyms[aa_ix, choice]
+        raise ValueError("mode must be 'cai' or 'sample'")
+
+    def _to_str(self, codon_ix: np.ndarray) -> str:
+        return self._codon_bytes[codon_ix].tobytes().decode()
+
+    def _motifs(self, forbidden: Iterable[str], both_strands: bool):
+        motifs = {str(m).upper().replace('T', 'U') for m in forbidden}
+        if both_strands:
+            motifs |= {reverse_complement(m, rna_basepairing) for m in motifs}
+        return sorted(m for m in motifs if m)
+
+    # bound on codon choices tried per codon by _avoid before giving up
+    MAX_BACKTRACK = 100
+
+    def _avoid(
+            self,
+            codon_ix: np.ndarray,
+            aa_ix: np.ndarray,
+            motifs: List[str]) -> np.ndarray:
+        """
+        A private method that replaces codons so no motif occurs. Codons are
+        placed left to right and each is checked only against the window
+        it could complete a motif in; when no synonym fits, the search
+        backtracks to the previous codon.
+        """
+        seq = self._to_str(codon_ix)
+        hits = [h for h in (seq.find(m) for m in motifs) if h >= 0]
+        if not hits:
+            return codon_ix
+
+        codons = self.index.codons
+        span = max(map(len, motifs)) - 1
+        # number of preceding codons that can share a window with a codon
+        context = -(-span // self.index.length)
+        # candidates for each position: the current choice, then synonyms
+        options = [
+            [i] + [j for j in row if j >= 0 and j != i]
+            for i, row in zip(codon_ix.tolist(),
+                              self._synonyms[aa_ix].tolist())
+        ]
+        chosen = [0] * len(options)
+
+        def fits(p: int, k: int) -> bool:
+            tail = ''.join(
+                codons[options[q][chosen[q]]]
+                for q in range(max(0, p - context), p)
+            )[-span:] if span else ''
+            window = tail + codons[options[p][k]]
+            return not any(m in window for m in motifs)
+
+        p = min(hits) // self.index.length
+        budget = self.MAX_BACKTRACK * len(options)
+        while p < len(options):
+            k = chosen[p]
+            while k < len(options[p]) and not fits(p, k):
+                k += 1
+                budget -= 1
+            if k < len(options[p]):
+                chosen[p] = k
+                p += 1
+                continue
+            # no synonym fits: try the next choice at the previous codon
+            chosen[p] = 0
+            p -= 1
+            if p < 0 or budget <= 0:
+                raise ValueError(
+                    'no synonymous recoding avoids the forbidden motifs'
+                )
+            chosen[p] += 1
+
+        return np.array(
+            [opts[k] for opts, k in zip(options, chosen)], dtype=np.intp
+        )
+
+    def _finish(
+            self,
+            codon_ix: np.ndarray,
+            aa_ix: np.ndarray,
+            lengths: List[int],
+            forbidden: Sequence[str],
+            both_strands: bool) -> List[str]:
+        motifs = self._motifs(forbidden, both_strands)
+        out = []
+        start = 0
+        for length in lengths:
+            gene = codon_ix[start:start + length]
+            if motifs:
+                gene = self._avoid(gene, aa_ix[start:start + length], motifs)
+            out.append(self._to_str(gene))
+            start += length
+        return out
+
+    def optimize(
+            self,
+            proteins: Union[str, Iterable[str]],
+            mode: str = 'cai',
+            forbidden: Sequence[str] = (),
+            both_strands: bool = True,
+            rng: RNGType = None) -> Union[str, List[str]]:
+        """
+        A method that reverse translates one protein or a batch of proteins
+        (all positions of all proteins are chosen in one vectorized call)
+
+        Parameters
+        ----------
+            proteins: a protein sequence or an iterable of them
+            str mode: 'cai' (most used codons) or 'sample' (usage-weighted)
+            list<str> forbidden: motifs that must not occur (DNA or RNA)
+            bool both_strands: also forbid the motifs' reverse complements
+            rng: np.random.Generator or seed, for mode='sample'
+
+        Returns
+        -------
+            str gene or list<str> genes: RNA coding sequences
+        """
+        single = isinstance(proteins, str)
+        proteins = [proteins] if single else [str(p) for p in proteins]
+        aa_ix = self._encode_protein(''.join(proteins))
+        codon_ix = self._choose(aa_ix, mode, rng)
+        out = self._finish(codon_ix, aa_ix, [len(p) for p in proteins],
+                           forbidden, both_strands)
+        return out[0] if single else out
+
+    def harmonize(
+            self,
+            genes: Union[str, Iterable[str]],
+            source_usage: UsageType,
+            source_code: Optional[Mapping[str, str]] = None,
+            forbidden: Sequence[str] = (),
+            both_strands: bool = True) -> Union[str, List[str]]:
+        """
+        A method that recodes source genes so that every codon has about
+        the same relative usage (w) in this optimizer's usage table as the
+        original codon had in the source organism's. This preserves the
+        pattern of fast and slow codons along the gene.
+
+        Parameters
+        ----------
+            genes: a source gene (DNA or RNA) or an iterable of them
+            dict source_usage: codon usage of the source organism
+            dict source_code: genetic code of the source genes (default:
+                this optimizer's code)
+            list<str> forbidden: motifs that must not occur (DNA or RNA)
+            bool both_strands: also forbid the motifs' reverse complements
+
+        Returns
+        -------
+            str gene or list<str> genes: harmonized RNA coding sequences
+        """
+        source_code = self.code if source_code is None else source_code
+        source_w = relative_adaptiveness(source_code, source_usage)
+        index = self.index
+
+        # source codon -> target codon with the closest relative usage
+        table = np.full(len(index), -1, dtype=np.intp)
+        aa_table = np.full(len(index), -1, dtype=np.intp)
+        for codon, w in source_w.items():
+            aa = source_code[codon]
+            if aa not in self.aminoacids:
+                continue
+            a = self.aminoacids.index(aa)
+            synonyms = self._synonyms[a][self._synonyms[a] >= 0]
+            best = synonyms[np.argmin(np.abs(self.weights[synonyms] - w))]
+            i = index.position[codon.upper().replace('T', 'U')]
+            table[i], aa_table[i] = best, a
+
+        single = isinstance(genes, str)
+        genes = [genes] if single else [str(g) for g in genes]
+        for gene in genes:
+            if len(gene) % index.length != 0:
+                raise ValueError(f"seq is not divisible by n ({index.length})")
+        source_ix = index.encode(''.join(genes).upper().replace('T', 'U'))
+        if (table[source_ix] < 0).any():
+            bad = index.codons[source_ix[table[source_ix] < 0][0]]
+            raise KeyError(f"codon {bad} cannot be harmonized into this code")
+
+        out = self._finish(
+            table[source_ix], aa_table[source_ix],
+            [len(g) // index.length for g in genes], forbidden, both_strands
+        )
+        return out[0] if single else out
+
+    def design(
+            self,
+            proteins: Union[str, Iterable[str]],
+            forbidden: Sequence[str] = (),
+            both_strands: bool = True,
+            max_homopolymer: Optional[int] = None,
+            gc_window: Optional[int] = None,
+            gc_range: Tuple[float, float] = (0.0, 1.0),
+            max_states: int = 4096) -> Union[str, List[str]]:
+        """
+        A method that reverse translates proteins under synthesis constraints
+        by dynamic programming (Viterbi) over synonymous codon choices. The
+        result maximizes the CAI (the sum of log w) among all coding
+        sequences that contain no forbidden motif, no homopolymer longer
+        than max_homopolymer and whose every gc_window-long window has a
+        GC fraction within gc_range.
+
+        The DP state is only what future constraints can depend on: the
+        last (longest motif - 1) nucleotides and the GC pattern of the last
+        (gc_window - 1) nucleotides. States are merged on that key, so the
+        runtime is linear in protein length. The search is exact as long
+        as no position has more than max_states distinct states; beyond
+        that, only the max_states best are kept (a beam search).
+
+        Parameters
+        ----------
+            proteins: a protein sequence or an iterable of them
+            list<str> forbidden: motifs that must not occur (DNA or RNA)
+            bool both_strands: also forbid the motifs' reverse complements
+            int max_homopolymer: longest allowed run of one nucleotide
+            int gc_window: length of the sliding GC window
+            tuple<float> gc_range: (min, max) GC fraction of every window
+            int max_states: most DP states kept per position
+
+        Returns
+        -------
+            str gene or list<str> genes: RNA coding sequences
+
+        Raises
+        ------
+            ValueError: if no coding sequence satisfies the constraints
+        """
+        motifs = self._motifs(forbidden, both_strands)
+        if max_homopolymer is not None:
+            motifs = sorted(set(motifs) | {
+                nt * (max_homopolymer + 1) for nt in self.index.alphabet
+            })
+        single = isinstance(proteins, str)
+        proteins = [proteins] if single else [str(p) for p in proteins]
+        out = [
+            self._viterbi(self._encode_protein(protein), motifs, gc_window,
+                          gc_range, max_states)
+            for protein in proteins
+        ]
+        return out[0] if single else out
+
+    def _viterbi(
+            self,
+            aa_ix: np.ndarray,
+            motifs: List[str],
+            gc_window: Optional[int],
+            gc_range: Tuple[float, float],
+            max_states: int) -> str:
+        """
+        A private method that runs the constrained DP for one protein. All
+        states of a position are advanced through all synonymous codons at
+        once as arrays; a state is (tail id, GC bits, GC count).
+        """
+        codons = self.index.codons
+        length = self.index.length
+        span = max(map(len, motifs), default=1) - 1
+        log_w = np.log(np.maximum(self.weights, 1e-12))
+
+        gc_window = gc_window or 0
+        if gc_window:
+            gc_min = int(np.ceil(gc_range[0] * gc_window - 1e-9))
+            gc_max = int(np.floor(gc_range[1] * gc_window + 1e-9))
+            keep = (1 << (gc_window - 1)) - 1
+        gc_bits = np.array(
+            [[nt in 'GC' for nt in codon] for codon in codons], dtype=np.int64
+        )
+
+        # motif automaton over tails, filled lazily: steps[t, c] is the id
+        # of the tail after appending codon c to tail t, -1 if a motif is
+        # completed and -2 if not computed yet
+        tails, tail_id = [''], {'': 0}
+        steps = np.full((1, len(codons)), -2, dtype=np.int64)
+
+        def step(tail: np.ndarray, c: int) -> np.ndarray:
+            nonlocal steps
+            for t in np.unique(tail[steps[tail, c] == -2]).tolist():
+                seq = tails[t] + codons[c]
+                if any(m in seq for m in motifs):
+                    steps[t, c] = -1
+                    continue
+                new = seq[-span:] if span else ''
+                if new not in tail_id:
+                    tail_id[new] = len(tails)
+                    tails.append(new)
+                steps[t, c] = tail_id[new]
+                if len(tails) > len(steps):
+                    steps = np.vstack([steps, np.full_like(steps, -2)])
+            return steps[tail, c]
+
+        tail = np.zeros(1, dtype=np.int64)
+        bits = np.zeros(1, dtype=np.int64)
+        count = np.zeros(1, dtype=np.int64)
+        score = np.zeros(1)
+        back = []
+        for p, a in enumerate(aa_ix.tolist()):
+            candidates = []
+            for c in self._synonyms[a][self._synonyms[a] >= 0].tolist():
+                new_tail = step(tail, c)
+                ok = new_tail >= 0
+                new_bits, new_count = bits, count
+                if gc_window:
+                    for n, g in enumerate(gc_bits[c].tolist()):
+                        full = new_bits << 1 | g
+                        new_count = new_count + g
+                        # a window is complete from its last base on
+                        if p * length + n >= gc_window - 1:
+                            ok &= (gc_min <= new_count) & (new_count <= gc_max)
+                            outgoing = full >> (gc_window - 1) & 1
+                            new_count = new_count - outgoing
+                        new_bits = full & keep
+                prev = np.flatnonzero(ok)
+                candidates.append((
+                    new_tail[prev], new_bits[prev], new_count[prev],
+                    score[prev] + log_w[c], prev, np.full(len(prev), c)
+                ))
+            tail, bits, count, score, prev, chosen = map(
+                np.concatenate, zip(*candidates)
+            )
+            if not len(score):
+                raise ValueError(
+                    f"no coding sequence satisfies the constraints (stuck "
+                    f"at residue {p})"
+                )
+
+            # merge equal states, keeping the best scoring of each
+            order = np.lexsort((-score, bits, tail))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = (np.diff(tail[order]) != 0) | \
+                (np.diff(bits[order]) != 0)
+            order = order[first]
+            if len(order) > max_states:
+                order = order[np.argsort(-score[order])[:max_states]]
+            tail, bits, count, score = (
+                tail[order], bits[order], count[order], score[order]
+            )
+            back.append((prev[order], chosen[order]))
+
+        # trace the best path back
+        s = int(np.argmax(score))
+        path = []
+        for prev, chosen in reversed(back):
+            path.append(chosen[s])
+            s = prev[s]
+        return self._to_str(np.array(path[::-1], dtype=np.intp))
@@ -1,26 +1,34 @@
 import itertools
 import pickle
 import random
-from collections import deque
 from copy import copy
+from functools import lru_cache
 from math import comb as binomial
 from pathlib import Path
 
+import numpy as np
+
+from synbio.codes.codons import (
+    dna_wobbling, get_codon_index, index_for, rna_wobbling,
+)
 from synbio.utils import (
-    aminoacids, kdHydrophobicity, rNTPs, rna_basepairing, triplet_rna_codons,
+    aminoacids, kdHydrophobicity, rNTPs, triplet_rna_codons,
 )
 
 # define scope of package
 __all__ = [
     # definitions
-    "unrestricted_block", "standard_block", "natural_block", "dna_wobbling",
+    "unrestricted_block", "standard_block", "natural_block",
+    "block_structures", "dna_wobbling",
     "rna_wobbling", "standard_code", "colorado_code", "RED20", "RED15",
     "FS20", "FS16",
     # functions
     "get_aa_counts", "get_block_counts", "is_ambiguous", "is_promiscuous",
-    "is_one_to_one", "get_codon_connectivity", "get_resi_connectivity",
+    "is_one_to_one", "get_codon_connectivity", "connectivity_matrix",
+    "get_resi_connectivity",
     "get_codon_neighbors", "table_to_blocks", "blocks_to_table", "check_block",
-    "random_code", "num_codes", "silencicity", "mutability", "promiscuity",
+    "get_block_structure", "codon_blocks", "random_code", "random_codes",
+    "num_codes", "silencicity", "mutability", "promiscuity",
     "mut_pair_num", "get_mut_pairs", "order_NTPs",
 ]
 
@@ -40,7 +48,7 @@ def _get_block(grouping):
     }
 
 
-unrestricted_block = _get_block(triplet_rna_codons)
+unrestricted_block = _get_block([codon] for codon in triplet_rna_codons)
 
 
 def _get_standard_grouping(codon):
@@ -49,9 +57,10 @@ def _get_standard_grouping(codon):
         else 2
 
 
-_, _standard_grouping = zip(
-    *itertools.groupby(triplet_rna_codons, _get_standard_grouping)
-)
+_standard_grouping = [
+    list(group) for _, group
+    in itertools.groupby(triplet_rna_codons, _get_standard_grouping)
+]
 standard_block = _get_block(_standard_grouping)
 
 natural_block = {
@@ -82,20 +91,11 @@ natural_block = {
     24: ['GGU', 'GGC', 'GGA', 'GGG']
 }
 
-# define Watson Crick Wobbling Rules
-dna_wobbling = {
-    'T': ['A', 'G'],
-    'C': ['G'],
-    'A': ['T', 'C'],
-    'G': ['T', 'C'],
-    'I': ['A', 'C', 'T']
-}
-rna_wobbling = {
-    'U': ['A', 'G'],
-    'C': ['G'],
-    'A': ['U', 'C'],
-    'G': ['U', 'C'],
-    'I': ['A', 'C', 'U']
+# named block structures (see random_code)
+block_structures = {
+    'standard': standard_block,
+    'preserve_block': natural_block,
+    'unrestricted': unrestricted_block
 }
 
 # define standard code
@@ -234,7 +234,7 @@ colorado_code = {
 }
 
 
-# get RED20 and RED15 from file
+# get RED20, RED15, FS20 and FS16 from file (lazily; see __getattr__)
 def _get_pickle_path(local_path_str):
     _basepath = Path(__file__).absolute().parent
     return Path(
@@ -242,14 +242,25 @@ def _get_pickle_path(local_path_str):
     )
 
 
-with open(_get_pickle_path('res/RED20.pickle'), 'rb') as handle:
-    RED20 = pickle.load(handle)
-with open(_get_pickle_path('res/RED15.pickle'), 'rb') as handle:
-    RED15 = pickle.load(handle)
-with open(_get_pickle_path('res/FS20.pickle'), 'rb') as handle:
-    FS20 = pickle.load(handle)
-with open(_get_pickle_path('res/FS16.pickle'), 'rb') as handle:
-    FS16 = pickle.load(handle)
+_pickled_codes = {
+    'RED20': 'res/RED20.pickle',
+    'RED15': 'res/RED15.pickle',
+    'FS20': 'res/FS20.pickle',
+    'FS16': 'res/FS16.pickle',
+}
+
+
+@lru_cache(maxsize=None)
+def _load_pickled_code(name):
+    with open(_get_pickle_path(_pickled_codes[name]), 'rb') as handle:
+        return pickle.load(handle)
+
+
+def __getattr__(name):
+    # pickled codes are only unpickled the first time they are accessed
+    if name in _pickled_codes:
+        return _load_pickled_code(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 #############
@@ -318,13 +329,19 @@ def is_ambiguous(table):
     -------
     bool ambiguous: boolean representing the ambiguity of the table
     """
-    # use promiscuity method to determine ambiguity
-    try:
-        __ = promiscuity(table, allow_ambiguous=False)  # fails if ambiguous
-        ambiguous = False
-    except ValueError:
-        ambiguous = True
-    return ambiguous
+    # a codon is ambiguous if the tRNAs that decode it (see
+    # CodonIndex.wobble) are charged with two different non-null signals;
+    # codons missing from the table have no tRNA
+    index = index_for(table)
+    labels, values = index.labels(table, missing='0')
+    labels = np.append(labels[0], -1)  # -1 stands for padding and '0'
+    if '0' in values:
+        labels[labels == values.index('0')] = -1
+    decoded = labels[index.decoders]
+    valid = decoded >= 0
+    highest = decoded.max(axis=1)
+    lowest = np.where(valid, decoded, highest[:, None]).min(axis=1)
+    return bool((valid.any(axis=1) & (highest != lowest)).any())
 
 
 def is_promiscuous(table):
@@ -389,8 +406,8 @@ def get_codon_connectivity(table):
     allowed per path.
 
     Outputs a dict of str --> list of (str, int) tuples representing a list
-    of the connected codons and their distance. Implemented as breadth
-    first search.
+    of the connected codons and their distance, sorted by distance. Works
+    for any codon length; see connectivity_matrix for the array form.
 
     Parameters
     ----------
@@ -401,75 +418,84 @@ def get_codon_connectivity(table):
     dict dist_dict: a python dictionary representing the adjacency matrix of
         a codon table with respect to codon neighbors.
     """
+    codons = list(table.keys())
+    dist = connectivity_matrix(table, codons)
     # declare dictionary of distances
     dist_dict = {}
-    # loop through all possible codons
-    for codon in table.keys():
-        cache = set(codon)
-        codon_deque = deque()
-        neighbors = []
-        # use connect_recurse to map connectivity
-        dist_dict[codon] = _connect_recurse(
-            codon, 1, table, neighbors,
-            codon_deque, cache
-        )
-    # return codon_dist
+    for i, codon in enumerate(codons):
+        connected = np.flatnonzero(dist[i])
+        order = np.argsort(dist[i, connected], kind='stable')
+        dist_dict[codon] = [
+            (codons[j], int(dist[i, j])) for j in connected[order]
+        ]
     return dist_dict
 
 
-def _connect_recurse(codon, level, table, neighbors, codon_deque, cache):
-    """ A recursive helper function that finds all of a codon's nearest
-    neighbors and how far away they are. Returns a list of tuples
-    representing the codons and their distances away.
+@lru_cache(maxsize=None)
+def _adjacency_matrix(codons):
+    # (C, C) float matrix (so products use BLAS); [i, j] = 1 if codons i
+    # and j are one mutation apart
+    index = index_for(codons)
+    position = np.array([index.position[codon] for codon in codons])
+    full = np.zeros((len(index), len(index)), dtype=np.float32)
+    full[np.arange(len(index))[:, None], index.neighbors] = 1
+    adjacency = full[position[:, None], position[None, :]]
+    adjacency.setflags(write=False)
+    return adjacency
+
 
-    Codons are said to be connected if going from c --> c' converts the
-    decoded AA from A --> A' without an intermediate residue.
+def connectivity_matrix(codes, codons=triplet_rna_codons):
+    """A function that computes codon connectivity (see
+    get_codon_connectivity) as distance matrices, for one code or a batch
+    of codes. Runs an iterative breadth first search from every codon at
+    once: each level expands the frontier of synonymous codons with one
+    matrix product against the codon adjacency matrix.
 
     Parameters
     ----------
-    - str codon: a string representing the input codon
-    - int level: the current number of mutations away from the start codon
-    - dict table: a python dict representing the codon table
-    - list neighbors: the current list of the base codon's nearest neighbors
-    - deque codon_deque: the queue of codons to search recursively
-    - set cache: memoization set to store previously visited codons
+    codes: a codon table dict, a list of dicts, or an (N, C) integer array
+        whose columns follow codons (e.g., from metrics.encode_codes)
+    list<str> codons: codon order of the matrix rows and columns; any
+        codon length is supported
+
     Returns
     -------
-    list neighbors: returns updated neighbors list
+    np.ndarray dist: (C, C) int array for a single dict, else (N, C, C);
+        dist[..., i, j] is the number of mutations from codon i to codon
+        j, or 0 if j is not connected to i
     """
-    # import ipdb; ipdb.set_trace()
-    # loop through every codon one mutation away
-    for i, base in enumerate(codon):
-        for nt in rNTPs:
-            # handle if nt is the same as base
-            if nt == base:
-                continue
-            # if not, generate new codon
-            c_new = codon[:i] + nt + codon[i + 1:]
-            # Base case: c_new already found
-            if c_new in cache:
-                continue
-            # Base case: found terminus
-            elif table[c_new] != table[codon]:
-                # add distance to neighbors list
-                neighbors.append((c_new, level))
-                # add c_new to cache of found codons
-                cache.add(str(c_new))
-            # Recursive case
-            else:
-                # add c_new to cache of found codons
-                cache.add(c_new)
-                # append c_new to queue of codons to recurse through
-                codon_deque.appendleft((c_new, level))
-    # iterate over codons to recursively search for connectivity
-    while not len(codon_deque) == 0:
-        # get next codon to search
-        c, newlevel = codon_deque.pop()
-        # append results to neighbors list
-        neighbors = _connect_recurse(c, newlevel + 1, table,
-                                     neighbors, codon_deque, cache)
-    # return resulting list
-    return neighbors
+    single = isinstance(codes, dict)
+    if single or (isinstance(codes, list) and codes
+                  and isinstance(codes[0], dict)):
+        tables = [codes] if single else codes
+        labels = {}
+        codes = np.array([
+            [labels.setdefault(table[codon], len(labels)) for codon in codons]
+            for table in tables
+        ])
+    codes = np.asarray(codes)
+    if codes.ndim == 1:
+        single = True
+        codes = codes[None, :]
+
+    adjacency = _adjacency_matrix(tuple(codons))
+    n_codes, n_codons = codes.shape
+    dist = np.zeros((n_codes, n_codons, n_codons), dtype=np.int16)
+    # synonymous[n, i, j]: codon j encodes the same signal as codon i
+    synonymous = codes[:, :, None] == codes[:, None, :]
+    frontier = np.broadcast_to(
+        np.eye(n_codons, dtype=bool), dist.shape
+    ).copy()
+    visited = frontier.copy()
+    level = 0
+    while frontier.any():
+        level += 1
+        reached = (frontier.astype(np.float32) @ adjacency > 0) & ~visited
+        visited |= reached
+        dist[reached & ~synonymous] = level
+        # only synonymous codons are searched further
+        frontier = reached & synonymous
+    return dist[0] if single else dist
 
 
 def get_resi_connectivity(table):
@@ -511,20 +537,16 @@ def get_codon_neighbors(codon):
     -------
     list<str> neighbors: a list of codons one mutation away
     """
-    # declare list of neighbors
-    neighbors = []
-    # generate nearest neighbors by looping over codon positions
-    for i, base in enumerate(codon):
-        for nt in rNTPs:
-            # handle if nt is the same as base
-            if nt == base:
-                continue
-            # if not, generate new codon
-            c_new = codon[:i] + nt + codon[i + 1:]
-            # store new codon in neighbors
-            neighbors.append(c_new)
-    # return resulting list
-    return neighbors
+    index = index_for([codon])
+    try:
+        return index.decode(index.neighbors[index.position[codon]])
+    except KeyError:
+        # nonstandard bases: mutate to the standard RNA bases only
+        return [
+            codon[:i] + nt + codon[i + 1:]
+            for i, base in enumerate(codon)
+            for nt in rNTPs if nt != base
+        ]
 
 
 def table_to_blocks(table, block_struct):
@@ -607,6 +629,31 @@ def check_block(table, block_struct):
     return True
 
 
+def get_block_structure(block_structure):
+    """A function that returns the block structure dict for a name in
+    block_structures, or the input itself if it is already a dict.
+
+    Parameters
+    ----------
+    str or dict block_structure: name or block -> codon list dict
+
+    Returns
+    -------
+    dict block_struct: a python dict representing the table block structure
+    """
+    if isinstance(block_structure, dict):
+        return block_structure
+    try:
+        return block_structures[block_structure]
+    except KeyError:
+        raise ValueError(
+            'block_structure string not recognized. '
+            'Use one of the following options: {0}'.format(
+                set(block_structures.keys())
+            )
+        )
+
+
 def random_code(block_structure='standard'):
     """A function used to generate a random codon table, optionally
     defining the block structure. Will guarantee each amino acid be
@@ -627,20 +674,7 @@ def random_code(block_structure='standard'):
     dict table: a python dict representing the codon table to return
     """
     # determine block structure based on wobble rule
-    block_choices = {
-        'standard': standard_block,
-        'preserve_block': natural_block,
-        'unrestricted': unrestricted_block
-    }
-    try:
-        block_struct = copy(block_choices[block_structure])
-    except KeyError:
-        raise ValueError(
-            'block_structure string not recognized. '
-            'Use one of the following options: {0}'.format(
-                set(block_choices.keys())
-            )
-        )
+    block_struct = copy(get_block_structure(block_structure))
     # get blocks to assign
     blocks = list(block_struct.keys())
     random.shuffle(blocks)
@@ -653,7 +687,74 @@ def random_code(block_structure='standard'):
         AA = random.choice(aminoacids)
         block_struct[block] = AA
     # convert block_struct to table and return
-    return blocks_to_table(block_struct, block_choices[block_structure])
+    return blocks_to_table(block_struct, get_block_structure(block_structure))
+
+
+def codon_blocks(block_structure='standard', codons=triplet_rna_codons):
+    """A function that returns, for every codon, the position of its block
+    in a block structure (the order of the block dict's values).
+    Expanding an (N, n_blocks) array of per-block assignments with
+    assignments[:, codon_blocks(...)] gives (N, 64) codes.
+
+    Parameters
+    ----------
+    block_structure: a name or dict accepted by get_block_structure
+    list<str> codons: codon order of the returned array
+
+    Returns
+    -------
+    np.ndarray codon_block: (len(codons),) int array
+    """
+    blocks = get_block_structure(block_structure)
+    position = {codon: i for i, codon in enumerate(codons)}
+    codon_block = np.zeros(len(codons), dtype=np.intp)
+    for b, block_codons in enumerate(blocks.values()):
+        codon_block[[position[c] for c in block_codons]] = b
+    return codon_block
+
+
+# number of codes assigned at once by random_codes; bounds temporaries
+_RANDOM_CHUNK = 2 ** 16
+
+
+def random_codes(n, block_structure='standard', rng=None):
+    """A function used to generate many random codon tables at once, as an
+    (n, 64) int8 array of amino acid indices (the encoding of
+    synbio.codes.metrics.encode_codes; convert rows of interest with
+    metrics.decode_code). Like random_code, every amino acid (and stop)
+    is guaranteed at least one block: each row draws a random permutation
+    of the blocks, gives the first 21 blocks one amino acid each, and fills
+    the remaining blocks uniformly at random.
+
+    Parameters
+    ----------
+    int n: number of codes to generate
+    block_structure: a name or dict accepted by get_block_structure
+    rng: a np.random.Generator, or a seed for np.random.default_rng
+
+    Returns
+    -------
+    np.ndarray codes: (n, 64) int8 array
+    """
+    rng = np.random.default_rng(rng)
+    codon_block = codon_blocks(block_structure)
+    n_blocks = codon_block.max() + 1
+    n_aa = len(aminoacids)
+    if n_blocks < n_aa:
+        raise ValueError(
+            f'block structure has {n_blocks} blocks; at least {n_aa} are '
+            f'needed to encode every amino acid'
+        )
+
+    codes = np.empty((n, len(codon_block)), dtype=np.int8)
+    for start in range(0, n, _RANDOM_CHUNK):
+        m = min(_RANDOM_CHUNK, n - start)
+        assignment = rng.integers(n_aa, size=(m, n_blocks), dtype=np.int8)
+        # the first n_aa blocks of a random permutation get one AA each
+        perm = rng.random((m, n_blocks)).argsort(axis=1)[:, :n_aa]
+        assignment[np.arange(m)[:, None], perm] = np.arange(n_aa)
+        codes[start:start + m] = assignment[:, codon_block]
+    return codes
 
 
 def num_codes(l_aa, b):
@@ -710,16 +811,15 @@ def silencicity(table):
     -------
     float silencicity: a float representing the silencicity metric
     """
-    # initialize counter and get mutation pairs
-    syn_mut = 0
-    mut_pairs = get_mut_pairs(table)
-    total_mut = len(mut_pairs)
-    # loop over mutation pairs and increment for synonymous mutations
-    for (c1, c2) in mut_pairs:
-        if table[c1] == table[c2]:
-            syn_mut += 1
-    # return fraction of synonymous mutations
-    return syn_mut / total_mut
+    # compare integer labels of each codon in the table with those of its
+    # neighbors; neighbors missing from the table count as unassigned
+    index = index_for(table)
+    labels = index.labels(table, missing='0')[0][0]
+    rows = [index.position[codon] for codon in table]
+    neighbors = index.neighbors[rows]
+    return np.count_nonzero(
+        labels[rows, None] == labels[neighbors]
+    ) / neighbors.size
 
 
 def mutability(table):
@@ -737,29 +837,22 @@ def mutability(table):
     -------
         float mut: a float representing the silencicity metric
     """
-    # initialize counter and running metric, and get mutation pairs
-    nonsyn_mut = 0
-    metric = 0
-    mut_pairs = get_mut_pairs(table)
-    # get Kyte-Doolittle hydropathy metric
-    kd = kdHydrophobicity
-    # loop over mutation pairs
-    for (c1, c2) in mut_pairs:
-        # increment counter and metric if nonsynonymous
-        if not (table[c1] == table[c2]):
-            # increment counter
-            nonsyn_mut += 1
-            # increment metric
-            aa1 = table[c1]
-            aa2 = table[c2]
-            metric += abs(kd[aa1] - kd[aa2])
+    # mutations from each codon in the table; neighbors missing from the
+    # table count as unassigned
+    index = index_for(table)
+    labels, values = index.labels(table, missing='0')
+    rows = [index.position[codon] for codon in table]
+    neighbors = index.neighbors[rows]
+    aa1 = np.broadcast_to(labels[0][rows, None], neighbors.shape)
+    aa2 = labels[0][neighbors]
+    nonsyn = aa1 != aa2
     # if there are no nonsynonymous mutations, return 0
-    if nonsyn_mut == 0:
-        mut = 0
-    # else, return the average dKD per mutation
-    else:
-        mut = metric / nonsyn_mut
-    return mut
+    if not nonsyn.any():
+        return 0
+    # Kyte-Doolittle hydropathy of every label; unknown signals raise
+    kd = np.array([kdHydrophobicity[aa] for aa in values])
+    # return the average dKD per nonsynonymous mutation
+    return float(np.abs(kd[aa1[nonsyn]] - kd[aa2[nonsyn]]).mean())
 
 
 def promiscuity(table, allow_ambiguous=False):
@@ -780,21 +873,19 @@ def promiscuity(table, allow_ambiguous=False):
     # handle type errors for input table
     if not isinstance(table, dict):
         raise TypeError("Input table is a dict or dict-like")
+    index = index_for(table)
     # declare table to return
-    promiscuous = {}
-    for codon in triplet_rna_codons:
-        promiscuous[codon] = '0'
+    promiscuous = dict.fromkeys(index.codons, '0')
     # loop over codons to reassign
     for codon, AA in table.items():
         # skip assignments to STOP
         if AA == '0':
             continue
         # get codons that would be decoded in reality
-        wobble = rna_wobbling[rna_basepairing[codon[-1]]]
-        codons = [codon[:2] + nt3 for nt3 in wobble]
+        decoded = np.flatnonzero(index.wobble[index.position[codon]])
         # determine if there is ambiguity
         acceptable = [AA, '0']
-        for c in codons:
+        for c in index.decode(decoded):
             if promiscuous[c] not in acceptable:
                 # raise error if allow_ambiguous = False
                 if not allow_ambiguous:
@@ -861,22 +952,14 @@ def get_mut_pairs(table):
     -------
     set<(str, str)> mut_pairs: a set of distinct mutational pairs.
     """
-    # declare set of mutational pairs
-    mut_pairs = set()
-    # get list of codons and iterate over them
-    codon_list = list(table)
-    for codon in codon_list:
-        # iterate over each base in the codon
-        for i, base in enumerate(codon):
-            for nt in rNTPs:
-                # handle if nt is the same as base
-                if nt == base:
-                    continue
-                # if not, generate new codon
-                c_new = codon[:i] + nt + codon[i + 1:]
-                # add to set
-                mut_pairs.add((codon, c_new))
-    return mut_pairs
+    index = index_for(table)
+    codons = index.codons
+    neighbors = index.neighbors.tolist()
+    return {
+        (codon, codons[j])
+        for codon in table
+        for j in neighbors[index.position[codon]]
+    }
 
 
 def order_NTPs(sortable, nucleic_acid='RNA'):
@@ -892,22 +975,12 @@ def order_NTPs(sortable, nucleic_acid='RNA'):
     -------
     iterable sorted_obj: the sorted object
     """
-    # define ordering dictionary
-    orderdict = {
-        'RNA': ['U', 'C', 'A', 'G'],
-        'DNA': ['T', 'C', 'A', 'G']
-    }
-    # raise error if nucleic_acid flag invalid
-    if nucleic_acid.upper() not in orderdict:
-        raise ValueError(
-            'nucleic_acid flag set to invalid option (use DNA or RNA)')
+    # raises ValueError if nucleic_acid flag invalid
+    index = get_codon_index(nucleic_acid)
     # attempt sorting
     try:
-        order = orderdict[nucleic_acid.upper()]
-        sorted_obj = sorted(
-            sortable, key=lambda word: [order.index(nt) for nt in word]
-        )
-    except ValueError:
+        sorted_obj = sorted(sortable, key=index.sort_key)
+    except KeyError:
         print('Variable to sort broke the code :/')
         # raise error
         sorted_obj = False
@@ -1,4 +1,4 @@
-from synbio.codes import Code
+from synbio.codes import get_code
 
 __all__ = [
     "codesavvy"
@@ -9,10 +9,8 @@ def codesavvy(func):
     def wrapper(*args, **kwargs):
         # handle code input
         code = kwargs.get("code", None)
-        if code is None:
-            kwargs["code"] = Code()
-        elif isinstance(code, dict):
-            kwargs["code"] = Code(code)
+        if code is None or isinstance(code, dict):
+            kwargs["code"] = get_code(code)
         else:
             raise TypeError("code must be a dict or dict-like obj")
         return func(*args, **kwargs)
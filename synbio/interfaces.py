@@ -156,6 +156,14 @@ class ILocation(ABC, ComparableMixin):
     def to_slice(self):
         raise NotImplementedError
 
+    @abstractmethod
+    def extract(self, seq, complement):
+        raise NotImplementedError
+
+    @abstractmethod
+    def split(self, seq):
+        raise NotImplementedError
+
 
 LocationType = TypeVar("LocationType", int, slice, ILocation, List[ILocation])
 IndexType = TypeVar("IndexType", str, LocationType)
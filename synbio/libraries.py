@@ -1,26 +1,50 @@
+import csv
+import os
+import random
+from bisect import bisect_right
+from collections import abc
+from contextlib import contextmanager
 from functools import partial
-from typing import Any, Callable, Dict, Iterable, Optional
+from itertools import accumulate
+from typing import (
+    IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence,
+    Tuple, Union,
+)
+
+import numpy as np
 
 from synbio import utils
 from synbio.annotations import Location, Part
-from synbio.codes import CodeType
-from synbio.codes.functions import get_synonymous_codons
+from synbio.codes import CodeType, get_code, metrics
+from synbio.codes.codons import get_codon_index, index_for
 from synbio.codes.wrappers import codesavvy
-from synbio.interfaces import SeqType
+from synbio.interfaces import ILocation, SeqType
 from synbio.polymers import DNA, Polymer
 
 __all__ = [
     # class
     "Library",
+    # variant spaces
+    "VariantSpace", "VariantView",
+    "SingleSynonymous", "DoubleSynonymous", "AllSynonymous",
+    # delta-encoded variants
+    "VariantSet",
     # variance generators
     "single_synonymous", "single_nonsynonymous",
-    "double_synonymous", "double_nonsynonymous"
+    "double_synonymous", "double_nonsynonymous", "all_synonymous",
 ]
 
 
 class Library(Part):
     """
-    TODO: write docstring
+    A Part standing for a set of variants of its sequence, produced by a
+    variance function (see the variance generators below). When the
+    variance is a VariantSpace (or any other sequence), the library has a
+    length and random access: library[i] decodes the i-th variant
+    directly, and library[start:stop:step] is a lazy VariantView, so
+    libraries can be sampled, sharded and resumed without enumerating
+    them. Locations still index the base sequence, as for any Part.
+    Spaces too large for len() report their exact size as variance.size.
     """
 
     def __init__(
@@ -64,6 +88,777 @@ class Library(Part):
     def __iter__(self):
         yield from self.variance
 
+    def __len__(self) -> int:
+        if not isinstance(self.variance, abc.Sized):
+            raise TypeError(
+                "library variance has no length (it is a one-shot iterable)"
+            )
+        return len(self.variance)
+
+    def __getitem__(self, key: Union[int, slice, ILocation]):
+        if isinstance(key, ILocation):
+            return super().__getitem__(key)
+        if not isinstance(self.variance, abc.Sequence):
+            raise TypeError(
+                "library variance does not support random access (it is a "
+                "one-shot iterable)"
+            )
+        return self.variance[key]
+
+    def sample(
+            self,
+            n: int,
+            rng: Optional[Union[int, np.random.Generator]] = None
+    ) -> List[str]:
+        """
+        A method that draws n distinct variants uniformly at random, by
+        decoding n random indices (the library is never enumerated).
+        Requires an indexable variance (e.g., a VariantSpace).
+        """
+        if not isinstance(self.variance, abc.Sequence):
+            raise TypeError(
+                "library variance does not support random access (it is a "
+                "one-shot iterable), so it cannot be sampled"
+            )
+        size = getattr(self.variance, 'size', None)
+        if size is None:
+            size = len(self.variance)
+        if not 0 <= n <= size:
+            raise ValueError(
+                f"cannot sample {n} distinct variants from a library of "
+                f"{size}"
+            )
+
+        rng = np.random.default_rng(rng)
+        if size <= np.iinfo(np.int64).max:
+            indices = rng.choice(size, size=n, replace=False).tolist()
+        else:
+            # spaces beyond int64: draw python ints, seeded from rng, and
+            # decode them in index order
+            draw = random.Random(int(rng.integers(2 ** 63)))
+            drawn = set()
+            while len(drawn) < n:
+                drawn.add(draw.randrange(size))
+            indices = sorted(drawn)
+        return [self[i] for i in indices]
+
+    def variant_set(self) -> "VariantSet":
+        """
+        A method that returns the library's variants as a delta-encoded
+        VariantSet against the base sequence
+        """
+        if isinstance(self.variance, _SynonymousSpace):
+            return VariantSet.from_space(self.variance)
+        return VariantSet.from_sequences(str(self.seq), self)
+
+    def shard(self, k: int, n: int) -> "VariantView":
+        """
+        A method that returns shard k of n: every n-th variant, starting
+        at the k-th
+        """
+        return self[k::n]
+
+
+##################
+# variant spaces #
+##################
+class VariantSpace(abc.Sequence):
+    """
+    An abstract, indexable collection of sequence variants. Subclasses
+    define size and _variant(n), which decodes the n-th variant directly
+    from its index; indexing, slicing (lazily, see VariantView) and
+    iteration are built on those.
+    """
+    size: int = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, key: Union[int, slice]):
+        if isinstance(key, slice):
+            return VariantView(self, range(self.size)[key])
+        return self._variant(self._index(key))
+
+    def _index(self, n: int) -> int:
+        if n < 0:
+            n += self.size
+        if not 0 <= n < self.size:
+            raise IndexError('variant index out of range')
+        return n
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._variant(n) for n in range(self.size))
+
+    def _variant(self, n: int) -> str:
+        raise NotImplementedError
+
+
+class VariantView(abc.Sequence):
+    """
+    A lazy slice of a VariantSpace: a range of indices into it
+    """
+
+    def __init__(self, space: VariantSpace, indices: range) -> None:
+        self.space = space
+        self.indices = indices
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, key: Union[int, slice]):
+        if isinstance(key, slice):
+            return VariantView(self.space, self.indices[key])
+        return self.space._variant(self.indices[key])
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.space._variant(n) for n in self.indices)
+
+    def __repr__(self) -> str:
+        return f"VariantView({self.space!r}, {self.indices!r})"
+
+
+class _SynonymousSpace(VariantSpace):
+    """
+    A private base for spaces of synonymous recodings of a gene. Every
+    variant is a diff against the gene: a tuple of (codon position,
+    synonym choice) pairs. Synonym lists are shared with the code's
+    (cached) rmap and encoded to bytes once, so variants can be written
+    into one preallocated buffer in place (see buffers) or emitted as
+    diffs without building any sequence (see diffs).
+    """
+
+    def __init__(
+            self, seq: SeqType, code: Optional[CodeType] = None) -> None:
+        # default to the Standard Code, as the variance generators do
+        code = get_code(code)
+        mRNA = DNA(seq).transcribe()
+        self.codons = [str(codon) for codon in utils.get_codons(mRNA)]
+        rmap = code.rmap()
+        self.synonyms = [rmap[code[codon]] for codon in self.codons]
+        self.radices = [len(synonyms) for synonyms in self.synonyms]
+        self.codon_length = len(self.codons[0]) if self.codons else 3
+        self.base = ''.join(self.codons).encode()
+        self._synonym_bytes = [
+            [codon.encode() for codon in synonyms]
+            for synonyms in self.synonyms
+        ]
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(size={self.size})"
+
+    def _choices(self, n: int) -> Iterable[Tuple[int, int]]:
+        raise NotImplementedError
+
+    def _iter_choices(self) -> Iterator[Tuple[Tuple[int, int], ...]]:
+        return (tuple(self._choices(n)) for n in range(self.size))
+
+    def _variant(self, n: int) -> str:
+        buffer = bytearray(self.base)
+        self._write(buffer, self._choices(n))
+        return buffer.decode()
+
+    def _write(
+            self,
+            buffer: bytearray,
+            choices: Iterable[Tuple[int, int]]) -> None:
+        # a choice of -1 restores the base codon
+        length = self.codon_length
+        for pos, choice in choices:
+            start = pos * length
+            buffer[start:start + length] = (
+                self._synonym_bytes[pos][choice] if choice >= 0
+                else self._base_view[start:start + length]
+            )
+
+    @property
+    def _base_view(self) -> memoryview:
+        return memoryview(self.base)
+
+    def diff(self, n: int) -> Tuple[Tuple[int, str], ...]:
+        """
+        A method that returns variant n as (codon position, codon) pairs
+        replacing codons of the gene
+        """
+        return tuple(
+            (pos, self.synonyms[pos][choice])
+            for pos, choice in self._choices(self._index(n))
+        )
+
+    def diffs(self) -> Iterator[Tuple[Tuple[int, str], ...]]:
+        """
+        A generator of every variant's diff (see diff), in order
+        """
+        synonyms = self.synonyms
+        return (
+            tuple((pos, synonyms[pos][choice]) for pos, choice in choices)
+            for choices in self._iter_choices()
+        )
+
+    def buffers(self) -> Iterator[memoryview]:
+        """
+        A generator that writes every variant, in order, into a single
+        preallocated buffer and yields a read-only view of it. Between
+        variants, only the codons that differ are rewritten. A view is
+        only valid until the next one is yielded; copy it (e.g.,
+        bytes(view)) to keep it.
+        """
+        buffer = bytearray(self.base)
+        view = memoryview(buffer).toreadonly()
+        previous = {}
+        for choices in self._iter_choices():
+            current = dict(choices)
+            self._write(buffer, [
+                (pos, -1) for pos in previous if pos not in current
+            ])
+            self._write(buffer, [
+                (pos, choice) for pos, choice in current.items()
+                if previous.get(pos) != choice
+            ])
+            previous = current
+            yield view
+
+    def __iter__(self) -> Iterator[str]:
+        return (str(view, 'ascii') for view in self.buffers())
+
+
+class SingleSynonymous(_SynonymousSpace):
+    """
+    Every gene with one codon replaced by one of its synonyms (itself
+    included), ordered by position then synonym. Variant n is found by
+    bisecting the running totals of the synonym counts.
+    """
+
+    def __init__(
+            self, seq: SeqType, code: Optional[CodeType] = None) -> None:
+        super().__init__(seq, code)
+        self._starts = [0] + list(accumulate(self.radices))
+        self.size = self._starts[-1]
+
+    def _choices(self, n: int) -> Iterable[Tuple[int, int]]:
+        pos = bisect_right(self._starts, n) - 1
+        return ((pos, n - self._starts[pos]),)
+
+    def _iter_choices(self) -> Iterator[Tuple[Tuple[int, int], ...]]:
+        return (
+            ((pos, choice),)
+            for pos, radix in enumerate(self.radices)
+            for choice in range(radix)
+        )
+
+    def buffers(self) -> Iterator[memoryview]:
+        buffer = bytearray(self.base)
+        view = memoryview(buffer).toreadonly()
+        length = self.codon_length
+        for pos, synonyms in enumerate(self._synonym_bytes):
+            start, stop = pos * length, (pos + 1) * length
+            for codon in synonyms:
+                buffer[start:stop] = codon
+                yield view
+            buffer[start:stop] = self.base[start:stop]
+
+
+class DoubleSynonymous(_SynonymousSpace):
+    """
+    Every gene with two distinct codons (pos1 < pos2) replaced by synonyms,
+    ordered by pos1, pos2, then the synonyms of each. The variants with a
+    given pos1 form one block, and those with a given pos1 and pos2 a
+    k1 * k2 sub-block, so variant n is found by two bisections and a
+    two-digit mixed-radix decoding.
+    """
+
+    def __init__(
+            self, seq: SeqType, code: Optional[CodeType] = None) -> None:
+        super().__init__(seq, code)
+        # prefix[i] / suffix[i]: synonyms at positions before / from i
+        prefix = [0] + list(accumulate(self.radices))
+        suffix = [prefix[-1] - total for total in prefix]
+        self._prefix = prefix
+        self._starts = [0] + list(accumulate(
+            k * suffix[i + 1] for i, k in enumerate(self.radices)
+        ))
+        self.size = self._starts[-1]
+
+    def _choices(self, n: int) -> Iterable[Tuple[int, int]]:
+        pos1 = bisect_right(self._starts, n) - 1
+        k1 = self.radices[pos1]
+        n -= self._starts[pos1]
+        # within the block of pos1, sub-blocks are k1 * k2 variants long
+        offset = k1 * self._prefix[pos1 + 1]
+        pos2 = bisect_right(self._prefix, (n + offset) // k1) - 1
+        n -= k1 * self._prefix[pos2] - offset
+        syn1, syn2 = divmod(n, self.radices[pos2])
+        return (pos1, syn1), (pos2, syn2)
+
+    def _iter_choices(self) -> Iterator[Tuple[Tuple[int, int], ...]]:
+        radices = self.radices
+        return (
+            ((pos1, syn1), (pos2, syn2))
+            for pos1 in range(len(radices))
+            for pos2 in range(pos1 + 1, len(radices))
+            for syn1 in range(radices[pos1])
+            for syn2 in range(radices[pos2])
+        )
+
+    def buffers(self) -> Iterator[memoryview]:
+        buffer = bytearray(self.base)
+        view = memoryview(buffer).toreadonly()
+        length = self.codon_length
+        synonyms = self._synonym_bytes
+        for pos1 in range(len(synonyms)):
+            start1, stop1 = pos1 * length, (pos1 + 1) * length
+            for pos2 in range(pos1 + 1, len(synonyms)):
+                start2, stop2 = pos2 * length, (pos2 + 1) * length
+                for codon1 in synonyms[pos1]:
+                    buffer[start1:stop1] = codon1
+                    for codon2 in synonyms[pos2]:
+                        buffer[start2:stop2] = codon2
+                        yield view
+                buffer[start2:stop2] = self.base[start2:stop2]
+            buffer[start1:stop1] = self.base[start1:stop1]
+
+
+class AllSynonymous(_SynonymousSpace):
+    """
+    Every synonymous recoding of a gene: a mixed-radix number whose digits
+    are the synonym choices at each codon (the first codon being most
+    significant) and whose radices are the synonym counts. Variant n is
+    decoded digit by digit, so spaces far too large to enumerate can be
+    indexed, sampled and sharded.
+    """
+
+    def __init__(
+            self, seq: SeqType, code: Optional[CodeType] = None) -> None:
+        super().__init__(seq, code)
+        # place value of each digit
+        self._place = [1] * len(self.radices)
+        for i in range(len(self.radices) - 2, -1, -1):
+            self._place[i] = self._place[i + 1] * self.radices[i + 1]
+        self.size = self._place[0] * self.radices[0] if self.radices else 1
+
+    def _choices(self, n: int) -> Iterable[Tuple[int, int]]:
+        # peel digits off the least significant end, so every division is
+        # by a small radix rather than a (possibly huge) place value
+        choices = []
+        for pos in range(len(self.radices) - 1, -1, -1):
+            radix = self.radices[pos]
+            if radix > 1:
+                n, digit = divmod(n, radix)
+                choices.append((pos, digit))
+        return tuple(choices[::-1])
+
+    def _variant(self, n: int) -> str:
+        # every codon is a digit (radix-1 codons only have the base codon),
+        # so a variant is a single join rather than a buffer of writes
+        codons = []
+        for synonyms, radix in zip(self.synonyms[::-1], self.radices[::-1]):
+            n, digit = divmod(n, radix)
+            codons.append(synonyms[digit])
+        return ''.join(codons[::-1])
+
+    def buffers(self) -> Iterator[memoryview]:
+        """
+        A generator that writes every variant, in order, into a single
+        preallocated buffer and yields a read-only view of it. Variants
+        are counted like an odometer, so only the codons whose digits
+        change are rewritten. A view is only valid until the next one is
+        yielded.
+        """
+        digits = {pos: 0 for pos, radix in enumerate(self.radices)
+                  if radix > 1}
+        buffer = bytearray(self.base)
+        self._write(buffer, digits.items())
+        view = memoryview(buffer).toreadonly()
+        positions = list(digits)[::-1]
+        for _ in range(self.size):
+            yield view
+            # increment the last digit and carry
+            for pos in positions:
+                digits[pos] = (digits[pos] + 1) % self.radices[pos]
+                self._write(buffer, [(pos, digits[pos])])
+                if digits[pos]:
+                    break
+
+
+##########################
+# delta-encoded variants #
+##########################
+PathOrHandle = Union[str, os.PathLike, IO[str]]
+
+
+class VariantSet:
+    """
+    A compact set of codon-level variants of a base coding sequence. Each
+    variant is stored only as its differences from the base: three flat
+    arrays hold (variant id, codon position, codon index) for every
+    replaced codon, sorted by variant then position, and an offsets array
+    indexes each variant's rows. A library of a million single or double
+    variants takes a few tens of MB.
+
+    Variants are selected with masks or index arrays (vs[mask]), the masks
+    being computed for all variants at once (at_positions, synonymous,
+    changes). Sequences are only built while streaming (iteration,
+    to_fasta, to_csv), in a single reused buffer.
+
+    Parameters
+    ----------
+        base: base coding sequence (DNA or RNA)
+        np.ndarray variant: (M,) variant id of each replaced codon
+        np.ndarray position: (M,) codon position of each replaced codon
+        np.ndarray codon: (M,) codon index of each replacement (see
+            CodonIndex)
+        int size: number of variants (default: largest variant id + 1)
+        int codon_length: codon length
+    """
+
+    def __init__(
+            self,
+            base: SeqType,
+            variant: Sequence[int],
+            position: Sequence[int],
+            codon: Sequence[int],
+            size: Optional[int] = None,
+            codon_length: int = 3) -> None:
+        self.base = str(base).upper()
+        if len(self.base) % codon_length != 0:
+            raise ValueError(f"seq is not divisible by n ({codon_length})")
+        self.index = get_codon_index(
+            'DNA' if 'T' in self.base else 'RNA', codon_length
+        )
+        variant = np.asarray(variant, dtype=np.int64)
+        position = np.asarray(position, dtype=np.int32)
+        codon = np.asarray(codon, dtype=np.uint8)
+        order = np.lexsort((position, variant))
+        self.variant = variant[order]
+        self.position = position[order]
+        self.codon = codon[order]
+        self.size = int(
+            size if size is not None else
+            (self.variant[-1] + 1 if len(self.variant) else 0)
+        )
+        self._offsets = np.searchsorted(
+            self.variant, np.arange(self.size + 1)
+        )
+        self._base_ix = self.index.encode(self.base)
+
+    @classmethod
+    def from_diffs(
+            cls,
+            base: SeqType,
+            diffs: Iterable[Iterable[Tuple[int, str]]],
+            codon_length: int = 3) -> "VariantSet":
+        """
+        A method that builds a VariantSet from variants given as
+        (codon position, codon) pairs (e.g., VariantSpace.diffs())
+        """
+        index = get_codon_index('RNA', codon_length)
+        variant, position, codon = [], [], []
+        size = 0
+        for size, diff in enumerate(diffs, 1):
+            for pos, replacement in diff:
+                variant.append(size - 1)
+                position.append(pos)
+                codon.append(index.position[
+                    str(replacement).upper().replace('T', 'U')
+                ])
+        return cls(base, variant, position, codon, size, codon_length)
+
+    @classmethod
+    def from_space(cls, space: "_SynonymousSpace") -> "VariantSet":
+        """
+        A method that builds a VariantSet from a synonymous variant space,
+        from its (position, synonym choice) diffs; no sequence is built
+        """
+        index = get_codon_index('RNA', space.codon_length)
+        # (position, synonym choice) -> codon index
+        table = np.zeros(
+            (len(space.synonyms), max(space.radices, default=1)),
+            dtype=np.uint8
+        )
+        for pos, synonyms in enumerate(space.synonyms):
+            table[pos, :len(synonyms)] = [index.position[c] for c in synonyms]
+
+        variant, position, choice = [], [], []
+        size = 0
+        for size, choices in enumerate(space._iter_choices(), 1):
+            for pos, k in choices:
+                variant.append(size - 1)
+                position.append(pos)
+                choice.append(k)
+        position = np.array(position, dtype=np.int32)
+        codon = table[position, np.array(choice, dtype=np.intp)]
+        return cls(space.base.decode(), variant, position, codon, size,
+                   space.codon_length)
+
+    @classmethod
+    def from_sequences(
+            cls,
+            base: SeqType,
+            seqs: Iterable[SeqType],
+            codon_length: int = 3) -> "VariantSet":
+        """
+        A method that delta-encodes full variant sequences against base;
+        each is compared with the base codon by codon in one vectorized
+        step
+        """
+        index = get_codon_index('RNA', codon_length)
+        base = str(base).upper().replace('T', 'U')
+        base_ix = index.encode(base)
+        variant, position, codon = [], [], []
+        size = 0
+        for size, seq in enumerate(seqs, 1):
+            seq = str(seq).upper().replace('T', 'U')
+            if len(seq) != len(base):
+                raise ValueError('variants must have the length of the base')
+            seq_ix = index.encode(seq)
+            changed = np.flatnonzero(seq_ix != base_ix)
+            variant.append(np.full(len(changed), size - 1))
+            position.append(changed)
+            codon.append(seq_ix[changed])
+        concat = (lambda arrays: np.concatenate(arrays) if arrays else [])
+        return cls(base, concat(variant), concat(position), concat(codon),
+                   size, codon_length)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return f"VariantSet(size={self.size}, changes={len(self.variant)})"
+
+    @property
+    def nbytes(self) -> int:
+        """memory used by the variant arrays, in bytes"""
+        return sum(arr.nbytes for arr in (
+            self.variant, self.position, self.codon, self._offsets
+        ))
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return next(self._sequences([self._index(key)]))
+        return self.select(key)
+
+    def _index(self, n: int) -> int:
+        if n < 0:
+            n += self.size
+        if not 0 <= n < self.size:
+            raise IndexError('variant index out of range')
+        return n
+
+    def __iter__(self) -> Iterator[str]:
+        return self._sequences(np.arange(self.size))
+
+    def diff(self, n: int) -> Tuple[Tuple[int, str], ...]:
+        """
+        A method that returns variant n as (codon position, codon) pairs
+        """
+        n = self._index(n)
+        rows = slice(self._offsets[n], self._offsets[n + 1])
+        return tuple(
+            (pos, self.index.codons[c]) for pos, c in
+            zip(self.position[rows].tolist(), self.codon[rows].tolist())
+        )
+
+    #############
+    # selection #
+    #############
+    def select(self, key: Union[slice, Sequence[int], np.ndarray]):
+        """
+        A method that returns the variants picked by a slice, an index
+        array or a (size,) boolean mask, as a new VariantSet
+        """
+        if isinstance(key, slice):
+            ids = np.arange(self.size)[key]
+        else:
+            ids = np.asarray(key)
+            if ids.dtype == bool:
+                if len(ids) != self.size:
+                    raise IndexError('boolean mask must have one entry per '
+                                     'variant')
+                ids = np.flatnonzero(ids)
+            ids = np.where(ids < 0, ids + self.size, ids).astype(np.int64)
+            if ((ids < 0) | (ids >= self.size)).any():
+                raise IndexError('variant index out of range')
+        rows, counts = self._rows(ids)
+        return VariantSet(
+            self.base, np.repeat(np.arange(len(ids)), counts),
+            self.position[rows], self.codon[rows], len(ids),
+            self.index.length
+        )
+
+    def _rows(self, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # the rows of each variant in ids, in order, and their counts
+        starts = self._offsets[ids]
+        counts = self._offsets[ids + 1] - starts
+        rows = np.repeat(starts - np.cumsum(counts) + counts, counts) + \
+            np.arange(counts.sum())
+        return rows, counts
+
+    def _any(self, rows: np.ndarray) -> np.ndarray:
+        # (size,) True for variants with at least one of the given rows
+        return np.bincount(self.variant[rows], minlength=self.size) > 0
+
+    def at_positions(self, positions: Iterable[int]) -> np.ndarray:
+        """
+        A method that returns a (size,) mask of the variants that change
+        any of the given codon positions
+        """
+        return self._any(np.isin(self.position, list(positions)))
+
+    def _signals(self, code: Optional[CodeType]) -> Tuple[np.ndarray, ...]:
+        # (M,) signal indices before and after every replacement
+        # DNA and RNA codons share indices, so the code may be either
+        code = get_code(code)
+        encoded = metrics.encode_codes(code, index_for(code).codons)[0]
+        return encoded[self._base_ix[self.position]], encoded[self.codon]
+
+    def synonymous(self, code: Optional[CodeType] = None) -> np.ndarray:
+        """
+        A method that returns a (size,) mask of the variants whose every
+        replacement keeps the amino acid (under code, default Standard)
+        """
+        before, after = self._signals(code)
+        return ~self._any(before != after)
+
+    def changes(
+            self,
+            before: Optional[str] = None,
+            after: Optional[str] = None,
+            code: Optional[CodeType] = None) -> np.ndarray:
+        """
+        A method that returns a (size,) mask of the variants with at least
+        one amino acid change from any residue in before to any residue in
+        after (None for any residue), e.g., changes('K', 'R')
+
+        Parameters
+        ----------
+            str before: amino acids (or '*') changed from
+            str after: amino acids (or '*') changed to
+            Code code: genetic code (default: Standard Code)
+        """
+        old, new = self._signals(code)
+        rows = old != new
+        if before is not None:
+            rows &= np.isin(old, [metrics.signal_index[aa] for aa in before])
+        if after is not None:
+            rows &= np.isin(new, [metrics.signal_index[aa] for aa in after])
+        return self._any(rows)
+
+    def unique(self) -> "VariantSet":
+        """
+        A method that returns the distinct variants, in order of first
+        occurrence. Replacements by the base codon are dropped first, so
+        variants are compared by their actual sequences.
+        """
+        real = self.codon != self._base_ix[self.position]
+        canonical = VariantSet(
+            self.base, self.variant[real], self.position[real],
+            self.codon[real], self.size, self.index.length
+        )
+        counts = np.diff(canonical._offsets)
+        width = int(counts.max(initial=0))
+        # one row of (position, codon) keys per variant, padded with -1
+        keys = np.full((self.size, max(width, 1)), -1, dtype=np.int64)
+        column = np.arange(len(canonical.variant)) - \
+            canonical._offsets[canonical.variant]
+        keys[canonical.variant, column] = \
+            canonical.position.astype(np.int64) * len(self.index) + \
+            canonical.codon
+        _, first = np.unique(keys, axis=0, return_index=True)
+        return canonical.select(np.sort(first))
+
+    ##########
+    # export #
+    ##########
+    # number of variants whose rows are converted to lists at once
+    CHUNK_SIZE = 2 ** 14
+
+    def _sequences(
+            self,
+            ids: Iterable[int],
+            describe: bool = False) -> Iterator[Union[str, Tuple[str, str]]]:
+        # build variants one after the other in a single buffer; optionally
+        # pair each with its mutations (see mutations)
+        length = self.index.length
+        names = self.index.codons
+        codons = [codon.encode() for codon in names]
+        base_names = [names[c] for c in self._base_ix.tolist()]
+        base = self.base.encode()
+        buffer = bytearray(base)
+        ids = np.asarray(ids, dtype=np.int64)
+        for i in range(0, len(ids), self.CHUNK_SIZE):
+            rows, counts = self._rows(ids[i:i + self.CHUNK_SIZE])
+            positions = self.position[rows].tolist()
+            replacements = self.codon[rows].tolist()
+            j = 0
+            for count in counts.tolist():
+                changed = positions[j:j + count]
+                new = replacements[j:j + count]
+                for pos, c in zip(changed, new):
+                    buffer[pos * length:(pos + 1) * length] = codons[c]
+                if describe:
+                    yield buffer.decode(), ';'.join(
+                        f"{pos}:{base_names[pos]}>{names[c]}"
+                        for pos, c in zip(changed, new)
+                    )
+                else:
+                    yield buffer.decode()
+                for pos in changed:
+                    start = pos * length
+                    buffer[start:start + length] = base[start:start + length]
+                j += count
+
+    def mutations(self, n: int) -> str:
+        """
+        A method that describes variant n as 'position:BASE>NEW' codon
+        changes separated by ';' (positions are 0-based codon positions)
+        """
+        codons = self.index.codons
+        return ';'.join(
+            f"{pos}:{codons[self._base_ix[pos]]}>{codon}"
+            for pos, codon in self.diff(n)
+        )
+
+    def to_fasta(
+            self,
+            out: PathOrHandle,
+            prefix: str = 'variant') -> None:
+        """
+        A method that streams every variant to a FASTA file (e.g., an oligo
+        pool order), named prefix_<n> with its mutations as description
+        """
+        with _open_text(out) as handle:
+            records = self._sequences(np.arange(self.size), describe=True)
+            for n, (seq, mutations) in enumerate(records):
+                handle.write(f">{prefix}_{n} {mutations}\n{seq}\n")
+
+    def to_csv(
+            self,
+            out: PathOrHandle,
+            prefix: str = 'variant') -> None:
+        """
+        A method that streams every variant to a CSV file with columns
+        name, mutations and sequence
+        """
+        with _open_text(out, newline='') as handle:
+            writer = csv.writer(handle)
+            writer.writerow(['name', 'mutations', 'sequence'])
+            records = self._sequences(np.arange(self.size), describe=True)
+            for n, (seq, mutations) in enumerate(records):
+                writer.writerow([f"{prefix}_{n}", mutations, seq])
+
+
+@contextmanager
+def _open_text(
+        out: PathOrHandle, newline: Optional[str] = None) -> Iterator[IO[str]]:
+    """
+    A private context manager that opens a path for writing, or passes an
+    already open text handle through without closing it
+    """
+    if hasattr(out, 'write'):
+        yield out
+    else:
+        with open(out, 'w', newline=newline) as handle:
+            yield handle
+
 
 #######################
 # variance generators #
@@ -75,39 +870,22 @@ class Library(Part):
 @codesavvy
 def single_synonymous(
         seq: SeqType,
-        code: Optional[CodeType] = None) -> Iterable[str]:
-    # get codons from transcript
-    mRNA = DNA(seq).transcribe()
-    codon_list = utils.get_codons(mRNA)
-    # define a generator that returns all single synonymous_variants
-    variants = (
-        ''.join(codon_list[:pos] + list(synonym) + codon_list[pos + 1:])
-        for pos, codon in enumerate(codon_list)
-        for synonym in get_synonymous_codons(codon, code)
-    )
-    return variants
+        code: Optional[CodeType] = None) -> SingleSynonymous:
+    return SingleSynonymous(seq, code)
 
 
 @codesavvy
 def double_synonymous(
         seq: SeqType,
-        code: Optional[CodeType] = None) -> Iterable[str]:
-    # get codons from transcript
-    mRNA = DNA(seq).transcribe()
-    codon_list = utils.get_codons(mRNA)
-    # define a generator that returns double synonymous_variants
-    variants = (
-        ''.join(
-            codon_list[:ix1] + list(syn1)
-            + codon_list[ix1 + 1:ix1 + ix2 + 1] + list(syn2)
-            + codon_list[ix1 + ix2 + 2:]
-        )
-        for ix1, codon1 in enumerate(codon_list)
-        for ix2, codon2 in enumerate(codon_list[ix1 + 1:])
-        for syn1 in get_synonymous_codons(codon1, code)
-        for syn2 in get_synonymous_codons(codon2, code)
-    )
-    return variants
+        code: Optional[CodeType] = None) -> DoubleSynonymous:
+    return DoubleSynonymous(seq, code)
+
+
+@codesavvy
+def all_synonymous(
+        seq: SeqType,
+        code: Optional[CodeType] = None) -> AllSynonymous:
+    return AllSynonymous(seq, code)
 
 
 @codesavvy
@@ -2,17 +2,140 @@ from __future__ import annotations
 
 from abc import abstractmethod
 from functools import reduce
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
+
+import numpy as np
 
 from synbio import utils
-from synbio.codes import Code, CodeType
+from synbio.codes import CodeType, get_code
+from synbio.codes.metrics import ProteinSet
 from synbio.interfaces import *
 
 __all__ = [
-    "Polymer", "NucleicAcid", "DNA", "RNA", "Protein"
+    "EditLog", "Polymer", "NucleicAcid", "DNA", "RNA", "Protein"
 ]
 
 
+class EditLog:
+    """
+    A compact record of the length changing edits made to a sequence, used
+    to map coordinates between the original and edited sequence.
+
+    The log is stored as a run-length list of aligned blocks: each block is
+    a run of bases that survived every edit, described by its start in the
+    original sequence, its start in the edited sequence and its length.
+    Same-length substitutions do not change any coordinates and are not
+    recorded.
+
+    >>> log = EditLog(10)
+    >>> log.record(2, 4, -2)    # delete bases 2-3
+    >>> log.record(5, 5, 3)     # insert 3 bases at (new) position 5
+    >>> log.liftover([0, 2, 3, 4, 6, 7, 10])
+    array([ 0,  2,  2,  2,  4,  8, 11])
+    >>> log.liftover_back([0, 2, 5, 6, 8, 11])
+    array([ 0,  4,  7,  7,  7, 10])
+    """
+
+    def __init__(self, length: int = 0) -> None:
+        self._orig_starts = np.array([0], dtype=np.int64)
+        self._new_starts = np.array([0], dtype=np.int64)
+        self._lengths = np.array([int(length)], dtype=np.int64)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({len(self)} blocks)"
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    @property
+    def blocks(self) -> np.ndarray:
+        """
+        An (n, 3) array of (original start, edited start, length) rows
+        """
+        return np.stack(
+            [self._orig_starts, self._new_starts, self._lengths], axis=1
+        )
+
+    def record(self, start: int, end: int, length_change: int) -> None:
+        """
+        A method that records the replacement of [start, end) (in current
+        coordinates) by a sequence length_change bases longer or shorter.
+        The first min(end - start, replacement length) bases of the edit
+        are treated as substitutions; the remainder is a pure insertion or
+        deletion.
+        """
+        if length_change == 0:
+            return
+
+        replacement_length = (end - start) + length_change
+        pos = start + min(end - start, replacement_length)
+        deleted = max(-length_change, 0)
+        inserted = max(length_change, 0)
+
+        orig, new, lengths = \
+            self._orig_starts, self._new_starts, self._lengths
+
+        # every block splits into the part before the edit point and the
+        # part after the deleted run, either of which may be empty
+        left_lengths = np.clip(pos - new, 0, lengths)
+        right_starts = np.maximum(new, pos + deleted)
+        right_lengths = np.clip(new + lengths - right_starts, 0, lengths)
+
+        orig = np.stack([orig, orig + right_starts - new], axis=1).ravel()
+        new = np.stack(
+            [new, right_starts - deleted + inserted], axis=1).ravel()
+        lengths = np.stack([left_lengths, right_lengths], axis=1).ravel()
+
+        # drop empty blocks, but always keep at least one anchor block
+        keep = lengths > 0
+        if not keep.any():
+            keep[0] = True
+        self._orig_starts = orig[keep]
+        self._new_starts = new[keep]
+        self._lengths = lengths[keep]
+
+    @staticmethod
+    def _lift(
+            positions: np.ndarray,
+            from_starts: np.ndarray,
+            to_starts: np.ndarray,
+            lengths: np.ndarray
+    ) -> np.ndarray:
+        ix = np.searchsorted(from_starts, positions, side='right') - 1
+        ix = np.maximum(ix, 0)
+        # positions inside a removed run snap to the end of previous block
+        within = np.clip(positions - from_starts[ix], 0, lengths[ix])
+        return to_starts[ix] + within
+
+    def liftover(
+            self, positions: Union[int, np.ndarray]
+    ) -> Union[int, np.ndarray]:
+        """
+        A method that maps positions on the original sequence to positions
+        on the edited sequence. Positions whose bases were deleted map to
+        the point of deletion.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        lifted = self._lift(
+            positions, self._orig_starts, self._new_starts, self._lengths
+        )
+        return int(lifted) if lifted.ndim == 0 else lifted
+
+    def liftover_back(
+            self, positions: Union[int, np.ndarray]
+    ) -> Union[int, np.ndarray]:
+        """
+        A method that maps positions on the edited sequence back to
+        positions on the original sequence. Positions within inserted
+        sequence map to the point of insertion.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        lifted = self._lift(
+            positions, self._new_starts, self._orig_starts, self._lengths
+        )
+        return int(lifted) if lifted.ndim == 0 else lifted
+
+
 class Polymer(IPolymer):
     """
     An abstract base class from which NucleicAcid and Protein inherit.
@@ -142,7 +265,8 @@ class NucleicAcid(Polymer):
 
     def __init__(self,
                  seq: SeqType = "",
-                 annotations: Optional[Dict[str, IPart]] = None) -> None:
+                 annotations: Optional[Dict[str, IPart]] = None,
+                 track_edits: bool = False) -> None:
         if isinstance(seq, NucleicAcid):
             annotations = seq.annotations
         elif annotations is None:
@@ -162,42 +286,41 @@ class NucleicAcid(Polymer):
 
         super().__init__(seq)
         self.annotations = annotations
+        self.edit_log = EditLog(len(self)) if track_edits else None
 
     def __getitem__(self, key: IndexType) -> "Own Type":
         if isinstance(key, str):
-            if isinstance(self.annotations[key].location, list):
-                slice_ = [
-                    loc.to_slice() for loc in self.annotations[key].location
-                ]
-            else:
-                slice_ = self.annotations[key].location.to_slice()
-
-        elif isinstance(key, ILocation):
-            slice_ = key.to_slice()
-
-            # shortcircuit - if REV strand, return rev comp
-            if key.strand == "REV":
-                return utils.reverse_complement(
-                    self.seq[slice_], self.basepairing()
-                )
-        else:
-            slice_ = key
+            key = self.annotations[key].location
 
-        if isinstance(slice_, list):
+        if isinstance(key, ILocation):
+            # locations know how to extract (and reverse complement) their
+            # own segments
+            return self.__class__(key.extract(self.seq, self.basepairing()))
+        elif isinstance(key, list):
             return reduce(
                 lambda x, y: x + y,
-                [self[s] for s in slice_]
+                [self[k] for k in key]
             )
         else:
-            return super().__getitem__(slice_)
+            return super().__getitem__(key)
 
     def __setitem__(self, key: IndexType, value: SeqType) -> None:
+        if isinstance(key, str):
+            key = self.annotations[key].location
+
+        if isinstance(key, ILocation):
+            segments = key.split(value)
+            if len(segments) > 1:
+                # CompoundLocations are written one segment at a time
+                for segment, subseq in segments:
+                    self[segment] = subseq
+                return
+            key, value = segments[0]
+
         length_change = len(value) - len(self[key])
         value = self._seq_check(value)
 
-        if isinstance(key, str):
-            slice_ = self.annotations[key].location.to_slice()
-        elif isinstance(key, ILocation):
+        if isinstance(key, ILocation):
             slice_ = key.to_slice()
 
             if key.strand == "REV":
@@ -207,19 +330,31 @@ class NucleicAcid(Polymer):
         else:
             slice_ = key
 
+        self._record_edit(slice_, length_change)
         super().__setitem__(slice_, value)
         self.update_annotations(slice_, length_change)
 
     def __delitem__(self, key: IndexType) -> None:
+        if isinstance(key, str):
+            key = self.annotations[key].location
+
+        if isinstance(key, ILocation):
+            segments = key.split(self[key])
+            if len(segments) > 1:
+                # CompoundLocations are deleted one segment at a time
+                for segment, _ in segments:
+                    del self[segment]
+                return
+            key = segments[0][0]
+
         length_change = -len(self.__getitem__(key))
 
-        if isinstance(key, str):
-            slice_ = self.annotations[key].location.to_slice()
-        elif isinstance(key, ILocation):
+        if isinstance(key, ILocation):
             slice_ = key.to_slice()
         else:
             slice_ = key
 
+        self._record_edit(slice_, length_change)
         super().__delitem__(slice_)
         self.update_annotations(slice_, length_change)
 
@@ -253,12 +388,47 @@ class NucleicAcid(Polymer):
         length_change = len(value)
         value = self._seq_check(value)
 
+        self._record_edit(slice(key, key), length_change)
         super().insert(key, value)
         self.update_annotations(key, length_change)
 
     def _comparables(self) -> List[str]:
         return ['seq', 'annotations']
 
+    def _record_edit(self, key: LocationType, length_change: int) -> None:
+        # must be called before the edit is applied to self.seq
+        if self.edit_log is None:
+            return
+
+        if isinstance(key, int):
+            key = slice(key, key + 1)
+        start, end, _ = key.indices(len(self))
+        self.edit_log.record(start, max(start, end), length_change)
+
+    def liftover(
+            self, positions: Union[int, np.ndarray]
+    ) -> Union[int, np.ndarray]:
+        """
+        A method that maps positions on the sequence this NucleicAcid was
+        created with onto its current, edited sequence. Requires the
+        NucleicAcid to have been created with track_edits=True.
+        """
+        if self.edit_log is None:
+            raise ValueError("edits are not tracked for this NucleicAcid")
+        return self.edit_log.liftover(positions)
+
+    def liftover_back(
+            self, positions: Union[int, np.ndarray]
+    ) -> Union[int, np.ndarray]:
+        """
+        A method that maps positions on the current, edited sequence back
+        onto the sequence this NucleicAcid was created with. Requires the
+        NucleicAcid to have been created with track_edits=True.
+        """
+        if self.edit_log is None:
+            raise ValueError("edits are not tracked for this NucleicAcid")
+        return self.edit_log.liftover_back(positions)
+
     def update_annotations(self, key: LocationType, length_change: int) -> None:
         if self.annotations is not None:
             for part in self.annotations.values():
@@ -286,22 +456,27 @@ class NucleicAcid(Polymer):
         """
         raise NotImplementedError
 
-    def translate(self, code: Optional[CodeType] = None) -> Protein:
+    def translate(
+            self,
+            code: Optional[CodeType] = None
+    ) -> Union[Protein, ProteinSet]:
         """
         A method that returns a new Protein object representing the
         transcription of a NucleicAcid to RNA, followed by the translation of
         that RNA to a Protein, given a genetic code mapping RNA to Proteins (
-        defaults to the Standard Code).
+        defaults to the Standard Code). Ambiguous codes return the
+        ProteinSet of every Protein sequence the NucleicAcid may encode (see
+        Code.translate).
         """
-        if code is None:
-            code = Code()
-        elif isinstance(code, dict):
-            code = Code(code)
+        if code is None or isinstance(code, dict):
+            code = get_code(code)
         else:
             raise TypeError("code must be a dict or dict-like obj")
 
         mRNA = self.transcribe()
         prot_seq = code.translate(mRNA.seq)
+        if isinstance(prot_seq, ProteinSet):
+            return prot_seq
         return Protein(prot_seq)
 
     def reverse_complement(self) -> "Own Type":
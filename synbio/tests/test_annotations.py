@@ -95,6 +95,58 @@ class TestLocation:
         assert loc.to_slice() == slice(4, 7, 1)
 
 
+class TestCompoundLocation:
+    # a:                ------
+    # b: ----
+    a = Location(10, 16)
+    b = Location(0, 4, "REV")
+    loc = CompoundLocation([a, b])
+
+    def test_init(self):
+        assert len(self.loc) == 10
+        assert self.loc.start == 0
+        assert self.loc.end == 16
+        assert self.loc.strand is None
+        assert list(self.loc) == [self.a, self.b]
+        assert CompoundLocation([self.a]).strand == "FWD"
+
+    def test_eq(self):
+        assert self.loc == CompoundLocation([self.a, self.b])
+        assert self.loc != CompoundLocation([self.b, self.a])
+
+    def test_extract(self):
+        dna = "ATCGAATTCCGGTTAACC"
+        assert self.loc.extract(dna) == "GGTTAA" + "CGAT"
+
+    def test_overlaps(self):
+        assert CompoundLocation.overlaps(self.loc, Location(2, 3))
+        assert not CompoundLocation.overlaps(self.loc, Location(5, 9))
+        assert CompoundLocation.contains(self.loc, Location(11, 14))
+        assert not CompoundLocation.contains(self.loc, Location(3, 11))
+
+    def test_offset(self):
+        loc = self.loc.offset(5)
+        assert loc == CompoundLocation(
+            [Location(15, 21), Location(5, 9, "REV")]
+        )
+        assert self.loc.start == 0
+
+    def test_update(self):
+        loc = CompoundLocation([Location(0, 4), Location(8, 12)])
+
+        # insertion upstream of second segment only shifts second segment
+        loc.update(Location(5, 6), 2)
+        assert loc == CompoundLocation([Location(0, 4), Location(10, 14)])
+
+        # edit contained in first segment resizes it, shifts the rest
+        loc.update(Location(1, 3), -1)
+        assert loc == CompoundLocation([Location(0, 3), Location(9, 13)])
+
+        # deletion covering start of second segment truncates it
+        loc.update(Location(7, 11), -4)
+        assert loc == CompoundLocation([Location(0, 3), Location(7, 9)])
+
+
 class TestPart:
     def test_eq(self):
         dna = DNA("ATCGAATTCCGG")
@@ -175,6 +227,33 @@ class TestPart:
                     location=[Location(15, 20), Location(0, 5)])  # GGGGGAAAAA
 
         assert part.seq == "GGGGGAAAAA"
+        assert isinstance(part.location, CompoundLocation)
+
+    def test_compound_update_location(self):
+        dna = DNA("AAAAATTTTTCCCCCGGGGG")
+        part = Part(seq=dna,
+                    location=[Location(15, 20), Location(0, 5)])
+
+        dna[5:10] = "TT"
+        assert part.location == CompoundLocation(
+            [Location(12, 17), Location(0, 5)]
+        )
+        assert part.seq == "GGGGGAAAAA"
+
+    def test_compound_seq_setter(self):
+        dna = DNA("AAAAATTTTTCCCCCGGGGG")
+        part = Part(seq=dna,
+                    location=[Location(15, 20), Location(0, 5, "REV")])
+
+        part.seq = "ACGTAGGGCC"
+        assert part.seq == "ACGTAGGGCC"
+        assert dna == "GGCCCTTTTTCCCCCACGTA"
+
+        # sequences without Location support are written slice by slice
+        seq = list("AAAAATTTTTCCCCCGGGGG")
+        part = Part(seq=seq, location=[Location(15, 20), Location(0, 5)])
+        part.seq = list("CCCCCGGGGG")
+        assert "".join(seq) == "GGGGGTTTTTCCCCCCCCCC"
 
 
 if __name__ == '__main__':
@@ -1,4 +1,6 @@
-from synbio.libraries import Library
+import itertools
+
+from synbio.libraries import *
 from synbio.polymers import DNA, RNA
 from synbio.tests import utils as testutils
 
@@ -42,5 +44,229 @@ class TestLibrary:
         )
 
     def test_variance(self):
-        # TODO: write this test
-        pass
+        # one-shot iterables still work, without random access
+        library = Library(base_seq=self.dna_str, variance=lambda s: iter([s]))
+        assert list(library) == [self.dna_obj]
+        assert isinstance(testutils.raises(len, [library], {}), TypeError)
+        assert isinstance(
+            testutils.raises(library.__getitem__, [0], {}), TypeError
+        )
+
+
+class TestVariantSpaces:
+    seq = "ATGCTGAAATGGCGTTCA"
+    codons = ['AUG', 'CUG', 'AAA', 'UGG', 'CGU', 'UCA']
+
+    def synonyms(self, space):
+        assert all(c in s for c, s in zip(self.codons, space.synonyms))
+        return space.synonyms
+
+    def recode(self, changes):
+        codons = list(self.codons)
+        for pos, codon in changes:
+            codons[pos] = codon
+        return ''.join(codons)
+
+    def test_single_synonymous(self):
+        space = single_synonymous(self.seq)
+        synonyms = self.synonyms(space)
+        expected = [
+            self.recode([(pos, syn)])
+            for pos in range(6) for syn in synonyms[pos]
+        ]
+        assert len(space) == len(expected) == 1 + 6 + 2 + 1 + 6 + 6
+        assert list(space) == expected
+        assert [space[i] for i in range(len(space))] == expected
+        assert space[-1] == expected[-1]
+        # the classes default to the Standard Code, like the generators
+        assert list(SingleSynonymous(self.seq)) == expected
+        assert list(SingleSynonymous(self.seq, None)) == expected
+
+    def test_double_synonymous(self):
+        space = double_synonymous(self.seq)
+        synonyms = self.synonyms(space)
+        expected = [
+            self.recode([(pos1, syn1), (pos2, syn2)])
+            for pos1, pos2 in itertools.combinations(range(6), 2)
+            for syn1 in synonyms[pos1] for syn2 in synonyms[pos2]
+        ]
+        assert len(space) == len(expected)
+        assert [space[i] for i in range(len(space))] == expected
+        assert list(DoubleSynonymous(self.seq)) == expected
+        assert isinstance(
+            testutils.raises(space.__getitem__, [len(space)], {}), IndexError
+        )
+
+    def test_all_synonymous(self):
+        space = all_synonymous(self.seq)
+        expected = [
+            ''.join(codons)
+            for codons in itertools.product(*self.synonyms(space))
+        ]
+        assert len(space) == len(expected) == 6 * 2 * 6 * 6
+        assert list(AllSynonymous(self.seq, 'STANDARD')) == expected
+        assert list(space) == expected
+        assert list(space[10:100:7]) == expected[10:100:7]
+        assert list(space[10:][::-3][:4]) == expected[10:][::-3][:4]
+
+    def test_library_access(self):
+        library = Library(base_seq=self.seq, variance=all_synonymous)
+        expected = list(library.variance)
+        assert len(library) == len(expected)
+        assert library[123] == expected[123]
+        assert list(library.shard(2, 5)) == expected[2::5]
+        # shards partition the library
+        assert sorted(
+            v for k in range(3) for v in library.shard(k, 3)
+        ) == sorted(expected)
+        samples = library.sample(20, rng=0)
+        assert len(set(samples)) == 20 and set(samples) <= set(expected)
+        assert library.sample(20, rng=0) == samples
+
+    def test_huge_library(self):
+        library = Library(base_seq='CTG' * 40, variance=all_synonymous)
+        assert library.variance.size == 6 ** 40
+        assert library[6 ** 40 - 1] == library.variance.synonyms[0][-1] * 40
+        samples = library.sample(5, rng=1)
+        assert len(set(samples)) == 5
+        assert library.sample(5, rng=1) == samples
+
+    def test_sample_errors(self):
+        library = Library(base_seq=self.seq, variance=single_synonymous)
+        assert isinstance(
+            testutils.raises(library.sample, [len(library) + 1], {}),
+            ValueError
+        )
+        assert len(library.sample(len(library), rng=0)) == len(library)
+
+        # one-shot iterables cannot be indexed, so they cannot be sampled
+        library = Library(base_seq=self.seq, variance=iter(['ATG', 'ATC']))
+        assert isinstance(
+            testutils.raises(library.sample, [1], {}), TypeError
+        )
+
+    def test_buffers_and_diffs(self):
+        for space in (single_synonymous(self.seq),
+                      double_synonymous(self.seq),
+                      all_synonymous(self.seq)):
+            expected = list(space)
+            views = space.buffers()
+            view = next(views)
+            assert bytes(view).decode() == expected[0]
+            # one buffer is rewritten in place for every variant
+            assert all(
+                other is view and str(other, 'ascii') == variant
+                for other, variant in zip(views, expected[1:])
+            )
+            assert isinstance(testutils.raises(
+                view.__setitem__, [0, ord('A')], {}), TypeError
+            )
+
+            diffs = list(space.diffs())
+            assert len(diffs) == len(space)
+            assert all(
+                diff == space.diff(n) and self.recode(diff) == expected[n]
+                for n, diff in enumerate(diffs)
+            )
+        assert single_synonymous(self.seq).diff(-1) == ((5, 'AGC'),)
+
+
+class TestVariantSet:
+    seq = "ATGCTGAAATGGCGTTCA"
+    # M L K W R S
+
+    def test_from_space(self):
+        space = double_synonymous(self.seq)
+        variants = VariantSet.from_space(space)
+        assert len(variants) == len(space)
+        assert list(variants) == list(space)
+        assert variants[17] == space[17] and variants[-1] == space[-1]
+        assert all(
+            variants.diff(n) == space.diff(n) for n in range(len(space))
+        )
+        # two replaced codons per variant: 13 bytes each, plus offsets
+        assert variants.nbytes < 40 * len(space)
+
+        library = Library(base_seq=self.seq, variance=single_synonymous)
+        assert list(library.variant_set()) == list(library.variance)
+
+    def test_from_sequences(self):
+        space = single_synonymous(self.seq)
+        variants = VariantSet.from_sequences(self.seq, space)
+        assert list(variants) == list(space)
+        # replacements by the base codon are not stored
+        assert all(
+            variants.diff(n) == tuple(
+                (pos, codon) for pos, codon in space.diff(n)
+                if codon != space.codons[pos]
+            ) for n in range(len(space))
+        )
+        assert isinstance(
+            testutils.raises(
+                VariantSet.from_sequences, [self.seq, ['ATG']], {}
+            ), ValueError
+        )
+
+    def test_filters(self):
+        variants = VariantSet.from_diffs(self.seq, [
+            [(1, 'UUA')],                   # L -> L
+            [(2, 'AGA')],                   # K -> R
+            [(1, 'CUC'), (3, 'UGA')],       # L -> L, W -> *
+            [],                             # base
+            [(5, 'UCU')],                   # S -> S
+        ])
+        assert variants.at_positions([1]).tolist() == \
+            [True, False, True, False, False]
+        assert variants.synonymous().tolist() == \
+            [True, False, False, True, True]
+        assert variants.changes('K', 'R').tolist() == \
+            [False, True, False, False, False]
+        assert variants.changes(after='*').tolist() == \
+            [False, False, True, False, False]
+
+        picked = variants[variants.synonymous()]
+        assert len(picked) == 3
+        assert list(picked) == [variants[0], variants[3], variants[4]]
+        assert list(variants[::2]) == [variants[0], variants[2], variants[4]]
+        assert list(variants[[4, 4]]) == [variants[4]] * 2
+        assert list(variants[[-1, 0]]) == [variants[4], variants[0]]
+        assert variants.diff(-1) == ((5, 'TCT'),)
+        assert variants.mutations(-3) == '1:CTG>CTC;3:TGG>TGA'
+        for key in (5, -6):
+            assert isinstance(
+                testutils.raises(variants.diff, [key], {}), IndexError
+            )
+            assert isinstance(
+                testutils.raises(variants.__getitem__, [[0, key]], {}),
+                IndexError
+            )
+
+    def test_unique(self):
+        variants = VariantSet.from_diffs(self.seq, [
+            [(1, 'UUA')],
+            [(1, 'CUG')],               # the base codon: same as the base
+            [(1, 'UUA'), (2, 'AAA')],   # same as the first
+            [],
+            [(2, 'AAG'), (1, 'UUA')],
+        ])
+        unique = variants.unique()
+        assert list(unique) == list(dict.fromkeys(variants))
+        assert len(unique) == 3
+
+    def test_export(self, tmp_path):
+        variants = VariantSet.from_diffs(self.seq, [
+            [(0, 'AUG')], [(1, 'UUA'), (5, 'AGC')]
+        ])
+        fasta = tmp_path / 'pool.fasta'
+        variants.to_fasta(fasta, prefix='oligo')
+        assert fasta.read_text().splitlines() == [
+            '>oligo_0 0:ATG>ATG', 'ATGCTGAAATGGCGTTCA',
+            '>oligo_1 1:CTG>TTA;5:TCA>AGC', 'ATGTTAAAATGGCGTAGC',
+        ]
+        table = tmp_path / 'pool.csv'
+        variants.to_csv(table)
+        assert table.read_text().splitlines() == [
+            'name,mutations,sequence',
+            'variant_0,0:ATG>ATG,ATGCTGAAATGGCGTTCA',
+            'variant_1,1:CTG>TTA;5:TCA>AGC,ATGTTAAAATGGCGTAGC',
+        ]
@@ -1,5 +1,8 @@
 from synbio.annotations import *
+from synbio.codes import utils as codeutils
+from synbio.codes.metrics import ProteinSet
 from synbio.polymers import *
+from synbio.tests import utils as testutils
 
 
 class TestDNA:
@@ -54,6 +57,33 @@ class TestDNA:
         seq.__delitem__(0)
         assert seq == "AGG"
 
+    def test_compound_edit(self):
+        # exon 2 on the reverse strand, then exon 1
+        loc = CompoundLocation([Location(6, 10), Location(0, 3, "REV")])
+        seq = DNA("AAACCCGGGGTT")
+        assert seq[loc] == "GGGG" + "TTT"
+
+        seq[loc] = "ACGTCCG"
+        assert seq == "CGGCCCACGTTT"
+        assert seq[loc] == "ACGTCCG"
+
+        # edits keep other parts in register
+        dna = DNA("AAACCCGGGGTT")
+        part = Part(seq=dna, location=loc, name="gene")
+        tail = Part(seq=dna, location=Location(10, 12), name="tail")
+        del dna["gene"]
+        assert dna == "CCCTT"
+        assert tail.seq == "TT" and len(part.location) == 0
+
+        # writes must preserve length, and segments may not overlap
+        assert isinstance(
+            testutils.raises(seq.__setitem__, [loc, "ACGT"], {}), ValueError
+        )
+        overlapping = CompoundLocation([Location(0, 4), Location(2, 6)])
+        assert isinstance(
+            testutils.raises(seq.__delitem__, [overlapping], {}), ValueError
+        )
+
     def test_insert(self):
         seq = DNA("ATCG")
         seq.insert(2, "T")
@@ -142,6 +172,26 @@ class TestDNA:
 
         assert dna["test_part"] == "GGGGGAAAAA"
 
+    def test_liftover(self):
+        dna = DNA("AAAATTTTCCCC", track_edits=True)
+        part = Part(seq=dna, location=Location(8, 12))
+
+        dna[4:8] = "GG"     # AAAAGGCCCC
+        dna.insert(0, "TT")  # TTAAAAGGCCCC
+        del dna[0]          # TAAAAGGCCCC
+
+        assert dna.liftover(8) == part.location.start
+        assert list(dna.liftover([0, 4, 6, 12])) == [1, 5, 7, 11]
+        assert list(dna.liftover_back([0, 1, 5, 7, 11])) == [0, 0, 4, 8, 12]
+
+        # substitutions do not change coordinates
+        dna[0] = "A"
+        assert list(dna.liftover([0, 4, 6, 12])) == [1, 5, 7, 11]
+
+        assert isinstance(
+            testutils.raises(DNA("AAAA").liftover, [[0]], {}), ValueError
+        )
+
     def test_add(self):
         dna1 = DNA("AAAATTTT")
         part1 = Part(seq=dna1, location=Location(0, 4))
@@ -190,6 +240,15 @@ class TestDNA:
         GFP_prot2 = GFP_transcript.translate()
         assert GFP_prot1 == GFP_prot2
 
+    def test_translate_ambiguous(self):
+        code = codeutils.promiscuity(
+            codeutils.standard_code, allow_ambiguous=True
+        )
+        proteins = DNA('ATGTGG').translate(code)
+        assert isinstance(proteins, ProteinSet)
+        assert list(proteins) == ['IW', 'I*', 'MW', 'M*']
+        assert list(RNA('AUGUGG').translate(code)) == list(proteins)
+
 
 if __name__ == '__main__':
     pass
@@ -16,3 +16,13 @@ def test_find_subseq():
     ]
     subseqs = [seq_to_search[ix] for ix in subseq_ix]
     assert subseqs == ['atAT', 'ATaT', 'atat']
+
+
+def test_mut_pairs():
+    from synbio import utils
+
+    assert utils.triplet_rna_mut_pairs is utils.triplet_rna_mut_pairs
+    assert len(utils.quadruplet_dna_mut_pairs) == 256
+    assert utils.triplet_rna_mut_pairs['UUU'] == set(
+        utils.all_single_mutations('UUU', rNTPs)
+    )
@@ -0,0 +1,106 @@
+from synbio.annotations import *
+from synbio.polymers import DNA
+from synbio.versions import *
+
+
+class TestRope:
+    def test_replace(self):
+        seq = "ATCG" * 100
+        rope = Rope(seq)
+        edited = rope.replace(10, 20, "GG")
+
+        assert str(rope) == seq
+        assert str(edited) == seq[:10] + "GG" + seq[20:]
+        assert len(edited) == len(seq) - 8
+        assert edited[5:15] == (seq[:10] + "GG" + seq[20:])[5:15]
+        assert edited[-1] == seq[-1]
+
+    def test_sharing(self):
+        rope = Rope("A" * 10000)
+        edited = rope.replace(5000, 5001, "T")
+
+        # only the chunk containing the edit is not shared
+        shared = set(rope.chunk_ids()) & set(edited.chunk_ids())
+        assert len(shared) >= len(rope.chunk_ids()) - 2
+
+
+class TestVersionedSequence:
+    def make_dna(self):
+        dna = DNA("ATGAAATTTTAG")
+        Part(seq=dna, location=Location(3, 9), name="insert")
+        Part(seq=dna, location=Location(9, 12, "REV"), name="stop")
+        return dna
+
+    def test_edit(self):
+        vseq = VersionedSequence(self.make_dna())
+
+        vseq["insert"] = "GGG"
+        assert str(vseq) == "ATGGGGTAG"
+        assert vseq.annotations["insert"] == Location(3, 6)
+        assert vseq.annotations["stop"] == Location(6, 9, "REV")
+        assert vseq["stop"] == "CTA"
+
+        del vseq[0:3]
+        assert str(vseq) == "GGGTAG"
+        assert vseq.annotations["insert"] == Location(0, 3)
+
+    def test_snapshot_restore(self):
+        vseq = VersionedSequence(self.make_dna())
+        base = vseq.snapshot()
+
+        vseq["insert"] = "GGG"
+        vseq.restore(base)
+
+        assert str(vseq) == "ATGAAATTTTAG"
+        assert vseq.annotations["insert"] == Location(3, 9)
+
+    def test_fork(self):
+        vseq = VersionedSequence(self.make_dna())
+        fork = vseq.fork()
+        fork.insert(0, "CC")
+
+        assert str(vseq) == "ATGAAATTTTAG"
+        assert str(fork) == "CCATGAAATTTTAG"
+        assert fork.annotations["insert"] == Location(5, 11)
+
+        # annotations upstream of an edit are shared between versions
+        before = fork.snapshot()
+        fork[13:14] = "CC"
+        shared = set(fork.snapshot().annotation_ids()) \
+            & set(before.annotation_ids())
+        assert len(shared) == 1
+        assert fork.snapshot().annotations[0] == before.annotations[0]
+
+    def test_many_annotations(self):
+        dna = DNA("ATGC" * 500)
+        for i in range(0, 2000, 10):
+            Part(seq=dna, location=Location(i, i + 5), name=f"part {i}")
+        Part(seq=dna, location=[Location(1990, 2000), Location(0, 10)],
+             name="circular")
+        vseq = VersionedSequence(dna)
+        base = vseq.snapshot()
+
+        vseq.insert(1003, "GGG")
+        del vseq[1505:1507]
+        # annotations downstream of an edit are shifted, not rebuilt; only
+        # "part 1000", "part 1500" and "circular" overlap the edits
+        shared = set(vseq.snapshot().annotation_ids()) \
+            & set(base.annotation_ids())
+        assert len(shared) == len(base.annotation_ids()) - 3
+
+        dna.insert(1003, "GGG")
+        del dna[1505:1507]
+        expected = {name: part.location
+                    for name, part in dna.annotations.items()}
+        assert vseq.annotations == expected
+        assert vseq.snapshot().location("part 1500") == Location(1503, 1506)
+        assert list(vseq.annotations) == list(base.locations())
+
+    def test_to_nucleic_acid(self):
+        vseq = VersionedSequence(self.make_dna())
+        vseq["insert"] = "GGG"
+        dna = vseq.to_nucleic_acid()
+
+        assert dna == "ATGGGGTAG"
+        assert dna["insert"] == "GGG"
+        assert dna.annotations["stop"].location == Location(6, 9, "REV")
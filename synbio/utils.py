@@ -1,4 +1,5 @@
 import itertools
+from functools import lru_cache
 from typing import Dict, List, Union
 
 from synbio.interfaces import LocationType, SeqType
@@ -184,10 +185,25 @@ def mutation_pairs(codons, NTPs):
     }
 
 
-triplet_rna_mut_pairs = mutation_pairs(triplet_rna_codons, rNTPs)
-quadruplet_rna_mut_pairs = mutation_pairs(quadruplet_rna_codons, rNTPs)
-triplet_dna_mut_pairs = mutation_pairs(triplet_dna_codons, dNTPs)
-quadruplet_dna_mut_pairs = mutation_pairs(quadruplet_dna_codons, dNTPs)
+# mutation pair tables are built the first time they are accessed
+_mut_pair_tables = {
+    'triplet_rna_mut_pairs': ('triplet_rna_codons', 'rNTPs'),
+    'quadruplet_rna_mut_pairs': ('quadruplet_rna_codons', 'rNTPs'),
+    'triplet_dna_mut_pairs': ('triplet_dna_codons', 'dNTPs'),
+    'quadruplet_dna_mut_pairs': ('quadruplet_dna_codons', 'dNTPs'),
+}
+
+
+@lru_cache(maxsize=None)
+def _build_mut_pairs(name):
+    codons, NTPs = _mut_pair_tables[name]
+    return mutation_pairs(globals()[codons], globals()[NTPs])
+
+
+def __getattr__(name):
+    if name in _mut_pair_tables:
+        return _build_mut_pairs(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 #############
@@ -0,0 +1,581 @@
+from __future__ import annotations
+
+from typing import (
+    Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union,
+)
+
+import numpy as np
+
+from synbio.annotations import CompoundLocation, Location, Part
+from synbio.interfaces import ILocation, IndexType, SeqType
+from synbio.polymers import DNA, NucleicAcid
+
+__all__ = [
+    # persistent data structures
+    "Rope", "SequenceVersion",
+    # mutable handle
+    "VersionedSequence",
+]
+
+CHUNK_SIZE = 128
+
+
+########
+# Rope #
+########
+class _Node(NamedTuple):
+    # leaves have chunk set and no children; internal nodes the reverse
+    length: int
+    depth: int
+    chunk: Optional[str] = None
+    left: Optional[_Node] = None
+    right: Optional[_Node] = None
+
+
+def _leaf(chunk: str) -> _Node:
+    return _Node(len(chunk), 0, chunk=chunk)
+
+
+def _join(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+    if left is None or left.length == 0:
+        return right
+    if right is None or right.length == 0:
+        return left
+    # merge small neighboring leaves so edits don't fragment the rope
+    if left.chunk is not None and right.chunk is not None \
+            and left.length + right.length <= CHUNK_SIZE:
+        return _leaf(left.chunk + right.chunk)
+    return _Node(
+        left.length + right.length,
+        max(left.depth, right.depth) + 1,
+        left=left,
+        right=right
+    )
+
+
+def _build(chunks: List[str]) -> Optional[_Node]:
+    if len(chunks) == 0:
+        return None
+    if len(chunks) == 1:
+        return _leaf(chunks[0])
+    mid = len(chunks) // 2
+    return _join(_build(chunks[:mid]), _build(chunks[mid:]))
+
+
+def _split(node: Optional[_Node],
+           i: int) -> Tuple[Optional[_Node], Optional[_Node]]:
+    # path copying: only nodes along the path to i are rebuilt
+    if node is None:
+        return None, None
+    if i <= 0:
+        return None, node
+    if i >= node.length:
+        return node, None
+    if node.chunk is not None:
+        return _leaf(node.chunk[:i]), _leaf(node.chunk[i:])
+    if i < node.left.length:
+        left, right = _split(node.left, i)
+        return left, _join(right, node.right)
+    left, right = _split(node.right, i - node.left.length)
+    return _join(node.left, left), right
+
+
+def _chunks(node: Optional[_Node]) -> Iterable[str]:
+    stack = [node] if node is not None else []
+    while stack:
+        node = stack.pop()
+        if node.chunk is not None:
+            yield node.chunk
+        else:
+            stack.append(node.right)
+            stack.append(node.left)
+
+
+class Rope:
+    """
+    An immutable, persistent sequence of characters stored as a balanced
+    tree of string chunks. Editing a Rope returns a new Rope that shares
+    every chunk and node not on the path to the edit, so each edit costs
+    O(log n) time and memory.
+
+    >>> a = Rope("AAAATTTT")
+    >>> b = a.replace(2, 6, "GG")
+    >>> str(a), str(b)
+    ('AAAATTTT', 'AAGGTT')
+    """
+
+    def __init__(self, seq: SeqType = '', _root: Optional[_Node] = None):
+        if _root is None:
+            seq = str(seq)
+            _root = _build([
+                seq[i:i + CHUNK_SIZE] for i in range(0, len(seq), CHUNK_SIZE)
+            ])
+        self._root = _root
+
+    @classmethod
+    def _from_root(cls, root: Optional[_Node]) -> Rope:
+        # rebuild from chunks if repeated edits unbalanced the tree
+        if root is not None and root.chunk is None:
+            leaves = -(-root.length // CHUNK_SIZE)
+            if root.depth > 2 * max(leaves, 1).bit_length() + 4:
+                root = _build(list(_chunks(root)))
+        return cls(_root=root)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({str(self)})"
+
+    def __str__(self) -> str:
+        return ''.join(_chunks(self._root))
+
+    def __len__(self) -> int:
+        return 0 if self._root is None else self._root.length
+
+    def __eq__(self, other: Any) -> bool:
+        return str(self) == str(other)
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __getitem__(self, key: Union[int, slice]) -> str:
+        if isinstance(key, int):
+            if key < 0:
+                key += len(self)
+            if not 0 <= key < len(self):
+                raise IndexError("Rope index out of range")
+            node = self._root
+            while node.chunk is None:
+                if key < node.left.length:
+                    node = node.left
+                else:
+                    key -= node.left.length
+                    node = node.right
+            return node.chunk[key]
+
+        start, stop, step = key.indices(len(self))
+        if step != 1:
+            return str(self)[key]
+        _, rest = _split(self._root, start)
+        middle, _ = _split(rest, max(stop - start, 0))
+        return ''.join(_chunks(middle))
+
+    def replace(self, start: int, end: int, value: str) -> Rope:
+        """
+        A method that returns a new Rope with [start, end) replaced by value
+        """
+        left, rest = _split(self._root, start)
+        _, right = _split(rest, end - start)
+        middle = Rope(value)._root
+        return self._from_root(_join(_join(left, middle), right))
+
+    def chunk_ids(self) -> List[int]:
+        """
+        A method that returns the ids of the chunks making up this Rope;
+        useful for measuring how much storage two Ropes share
+        """
+        stack = [self._root] if self._root is not None else []
+        ids = []
+        while stack:
+            node = stack.pop()
+            if node.chunk is not None:
+                ids.append(id(node))
+            else:
+                stack.extend([node.right, node.left])
+        return ids
+
+
+###################
+# SequenceVersion #
+###################
+class _Annotation(NamedTuple):
+    # immutable snapshot of a Part; segments are (start, end, strand)
+    name: str
+    kind: str
+    segments: Tuple[Tuple[int, int, str], ...]
+    compound: bool
+    metadata: Dict[str, Any]
+
+    @classmethod
+    def from_part(cls, part: Part) -> _Annotation:
+        compound = isinstance(part.location, CompoundLocation)
+        locations = part.location.locations if compound else [part.location]
+        return cls(
+            name=part.name,
+            kind=part.kind,
+            segments=tuple(
+                (loc.start, loc.end, loc.strand) for loc in locations
+            ),
+            compound=compound,
+            metadata=part.metadata
+        )
+
+    @property
+    def location(self) -> ILocation:
+        return self.locate(0)
+
+    def locate(self, shift: int) -> ILocation:
+        locations = [
+            Location(start + shift, end + shift, strand)
+            for start, end, strand in self.segments
+        ]
+        return CompoundLocation(locations) if self.compound else locations[0]
+
+    def shifted(self, shift: int) -> _Annotation:
+        if shift == 0:
+            return self
+        return self._replace(segments=tuple(
+            (start + shift, end + shift, strand)
+            for start, end, strand in self.segments
+        ))
+
+
+class _AnnotationNode(NamedTuple):
+    # persistent tree over annotations sorted by start; leaves hold one
+    # annotation. lo and hi bound every segment below the node (shift
+    # included), and shift is an offset still to be added to every segment
+    # below it, so moving a whole subtree after an edit only rebuilds its
+    # root
+    size: int
+    lo: int
+    hi: int
+    shift: int = 0
+    annotation: Optional[_Annotation] = None
+    left: Optional[_AnnotationNode] = None
+    right: Optional[_AnnotationNode] = None
+
+
+def _annotation_leaf(annotation: _Annotation) -> _AnnotationNode:
+    return _AnnotationNode(
+        1,
+        min(start for start, _, _ in annotation.segments),
+        max(end for _, end, _ in annotation.segments),
+        annotation=annotation
+    )
+
+
+def _annotation_branch(
+        left: _AnnotationNode,
+        right: _AnnotationNode,
+        shift: int = 0
+) -> _AnnotationNode:
+    return _AnnotationNode(
+        left.size + right.size,
+        min(left.lo, right.lo) + shift,
+        max(left.hi, right.hi) + shift,
+        shift=shift,
+        left=left,
+        right=right
+    )
+
+
+def _build_annotations(
+        leaves: List[_AnnotationNode]) -> Optional[_AnnotationNode]:
+    if len(leaves) == 0:
+        return None
+    if len(leaves) == 1:
+        return leaves[0]
+    mid = len(leaves) // 2
+    return _annotation_branch(
+        _build_annotations(leaves[:mid]), _build_annotations(leaves[mid:])
+    )
+
+
+def _edit_annotations(
+        node: Optional[_AnnotationNode],
+        update_loc: Location,
+        length_change: int
+) -> Optional[_AnnotationNode]:
+    # path copying: subtrees the edit cannot reach are shared, subtrees
+    # entirely downstream of it are shifted lazily at their root, and only
+    # annotations overlapping the edit are rebuilt
+    start, end = update_loc.start, update_loc.end
+    if node is None or node.hi <= start and node.hi < end:
+        return node
+    if end <= node.lo:
+        return node._replace(
+            lo=node.lo + length_change,
+            hi=node.hi + length_change,
+            shift=node.shift + length_change
+        )
+    if node.annotation is not None:
+        annotation = node.annotation.shifted(node.shift)
+        starts, ends = CompoundLocation.shift(
+            np.array([seg[0] for seg in annotation.segments], dtype=np.int64),
+            np.array([seg[1] for seg in annotation.segments], dtype=np.int64),
+            update_loc,
+            length_change
+        )
+        return _annotation_leaf(annotation._replace(segments=tuple(
+            (seg_start, seg_end, strand)
+            for seg_start, seg_end, (_, _, strand) in zip(
+                starts.tolist(), ends.tolist(), annotation.segments
+            )
+        )))
+
+    inner_loc = update_loc.offset(-node.shift)
+    return _annotation_branch(
+        _edit_annotations(node.left, inner_loc, length_change),
+        _edit_annotations(node.right, inner_loc, length_change),
+        node.shift
+    )
+
+
+def _annotation_leaves(
+        node: Optional[_AnnotationNode]
+) -> Iterable[Tuple[_AnnotationNode, int]]:
+    # (leaf, total pending shift) pairs, in tree order
+    stack = [(node, 0)] if node is not None else []
+    while stack:
+        node, shift = stack.pop()
+        shift += node.shift
+        if node.annotation is not None:
+            yield node, shift
+        else:
+            stack.append((node.right, shift))
+            stack.append((node.left, shift))
+
+
+class SequenceVersion:
+    """
+    An immutable version of an annotated sequence. Sequence chunks (see
+    Rope) and annotation nodes that are not touched by an edit are shared
+    between a version and the versions derived from it. Annotations are
+    kept in a balanced tree sorted by start, whose nodes carry pending
+    offsets, so an edit only rebuilds the annotations it overlaps and the
+    O(log n) nodes above them, whatever the number of annotations.
+    """
+
+    def __init__(
+            self,
+            rope: Rope,
+            annotations: Tuple[_Annotation, ...] = (),
+            seq_type: type = DNA
+    ) -> None:
+        # tree order never changes, since edits preserve the order of
+        # annotation starts; map names and input order onto it once
+        leaves = [_annotation_leaf(annotation) for annotation in annotations]
+        order = sorted(range(len(leaves)), key=lambda i: leaves[i].lo)
+        self.rope = rope
+        self.seq_type = seq_type
+        self._tree = _build_annotations([leaves[i] for i in order])
+        self._order = sorted(range(len(order)), key=order.__getitem__)
+        self._names = {
+            annotations[i].name: position for position, i in enumerate(order)
+        }
+
+    def _derive(
+            self,
+            rope: Rope,
+            tree: Optional[_AnnotationNode]
+    ) -> SequenceVersion:
+        version = self.__class__.__new__(self.__class__)
+        version.rope = rope
+        version.seq_type = self.seq_type
+        version._tree = tree
+        version._order = self._order
+        version._names = self._names
+        return version
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.seq_type.__name__}, " \
+               f"{len(self)} bp, {len(self._order)} annotations)"
+
+    def __len__(self) -> int:
+        return len(self.rope)
+
+    def __str__(self) -> str:
+        return str(self.rope)
+
+    @classmethod
+    def from_nucleic_acid(cls, seq: NucleicAcid) -> SequenceVersion:
+        return cls(
+            rope=Rope(seq.seq),
+            annotations=tuple(
+                _Annotation.from_part(part)
+                for part in seq.annotations.values()
+            ),
+            seq_type=seq.__class__
+        )
+
+    @property
+    def annotations(self) -> Tuple[_Annotation, ...]:
+        """
+        The annotations of this version, in the order they were given
+        """
+        leaves = [
+            leaf.annotation.shifted(shift)
+            for leaf, shift in _annotation_leaves(self._tree)
+        ]
+        return tuple(leaves[position] for position in self._order)
+
+    def to_nucleic_acid(self) -> NucleicAcid:
+        """
+        A method that materializes this version as a new NucleicAcid with
+        freshly created Parts
+        """
+        seq = self.seq_type(str(self.rope))
+        for node in self.annotations:
+            Part(seq=seq, location=node.location, name=node.name,
+                 kind=node.kind, metadata=node.metadata)
+        return seq
+
+    def locations(self) -> Dict[str, ILocation]:
+        return {node.name: node.location for node in self.annotations}
+
+    def location(self, name: str) -> ILocation:
+        """
+        A method that returns the location of the annotation called name,
+        walking down a single path of the annotation tree
+        """
+        position, node, shift = self._names[name], self._tree, 0
+        while node.annotation is None:
+            shift += node.shift
+            if position < node.left.size:
+                node = node.left
+            else:
+                position -= node.left.size
+                node = node.right
+        return node.annotation.locate(shift + node.shift)
+
+    def annotation_ids(self) -> List[int]:
+        """
+        A method that returns the ids of the annotations stored by this
+        version; useful for measuring how much storage two versions share
+        (see Rope.chunk_ids)
+        """
+        return [
+            id(leaf.annotation) for leaf, _ in _annotation_leaves(self._tree)
+        ]
+
+    def edit(self, start: int, end: int, value: SeqType) -> SequenceVersion:
+        """
+        A method that returns a new version with [start, end) replaced by
+        value. Only annotations overlapping the edit are rebuilt; those
+        downstream of it are shifted lazily, and all others are shared with
+        this version.
+        """
+        value = self.seq_type(value).seq
+        length_change = len(value) - (end - start)
+        rope = self.rope.replace(start, end, value)
+
+        if length_change == 0:
+            return self._derive(rope, self._tree)
+        return self._derive(rope, _edit_annotations(
+            self._tree, Location(start, end), length_change
+        ))
+
+
+#####################
+# VersionedSequence #
+#####################
+class VersionedSequence:
+    """
+    A mutable handle on a chain of persistent SequenceVersions. Edits are
+    made through the usual indexing syntax, but each one produces a new
+    immutable version, so snapshot(), restore() and fork() are all O(1)
+    and never copy the sequence or its annotations.
+
+    E.g.,
+
+    >>> dna = DNA("ATGAAATTTTAG")
+    >>> _ = Part(seq=dna, location=Location(3, 9), name="insert")
+    >>> vseq = VersionedSequence(dna)
+    >>> base = vseq.snapshot()
+    >>> vseq["insert"] = "GGG"
+    >>> str(vseq)
+    'ATGGGGTAG'
+    >>> trial = vseq.fork()
+    >>> vseq.restore(base)
+    >>> str(vseq), str(trial)
+    ('ATGAAATTTTAG', 'ATGGGGTAG')
+    """
+
+    def __init__(self, seq: Optional[SeqType] = None) -> None:
+        if seq is None:
+            seq = DNA()
+        elif isinstance(seq, SequenceVersion):
+            self.version = seq
+            return
+        elif not isinstance(seq, NucleicAcid):
+            seq = DNA(seq)
+
+        self.version = SequenceVersion.from_nucleic_acid(seq)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({str(self)})"
+
+    def __str__(self) -> str:
+        return str(self.version)
+
+    def __len__(self) -> int:
+        return len(self.version)
+
+    def _parse_key(self, key: IndexType) -> Tuple[int, int, str]:
+        if isinstance(key, str):
+            key = self.version.location(key)
+
+        if isinstance(key, CompoundLocation):
+            raise TypeError("cannot edit a CompoundLocation in one step")
+        elif isinstance(key, ILocation):
+            return key.start, key.end, key.strand
+        elif isinstance(key, int):
+            key = slice(key, key + 1)
+        elif not isinstance(key, slice):
+            raise TypeError("key must be a str, int, slice or Location")
+
+        start, end, _ = key.indices(len(self))
+        return start, max(start, end), "FWD"
+
+    def __getitem__(self, key: IndexType) -> NucleicAcid:
+        seq_type = self.version.seq_type
+        if isinstance(key, str):
+            key = self.version.location(key)
+
+        if isinstance(key, ILocation):
+            # only materialize the span covered by the location
+            span = self.version.rope[key.start:key.end]
+            return seq_type(
+                key.offset(-key.start).extract(span, seq_type().basepairing())
+            )
+        return seq_type(self.version.rope[key])
+
+    def __setitem__(self, key: IndexType, value: SeqType) -> None:
+        start, end, strand = self._parse_key(key)
+        if strand == "REV":
+            value = self.version.seq_type(value).reverse_complement()
+        self.version = self.version.edit(start, end, value)
+
+    def __delitem__(self, key: IndexType) -> None:
+        start, end, _ = self._parse_key(key)
+        self.version = self.version.edit(start, end, '')
+
+    def insert(self, key: int, value: SeqType) -> None:
+        self.version = self.version.edit(key, key, value)
+
+    @property
+    def annotations(self) -> Dict[str, ILocation]:
+        return self.version.locations()
+
+    def snapshot(self) -> SequenceVersion:
+        """
+        A method that returns the current (immutable) version
+        """
+        return self.version
+
+    def restore(self, version: SequenceVersion) -> None:
+        """
+        A method that rolls this handle back (or forward) to a version
+        previously returned by snapshot()
+        """
+        if not isinstance(version, SequenceVersion):
+            raise TypeError("version must be of type SequenceVersion")
+        self.version = version
+
+    def fork(self) -> VersionedSequence:
+        """
+        A method that returns a new, independently editable handle sharing
+        all of its state with this one
+        """
+        return VersionedSequence(self.version)
+
+    def to_nucleic_acid(self) -> NucleicAcid:
+        return self.version.to_nucleic_acid()